@@ -0,0 +1,226 @@
+"""音频设备管理基准：用模拟的 PyAudio 后端检验 AudioDeviceManager 的缓存与重连
+
+模拟后端初始化和逐个查询设备信息都有固定延迟（近似 Windows 上 PortAudio 枚举
+WASAPI/MME/DirectSound 设备的开销），流可以被标记为失效、设备可以拔出或切换默认输出。
+依次检查：
+  reopen     冷启动打开 vs 律动条关闭再打开（应走缓存参数，不重新枚举）
+  stream     流读取出错后按缓存参数恢复
+  default    默认输出设备切换后在检查间隔内改用新设备回环
+  unplug     设备全部拔出一段时间：按指数退避重试，插回后恢复
+任一检查不通过时返回 1。
+
+用法: python benchmarks/audio_device_bench.py [--init-ms 150] [--device-ms 2] [--devices 24]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desktop_lyrics as dl  # noqa: E402
+
+RATE = 48000
+
+
+class FakeStream:
+    def __init__(self, backend, device, channels, chunk):
+        self.backend = backend
+        self.device = device
+        self.channels = channels
+        self.chunk = chunk
+        self.dead = False
+        self.closed = False
+
+    def read(self, frames, exception_on_overflow=True):
+        time.sleep(frames / RATE)
+        if self.dead or self.closed or self.device["name"] not in self.backend.plugged:
+            raise OSError(-9999, "Unanticipated host error")
+        return bytes(frames * self.channels * 2)
+
+    def is_active(self):
+        return not self.closed
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBackend:
+    """模拟 pyaudiowpatch 模块：PyAudio() 返回的实例只看到初始化那一刻的设备"""
+    __version__ = "fake"
+    paInt16 = 8
+    paWASAPI = 13
+
+    def __init__(self, n_devices, init_ms, device_ms):
+        self.all_devices = [f"扬声器 {i}" for i in range(n_devices // 2)] + \
+                           [f"麦克风 {i}" for i in range(n_devices - n_devices // 2)]
+        self.plugged = set(self.all_devices)
+        self.default_output = self.all_devices[0]
+        self.init_sec = init_ms / 1000.0
+        self.device_sec = device_ms / 1000.0
+        self.inits = 0
+        self.streams = []
+        backend = self
+
+        class PyAudio:
+            def __init__(self):
+                time.sleep(backend.init_sec)
+                backend.inits += 1
+                self.names = [n for n in backend.all_devices if n in backend.plugged]
+                self.default_output = backend.default_output
+
+            def get_device_count(self):
+                return len(self.names)
+
+            def get_device_info_by_index(self, i):
+                time.sleep(backend.device_sec)
+                name = self.names[i]
+                out = name.startswith("扬声器")
+                return {"index": i, "name": name, "defaultSampleRate": float(RATE),
+                        "maxInputChannels": 0 if out else 1, "maxOutputChannels": 2 if out else 0}
+
+            def get_host_api_info_by_type(self, api):
+                return {"defaultOutputDevice": self.names.index(self.default_output)}
+
+            def get_default_input_device_info(self):
+                name = next(n for n in self.names if n.startswith("麦克风"))
+                return self.get_device_info_by_index(self.names.index(name))
+
+            def open(self, format, channels, rate, input, frames_per_buffer, input_device_index,
+                     as_loopback=False):
+                info = self.get_device_info_by_index(input_device_index)
+                if info["name"] not in backend.plugged:
+                    raise OSError(-9996, "Invalid device")
+                stream = FakeStream(backend, info, channels, frames_per_buffer)
+                backend.streams.append(stream)
+                return stream
+
+            def terminate(self):
+                pass
+
+        self.PyAudio = PyAudio
+
+    def signature(self):
+        return (len(self.plugged), self.default_output)
+
+    def live_stream(self):
+        live = [s for s in self.streams if not s.closed]
+        return live[-1] if live else None
+
+
+def _run_worker(devices):
+    stop = threading.Event()
+    worker = dl._AudioWorker(32, lambda levels: None, stop, devices=devices)
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    return worker, stop, thread
+
+
+def _wait(cond, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if cond():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def check_reopen(args):
+    backend = FakeBackend(args.devices, args.init_ms, args.device_ms)
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    t0 = time.perf_counter()
+    stream, _, _ = devices.open(dl.AUDIO_CHUNK)
+    cold = time.perf_counter() - t0
+    devices.close(stream)
+    t0 = time.perf_counter()
+    stream, _, _ = devices.open(dl.AUDIO_CHUNK)
+    warm = time.perf_counter() - t0
+    devices.close(stream)
+    return {"cold_open_ms": round(cold * 1000.0, 2), "cached_open_ms": round(warm * 1000.0, 2),
+            "enumerations": devices.enumerations, "backend_inits": backend.inits,
+            "ok": devices.enumerations == 1 and devices.cached_opens == 1}
+
+
+def check_stream(args):
+    backend = FakeBackend(args.devices, args.init_ms, args.device_ms)
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    worker, stop, thread = _run_worker(devices)
+    _wait(lambda: worker.stream is not None, 5.0)
+    first = worker.stream
+    t0 = time.perf_counter()
+    first.dead = True
+    recovered = _wait(lambda: worker.stream is not None and worker.stream is not first, 5.0)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    thread.join(2.0)
+    return {"recover_ms": round(elapsed * 1000.0, 1), "enumerations": devices.enumerations,
+            "ok": recovered and devices.enumerations == 1}
+
+
+def check_default(args):
+    backend = FakeBackend(args.devices, args.init_ms, args.device_ms)
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    worker, stop, thread = _run_worker(devices)
+    _wait(lambda: worker.stream is not None, 5.0)
+    new_default = backend.all_devices[1]
+    t0 = time.perf_counter()
+    backend.default_output = new_default
+    switched = _wait(lambda: worker.stream is not None and worker.stream.device["name"] == new_default,
+                     dl.AUDIO_DEVICE_CHECK_SEC + 5.0)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    thread.join(2.0)
+    return {"switch_ms": round(elapsed * 1000.0, 1), "check_interval_ms": dl.AUDIO_DEVICE_CHECK_SEC * 1000.0,
+            "device": devices.last_params["name"], "ok": switched}
+
+
+def check_unplug(args):
+    backend = FakeBackend(args.devices, args.init_ms, args.device_ms)
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    worker, stop, thread = _run_worker(devices)
+    _wait(lambda: worker.stream is not None, 5.0)
+    first = worker.stream
+    inits = backend.inits
+    saved = backend.plugged
+    backend.plugged = set()
+    time.sleep(args.unplug_sec)
+    attempts = backend.inits - inits
+    backend.plugged = saved
+    recovered = _wait(lambda: worker.stream is not None and worker.stream is not first,
+                      dl.AUDIO_RECONNECT_MAX_SEC + 5.0)
+    stop.set()
+    thread.join(2.0)
+    # 退避间隔 0.5, 1, 2, ... 秒，拔出期间的重试次数约为 log2(时长)
+    return {"unplug_sec": args.unplug_sec, "attempts_while_unplugged": attempts,
+            "ok": recovered and attempts <= 2 + args.unplug_sec.bit_length()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--init-ms", type=float, default=150.0, help="模拟 PortAudio 初始化耗时")
+    parser.add_argument("--device-ms", type=float, default=2.0, help="模拟查询单个设备信息的耗时")
+    parser.add_argument("--devices", type=int, default=24)
+    parser.add_argument("--unplug-sec", type=int, default=6)
+    parser.add_argument("--check-sec", type=float, default=0.25, help="覆盖 AUDIO_DEVICE_CHECK_SEC")
+    args = parser.parse_args()
+
+    dl.AUDIO_DEVICE_CHECK_SEC = args.check_sec
+    results = {}
+    for name, check in (("reopen", check_reopen), ("stream", check_stream),
+                        ("default", check_default), ("unplug", check_unplug)):
+        # 设备表和重连提示不混进 JSON 输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = check(args)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0 if all(r["ok"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
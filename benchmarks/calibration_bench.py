@@ -0,0 +1,83 @@
+"""音画延迟校准基准：用已知延迟的合成音频/逐字歌词对检验 LatencyCalibrator
+
+合成数据来自 tests/test_latency_calibrator.py 的 synthetic_pair()：字起始间隔随机
+（0.15~0.6 秒），音频在“字起始 + 延迟”处放置带谐波的人声样音符，叠加底噪和可选的
+固定节拍鼓点作为干扰。音频按 AUDIO_CHUNK 分帧，
+与 _AudioWorker 相同的加窗 FFT 后送入 push()，模拟时钟返回带抖动的 currentTime。
+输出每个延迟的估计值、误差、相关系数和每次估计的耗时；任一误差超过 --tolerance 时返回 1。
+
+用法: python benchmarks/calibration_bench.py [--delays -0.2,0,0.08,0.25,0.5] [--duration 60] [--drums]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desktop_lyrics as dl  # noqa: E402
+from tests.test_latency_calibrator import RATE, synthetic_pair  # noqa: E402
+
+
+def run_pair(onsets, audio, rng, chunk, jitter):
+    clock_t = [0.0]
+    cal = dl.LatencyCalibrator(lambda: clock_t[0] + rng.uniform(-jitter, jitter))
+    cal.set_onsets(onsets)
+    window = np.hanning(chunk).astype(np.float32)
+    freqs = np.fft.rfftfreq(chunk, d=1.0 / RATE)
+    push_sec = 0.0
+    worst_push = 0.0
+    for k in range(len(audio) // chunk):
+        frame = audio[k * chunk:(k + 1) * chunk]
+        mag = np.abs(np.fft.rfft(frame * window)) + 1e-10
+        clock_t[0] = (k + 1) * chunk / RATE    # read() 返回时的 currentTime
+        t0 = time.perf_counter()
+        cal.push(mag, freqs, chunk / RATE)
+        dt = time.perf_counter() - t0
+        push_sec += dt
+        worst_push = max(worst_push, dt)
+    frames = len(audio) // chunk
+    return cal, push_sec / frames, worst_push
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delays", default="-0.2,0,0.08,0.25,0.5", help="逗号分隔的真实延迟（秒）")
+    parser.add_argument("--duration", type=float, default=60.0, help="每段合成音频时长（秒）")
+    parser.add_argument("--chunk", type=int, default=dl.AUDIO_CHUNK)
+    parser.add_argument("--jitter", type=float, default=0.005, help="currentTime 抖动幅度（秒）")
+    parser.add_argument("--drums", action="store_true", help="叠加与歌词无关的固定节拍鼓点")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="允许的估计误差（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    failed = False
+    for delay in (float(d) for d in args.delays.split(",")):
+        onsets, audio = synthetic_pair(args.duration, delay, rng, drums=args.drums)
+        cal, mean_push, worst_push = run_pair(onsets, audio, rng, args.chunk, args.jitter)
+        error = abs(cal.offset - delay) if cal.estimates else None
+        ok = error is not None and error <= args.tolerance
+        failed |= not ok
+        results.append({
+            "delay_ms": round(delay * 1000.0, 1),
+            "estimate_ms": round(cal.offset * 1000.0, 1),
+            "error_ms": round(error * 1000.0, 1) if error is not None else None,
+            "confidence": round(cal.confidence, 3),
+            "estimates": cal.estimates,
+            "rejected": cal.rejected,
+            "mean_push_us": round(mean_push * 1e6, 1),
+            "worst_push_ms": round(worst_push * 1000.0, 3),
+            "ok": ok,
+        })
+    print(json.dumps({"chunk": args.chunk, "drums": args.drums, "results": results},
+                     indent=2, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
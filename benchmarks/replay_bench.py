@@ -0,0 +1,337 @@
+"""端到端回放基准：在无头 Tk 显示上运行 DesktopLyrics 并回放一段网页端会话
+
+会话文件为 JSON Lines，每行 {"t": 相对秒数, "message": {...}}，message 即网页端发送的
+WebSocket 消息；不指定 --session 时使用内置的合成会话（逐字歌词 + 翻译 + 60Hz time）。
+律动条使用模拟音频，不检查更新；--surfaces N 会创建 N 个律动条窗口（不同方向、条数和配色），
+共用一路音频分析。Linux 下没有 DISPLAY 时会尝试启动 Xvfb。
+
+输出帧耗时分位数、帧间隔、换行延迟、每帧 Tcl 命令数、CPU 占用和内存，结果为 JSON，
+可保存后在不同提交之间对比。--lyric-mb N 会在会话中途发送一份约 N MB 的逐字歌词，
+并统计解析期间错过截止时间的帧数（后台解析时应为 0）。
+
+用法: python benchmarks/replay_bench.py [--session FILE] [--duration 30] [--lyric-mb 5] [--output result.json]
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PORT = 18766
+XVFB_DISPLAY = ":97"
+
+
+def _synthetic_lyrics(n_lines, line_sec, words_per_line, label=""):
+    yrc_lines = []
+    trans_lines = []
+    word_ms = int(line_sec * 1000 / words_per_line)
+    for k in range(n_lines):
+        start_ms = int(k * line_sec * 1000)
+        words = "".join(f"({start_ms + w * word_ms},{word_ms},0){label}字{w}"
+                        for w in range(words_per_line))
+        yrc_lines.append(f"[{start_ms},{int(line_sec * 1000)}]{words}")
+        mm, ss = divmod(start_ms / 1000.0, 60)
+        trans_lines.append(f"[{int(mm):02d}:{ss:05.2f}]第 {k + 1} 行翻译")
+    return yrc_lines, trans_lines
+
+
+def synthetic_session(duration, line_sec=3.0, words_per_line=10, lyric_mb=0.0, songs=1, upcoming=True):
+    """生成合成会话：song、full_lyric（逐字歌词+翻译）以及 60Hz 的 time 流
+
+    lyric_mb > 0 时在第一首歌中途再发送一份约 lyric_mb MB 的同曲目逐字歌词。
+    songs > 1 时把时长平均分给多首歌，upcoming 为真时每首歌开始后预告下一首。
+    """
+    seg = duration / songs
+    n_small = int(seg / line_sec) + 1
+    tracks = []
+    for j in range(songs):
+        yrc, trans = _synthetic_lyrics(n_small, line_sec, words_per_line, label=f"曲{j}" if songs > 1 else "")
+        tracks.append({"song": f"合成测试曲目 {j + 1}" if songs > 1 else "合成测试曲目", "artist": "replay_bench",
+                       "lyric": "\n".join(yrc), "tlyric": "\n".join(trans)})
+
+    events = []
+    for j, track in enumerate(tracks):
+        start = j * seg
+        events.append({"t": start, "message": {"type": "song", "song": track["song"], "artist": track["artist"]}})
+        events.append({"t": start + 0.05, "message": {"type": "full_lyric", "lyric": track["lyric"],
+                                                      "tlyric": track["tlyric"]}})
+        if upcoming and j + 1 < songs:
+            events.append({"t": start + 1.0, "message": {"type": "upcoming", "tracks": [tracks[j + 1]]}})
+        for i in range(int((seg - 0.2) * 60)):
+            events.append({"t": start + 0.2 + i / 60.0, "message": {"type": "time", "currentTime": i / 60.0}})
+    if lyric_mb > 0:
+        # 逐字歌词每行约 215 字节（UTF-8）
+        yrc, trans = _synthetic_lyrics(int(lyric_mb * 2**20 / 215), line_sec, words_per_line)
+        events.append({"t": seg / 2, "message": {"type": "full_lyric", "lyric": "\n".join(yrc),
+                                                 "tlyric": "\n".join(trans)}})
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def load_session(path):
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    vs = sorted(values)
+
+    def pick(q):
+        return round(vs[min(len(vs) - 1, int(q * len(vs)))], 3)
+
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(vs[-1], 3),
+            "count": len(vs)}
+
+
+def _memory_mb():
+    try:
+        import psutil
+        return {"rss_mb": round(psutil.Process().memory_info().rss / 2**20, 1)}
+    except ImportError:
+        pass
+    try:
+        import resource
+        # Linux 下 ru_maxrss 单位为 KB
+        return {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    except ImportError:
+        return {}
+
+
+class _Replayer(threading.Thread):
+    """通过本地 WebSocket 客户端按原始时间间隔回放会话"""
+    def __init__(self, events, port):
+        super().__init__(daemon=True)
+        self.events = events
+        self.port = port
+        self.start_wall = None
+        self.done = threading.Event()
+        # 每首歌一段 (相对秒数, currentTime)，用于把歌词时间换算为理想的显示时刻
+        self.segments = [[]]
+        for e in events:
+            msg_type = e["message"].get("type")
+            if msg_type == "song" and self.segments[-1]:
+                self.segments.append([])
+            elif msg_type == "time":
+                self.segments[-1].append((e["t"], float(e["message"].get("currentTime", 0))))
+
+    def run(self):
+        try:
+            asyncio.run(self._replay())
+        except Exception as e:
+            print(f"回放失败: {e}")
+        finally:
+            self.done.set()
+
+    async def _replay(self):
+        import websockets
+        async with websockets.connect(f"ws://localhost:{self.port}", max_size=None) as ws:
+            self.start_wall = time.perf_counter()
+            for e in self.events:
+                delay = self.start_wall + e["t"] - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(json.dumps(e["message"]))
+
+    def ideal_wall_time(self, playback_time, segment=0):
+        """第 segment 首歌的播放时刻 playback_time 理想情况下出现在屏幕上的 perf_counter 时刻"""
+        if self.start_wall is None or not 0 <= segment < len(self.segments):
+            return None
+        points = self.segments[segment]
+        cts = [ct for _, ct in points]
+        i = bisect.bisect_left(cts, playback_time)
+        if i >= len(cts):
+            return None
+        t, ct = points[i]
+        return self.start_wall + t - (ct - playback_time)
+
+
+class _Probe:
+    """包装 animation_tick/process_queue，记录帧耗时、Tcl 命令数和换行时刻"""
+    def __init__(self, app):
+        self.app = app
+        self.frame_ms = []
+        self.frame_period_ms = []
+        self.tcl_per_frame = []
+        self.switches = []
+        self.frame_late = []       # (开始时刻, 相对截止时间的迟到秒数, 周期)
+        self.parse_windows = []
+        self._last_index = -1
+        self._last_tick = None
+        tcl = app.root.tk
+        scheduler = app.frame_scheduler
+
+        orig_tick = app.animation_tick
+        orig_queue = app.process_queue
+
+        def tick():
+            c0 = int(tcl.call("info", "cmdcount"))
+            t0 = time.perf_counter()
+            if scheduler.deadline is not None:
+                self.frame_late.append((t0, t0 - scheduler.deadline, scheduler.period))
+            orig_tick()
+            t1 = time.perf_counter()
+            # 减去两次 info cmdcount 本身
+            self.tcl_per_frame.append(int(tcl.call("info", "cmdcount")) - c0 - 1)
+            self.frame_ms.append((t1 - t0) * 1000.0)
+            if self._last_tick is not None:
+                self.frame_period_ms.append((t0 - self._last_tick) * 1000.0)
+            self._last_tick = t0
+            self._check_switch(t1)
+
+        def process_queue():
+            orig_queue()
+            self._check_switch(time.perf_counter())
+
+        app.animation_tick = tick
+        app.process_queue = process_queue
+
+        import lyric_parser
+        orig_parse = lyric_parser.parse_lyric_entry
+
+        def parse_lyric_entry(lyric, tlyric):
+            p0 = time.perf_counter()
+            try:
+                return orig_parse(lyric, tlyric)
+            finally:
+                self.parse_windows.append((p0, time.perf_counter(), len(lyric or "")))
+
+        lyric_parser.parse_lyric_entry = parse_lyric_entry
+
+    def parse_report(self):
+        """每次解析期间的帧数、错过截止时间（迟到超过半个周期）的帧数和最大迟到"""
+        report = []
+        for p0, p1, size in self.parse_windows:
+            lates = [(late, period) for t, late, period in self.frame_late if p0 <= t <= p1]
+            missed = sum(1 for late, period in lates if late > max(0.002, period * 0.5))
+            report.append({
+                "lyric_bytes": size,
+                "parse_ms": round((p1 - p0) * 1000.0, 1),
+                "frames": len(lates),
+                "missed_deadlines": missed,
+                "max_late_ms": round(max((late for late, _ in lates), default=0.0) * 1000.0, 3),
+            })
+        return report
+
+    def _check_switch(self, now):
+        idx = self.app.last_lyric_index
+        if idx != self._last_index:
+            self._last_index = idx
+            if idx >= 0:
+                # 合成会话中没有 clear，第 k 首歌对应 song_generation == k
+                self.switches.append((now, self.app.lyrics_data[idx]["time"],
+                                      max(0, self.app.song_generation - 1)))
+
+
+def _start_xvfb():
+    if sys.platform != "linux" or os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        print("未设置 DISPLAY 且找不到 Xvfb，无法运行无头基准")
+        sys.exit(2)
+    proc = subprocess.Popen(["Xvfb", XVFB_DISPLAY, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    time.sleep(0.5)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--session", help="JSON Lines 会话文件")
+    parser.add_argument("--duration", type=float, default=30.0, help="合成会话时长（秒）")
+    parser.add_argument("--lyric-mb", type=float, default=0.0, help="会话中途发送的大歌词大小（MB）")
+    parser.add_argument("--songs", type=int, default=1, help="合成会话中的歌曲数")
+    parser.add_argument("--no-upcoming", action="store_true", help="不发送 upcoming 预告，对比切歌耗时")
+    parser.add_argument("--surfaces", type=int, default=1, help="律动条窗口数（共用一路音频分析）")
+    parser.add_argument("--output", help="结果 JSON 保存路径")
+    args = parser.parse_args()
+
+    xvfb = _start_xvfb()
+    try:
+        # DISPLAY 就绪后再导入并创建窗口
+        import desktop_lyrics as dl
+        dl.FORCE_AUDIO_SIMULATION = True
+        dl.CHECK_UPDATE_ON_START = False
+        if args.surfaces > 1:
+            edges = ("bottom", "top", "left", "right")
+            modes = dl.VIS_COLOR_MODES
+            dl.VIS_SURFACES = [{"edge": edges[i % 4], "bars": 64 + 32 * (i % 4), "color_mode": modes[i % len(modes)]}
+                               for i in range(args.surfaces)]
+        dl.perf_stats.registry.set_enabled(True)
+
+        if args.session:
+            events = load_session(args.session)
+        else:
+            events = synthetic_session(args.duration, lyric_mb=args.lyric_mb, songs=max(1, args.songs),
+                                       upcoming=not args.no_upcoming)
+        app = dl.DesktopLyrics()
+        app.server = dl.LyricsServer(app, port=BENCH_PORT, ipc_enabled=False)
+        app.server.start()
+        probe = _Probe(app)
+        replayer = _Replayer(events, BENCH_PORT)
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+
+        surfaces = []
+
+        def wait_done():
+            if replayer.done.is_set():
+                # 退出时会销毁律动条窗口，先记录下来
+                surfaces.extend({"bars": v.num_bars, "vertical": v.vertical_layout, "color_mode": v.color_mode}
+                                for v in app.visualizers)
+                app.root.after(500, app._quit)
+            else:
+                app.root.after(200, wait_done)
+
+        app.root.after(500, replayer.start)
+        app.root.after(1000, wait_done)
+        app.run()
+        cpu1, wall1 = time.process_time(), time.perf_counter()
+        perf = dl.perf_stats.registry.snapshot()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    latencies = []
+    for shown_at, line_time, segment in probe.switches:
+        ideal = replayer.ideal_wall_time(line_time, segment)
+        if ideal is not None:
+            latencies.append((shown_at - ideal) * 1000.0)
+
+    result = {
+        "session": args.session or f"synthetic:{args.duration}s",
+        "frame_time_ms": _percentiles(probe.frame_ms),
+        "frame_period_ms": _percentiles(probe.frame_period_ms),
+        "line_switch_latency_ms": _percentiles(latencies),
+        "tcl_calls_per_frame": _percentiles(probe.tcl_per_frame),
+        "lyric_parses": probe.parse_report(),
+        "song_switch_ms": {name: t for name, t in perf.get("timers_ms", {}).items()
+                           if name.startswith("song_switch")},
+        "prefetch": {name: v for name, v in perf.get("counters", {}).items() if name.startswith("prefetch")},
+        "visualizer": {
+            "surfaces": surfaces,
+            "audio_frames": perf.get("counters", {}).get("audio_frames"),
+            "update_bars_ms": perf.get("timers_ms", {}).get("update_bars"),
+        },
+        "cpu_percent": round((cpu1 - cpu0) / max(1e-9, wall1 - wall0) * 100.0, 1),
+        **_memory_mb(),
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
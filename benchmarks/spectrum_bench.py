@@ -0,0 +1,139 @@
+"""频谱分析基准：多分辨率分析 vs 单个短 FFT vs 单个长 FFT
+
+三种方案处理同一段合成音频（低频正弦 + 粉红噪声），每帧输入 AUDIO_CHUNK 个新样本：
+  short      原实现：chunk 点 FFT，逐个律动条取频点最大值，空频带取最近频点
+  multires   SpectrumAnalyzer：低频频带用降采样长窗 FFT，高频用短 FFT
+  long       单个长 FFT（滑动窗口，点数取与低频支路相同的分辨率）
+输出每帧/每个律动条的耗时、与相邻律动条数值完全相同的律动条数、低频纯音能量扩散到
+多少根律动条（峰值 6dB 以内），以及分析窗口长度（决定低频响应延迟；multires 的长窗口
+只用于低频律动条，高频仍是 chunk 点）。
+
+--signal synth 改用模拟模式的 SyntheticAudioSource（节拍、贝斯、扫频、噪声）作为输入。
+
+用法: python benchmarks/spectrum_bench.py [--bars 200] [--frames 2000] [--chunk 2048] [--signal synth]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desktop_lyrics as dl  # noqa: E402
+
+RATE = 48000
+
+
+class ShortFFTLegacy:
+    """改动前 _AudioWorker 的频带计算，作为对照"""
+    def __init__(self, num_bars, rate, chunk):
+        self.chunk = chunk
+        self.window = np.hanning(chunk).astype(np.float32)
+        freqs = np.fft.rfftfreq(chunk, d=1.0 / rate)
+        edges = np.geomspace(20.0, min(20000.0, rate / 2.0), num_bars + 1)
+        self.band_idx = []
+        for i in range(num_bars):
+            lo, hi = edges[i], edges[i + 1]
+            sel = np.where((freqs >= lo) & (freqs < hi))[0]
+            if sel.size == 0:
+                sel = np.array([int(np.argmin(np.abs(freqs - math.sqrt(lo * hi))))])
+            self.band_idx.append(sel)
+        self.num_bars = num_bars
+
+    def process(self, x):
+        db = 20.0 * np.log10(np.abs(np.fft.rfft(x * self.window)) + 1e-10)
+        out = np.empty(self.num_bars, dtype=np.float32)
+        for i, sel in enumerate(self.band_idx):
+            out[i] = db[sel].max()
+        return out, None
+
+
+class LongFFT:
+    """每帧对最近 n 个样本做一次长 FFT"""
+    def __init__(self, num_bars, rate, chunk, n):
+        self.analyzer = dl.SpectrumAnalyzer(num_bars, rate, n, multires=False)
+        self.buf = np.zeros(n, dtype=np.float32)
+        self.gain_db = 20.0 * math.log10(chunk / n)
+
+    def process(self, x):
+        k = len(x)
+        self.buf[:-k] = self.buf[k:]
+        self.buf[-k:] = x
+        out, mag = self.analyzer.process(self.buf)
+        return out + self.gain_db, mag
+
+
+def test_signal(n, rng):
+    t = np.arange(n) / RATE
+    white = rng.standard_normal(n)
+    spec = np.fft.rfft(white)
+    f = np.fft.rfftfreq(n, 1.0 / RATE)
+    spec[1:] /= np.sqrt(f[1:])
+    pink = np.fft.irfft(spec, n)
+    pink *= 0.05 / pink.std()
+    tones = sum(0.3 * np.sin(2 * np.pi * f0 * t) for f0 in (41.2, 55.0, 82.4))
+    return (pink + tones).astype(np.float32)
+
+
+def spread(analyzer, chunk, f0, frames=12):
+    """纯音 f0 的能量落在峰值 6dB 以内的律动条数"""
+    t = np.arange(chunk * frames) / RATE
+    sig = (0.5 * np.sin(2 * np.pi * f0 * t)).astype(np.float32)
+    for k in range(frames):
+        out, _ = analyzer.process(sig[k * chunk:(k + 1) * chunk])
+    return int((out > out.max() - 6.0).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=dl.VIS_MAX_BARS)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=dl.AUDIO_CHUNK)
+    parser.add_argument("--signal", choices=("tones", "synth"), default="tones")
+    args = parser.parse_args()
+
+    chunk = args.chunk
+    long_n = dl.MULTIRES_LOW_FFT * dl.MULTIRES_DECIMATION
+    makers = {
+        "short": lambda: ShortFFTLegacy(args.bars, RATE, chunk),
+        "multires": lambda: dl.SpectrumAnalyzer(args.bars, RATE, chunk),
+        "long": lambda: LongFFT(args.bars, RATE, chunk, long_n),
+    }
+    windows_ms = {
+        "short": chunk / RATE * 1000.0,
+        "multires": long_n / RATE * 1000.0,
+        "long": long_n / RATE * 1000.0,
+    }
+    if args.signal == "synth":
+        audio = dl.SyntheticAudioSource(RATE, realtime=False).read(chunk * args.frames)
+    else:
+        audio = test_signal(chunk * args.frames, np.random.default_rng(1))
+    result = {"bars": args.bars, "chunk": chunk, "long_fft": long_n, "signal": args.signal, "methods": {}}
+    for name, make in makers.items():
+        analyzer = make()
+        for k in range(20):
+            analyzer.process(audio[k * chunk:(k + 1) * chunk])
+        t0 = time.perf_counter()
+        for k in range(args.frames):
+            out, _ = analyzer.process(audio[k * chunk:(k + 1) * chunk])
+        per_frame = (time.perf_counter() - t0) / args.frames
+        result["methods"][name] = {
+            "us_per_frame": round(per_frame * 1e6, 1),
+            "us_per_bar": round(per_frame * 1e6 / args.bars, 3),
+            "realtime_cpu_pct": round(per_frame / (chunk / RATE) * 100.0, 3),
+            "duplicate_bars": int((np.diff(out) == 0).sum()),
+            "spread_41hz": spread(make(), chunk, 41.2),
+            "spread_98hz": spread(make(), chunk, 98.0),
+            "window_ms": round(windows_ms[name], 1),
+        }
+    mr = dl.SpectrumAnalyzer(args.bars, RATE, chunk)
+    result["multires_low_bars"] = mr.low_bars
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""频谱推流基准：测量每个订阅者给服务端进程增加的 CPU 开销
+
+服务端进程内运行 LyricsServer，另起一个线程按音频分析帧率调用 SpectrumPublisher.publish()
+（代替 _AudioWorker）；订阅客户端在子进程中运行，不计入服务端 CPU。依次测量 0、1、N 个
+订阅者时服务端进程的 CPU 占用，并可加入一个从不读取的慢客户端检验丢帧而非积压
+（要等内核套接字缓冲和 websockets 写缓冲都填满后才开始丢帧，需要较长的 --duration）。
+
+用法: python benchmarks/spectrum_stream_bench.py [--subscribers 1,4,16] [--fps 30] [--format u8] [--slow]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desktop_lyrics as dl  # noqa: E402
+
+BENCH_PORT = 18767
+SOURCE_FPS = 46.875      # 48kHz、1024 点时的分析帧率
+
+
+class _NullApp:
+    """代替 DesktopLyrics，界面队列消息直接丢弃"""
+    def safe_update(self, msg_type, data=None):
+        pass
+
+    def lookup_parsed_lyric(self, content_hash):
+        return None
+
+
+async def _client(port, fps, fmt, duration, slow, results):
+    import websockets
+    sock = socket.create_connection(("localhost", port))
+    if slow:
+        # 缩小接收缓冲，内核缓冲很快写满，服务端的发送才会阻塞
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    async with websockets.connect(f"ws://localhost:{port}{dl.SPECTRUM_WS_PATH}", sock=sock, max_queue=4) as ws:
+        await ws.send(json.dumps({"type": "spectrum_subscribe", "fps": fps, "format": fmt}))
+        info = json.loads(await ws.recv())
+        if slow:
+            # 订阅后不再读取，服务端应丢弃旧帧而不是无限缓冲
+            await asyncio.sleep(duration)
+            return
+        frames, gaps, last_seq = 0, 0, None
+        head = struct.Struct(info["header"])
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            try:
+                msg = await asyncio.wait_for(ws.recv(), timeout=max(0.01, end - time.perf_counter()))
+            except asyncio.TimeoutError:
+                break
+            _, _, _, seq = head.unpack_from(msg)
+            if last_seq is not None and seq != last_seq + 1:
+                gaps += 1
+            last_seq = seq
+            frames += 1
+        results.append({"frames": frames, "fps": round(frames / duration, 1), "seq_gaps": gaps})
+
+
+def _client_process(port, n, fps, fmt, duration, slow, queue):
+    async def run():
+        results = []
+        tasks = [_client(port, fps, fmt, duration, False, results) for _ in range(n)]
+        if slow:
+            tasks.append(_client(port, fps, fmt, duration, True, results))
+        await asyncio.gather(*tasks)
+        return results
+    queue.put(asyncio.run(run()))
+
+
+def _producer(server, stop, bars):
+    rng = np.random.default_rng(0)
+    levels = rng.random(bars).astype(np.float32)
+    period = 1.0 / SOURCE_FPS
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        levels = 0.8 * levels + 0.2 * rng.random(bars).astype(np.float32)
+        if server.spectrum.active:
+            server.spectrum.publish(levels)
+        deadline += period
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+
+
+def _measure(server, n, args):
+    queue = multiprocessing.Queue()
+    proc = None
+    if n or args.slow:
+        proc = multiprocessing.Process(target=_client_process,
+                                       args=(server.port, n, args.fps, args.format,
+                                             args.duration, args.slow, queue))
+        proc.start()
+        deadline = time.perf_counter() + 10.0
+        while len(server.spectrum.subscribers) < n + int(args.slow) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(args.duration)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    snapshot = server.spectrum.snapshot()
+    clients = queue.get() if proc else []
+    if proc:
+        proc.join()
+    return {
+        "subscribers": n,
+        "server_cpu_pct": round(cpu / wall * 100.0, 2),
+        "client_fps": [c["fps"] for c in clients],
+        # 订阅帧率低于分析帧率时序号本来就会跳过一部分
+        "seq_gaps": sum(c["seq_gaps"] for c in clients),
+        "dropped": sum(c["dropped"] for c in snapshot["clients"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", default="1,4,16")
+    parser.add_argument("--fps", type=float, default=dl.SPECTRUM_DEFAULT_FPS)
+    parser.add_argument("--format", default="u8", choices=sorted(dl.SPECTRUM_FORMATS))
+    parser.add_argument("--bars", type=int, default=dl.VIS_MAX_BARS)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--slow", action="store_true", help="额外加入一个从不读取的客户端")
+    args = parser.parse_args()
+
+    dl._import_numpy()
+    server = dl.LyricsServer(_NullApp(), port=BENCH_PORT, ipc_enabled=False)
+    server.start()
+    time.sleep(0.5)
+    stop = threading.Event()
+    producer = threading.Thread(target=_producer, args=(server, stop, args.bars), daemon=True)
+    producer.start()
+    try:
+        runs = [_measure(server, 0, argparse.Namespace(**{**vars(args), "slow": False}))]
+        for n in (int(x) for x in args.subscribers.split(",")):
+            runs.append(_measure(server, n, args))
+    finally:
+        stop.set()
+        server.stop()
+    base = runs[0]["server_cpu_pct"]
+    for run in runs[1:]:
+        run["cpu_pct_per_subscriber"] = round((run["server_cpu_pct"] - base) / run["subscribers"], 3)
+    print(json.dumps({"format": args.format, "fps": args.fps, "bars": args.bars,
+                      "source_fps": SOURCE_FPS, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""追踪环形缓冲基准：每个事件的记录开销、多线程写入的完整性和导出耗时
+
+  raw        直接调用 TraceRing.begin()/end()
+  timer      计时器 begin()/end()（统计关闭、追踪开启，即默认运行状态）
+  timer_off  追踪和统计都关闭时的计时器开销，作为对照
+另起 --threads 个线程同时写入，检查导出后每个线程的 begin/end 仍然成对；最后导出一次
+Chrome trace JSON 并报告耗时。目标为每个事件 < 1 µs。
+
+用法: python benchmarks/trace_bench.py [--events 1000000] [--threads 4] [--out trace.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perf_stats  # noqa: E402
+
+
+def per_event_ns(fn, n, events_per_call):
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - t0) / (n * events_per_call)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--out", help="导出的 trace JSON 路径（默认临时文件）")
+    args = parser.parse_args()
+
+    registry = perf_stats.PerfRegistry()
+    ring = registry.trace
+    timer = registry.timer("bench")
+    n = args.events // 2
+
+    def raw():
+        ring.begin("bench")
+        ring.end("bench")
+
+    def timed():
+        timer.end(timer.begin())
+
+    ring.set_enabled(True)
+    result = {"capacity": ring.capacity, "ns_per_event": {}}
+    result["ns_per_event"]["raw"] = round(per_event_ns(raw, n, 2), 1)
+    result["ns_per_event"]["timer"] = round(per_event_ns(timed, n, 2), 1)
+    ring.set_enabled(False)
+    result["ns_per_event"]["timer_off"] = round(per_event_ns(timed, n, 2), 1)
+
+    ring.clear()
+    ring.set_enabled(True)
+    per_thread = max(1, ring.capacity // (4 * max(1, args.threads)))
+
+    def writer(k):
+        t = registry.timer(f"worker{k}")
+        for _ in range(per_thread):
+            t.end(t.begin())
+
+    threads = [threading.Thread(target=writer, args=(k,), name=f"writer-{k}") for k in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 最后再写一圈以上，检查覆盖后开头失去配对的 end 被丢弃
+    for _ in range(ring.capacity // 2 + 7):
+        timer.end(timer.begin())
+
+    path = args.out or os.path.join(tempfile.mkdtemp(), "trace.json")
+    t0 = time.perf_counter()
+    count = ring.dump(path)
+    export_ms = (time.perf_counter() - t0) * 1000.0
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    depth = {}
+    balanced = True
+    for ev in events:
+        if ev["ph"] == "B":
+            depth[ev["tid"]] = depth.get(ev["tid"], 0) + 1
+        elif ev["ph"] == "E":
+            depth[ev["tid"]] = depth.get(ev["tid"], 0) - 1
+            balanced &= depth[ev["tid"]] >= 0
+    result.update({
+        "threads": args.threads,
+        "exported_events": count,
+        "export_ms": round(export_ms, 1),
+        "file_kb": round(os.path.getsize(path) / 1024.0, 1),
+        "balanced": balanced and all(v == 0 for v in depth.values()),
+        "path": path,
+    })
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    ok = result["balanced"] and result["ns_per_event"]["timer"] < 1000.0
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""传输方式基准：对比 WebSocket 与本地 IPC（Unix 套接字/命名管道）的吞吐量与往返延迟
+
+用法: python benchmarks/transport_bench.py [--messages 20000] [--rounds 500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+import desktop_lyrics as dl
+
+BENCH_PORT = 18765
+
+
+class _CountingApp:
+    """代替 DesktopLyrics，只统计进入界面队列的消息"""
+    def __init__(self):
+        self.received = 0
+
+    def safe_update(self, msg_type, data=None):
+        self.received += 1
+
+    def lookup_parsed_lyric(self, content_hash):
+        return None
+
+
+class _WebSocketClient:
+    async def connect(self, server):
+        self.ws = await websockets.connect(f"ws://localhost:{server.port}")
+
+    async def send(self, text):
+        await self.ws.send(text)
+
+    async def recv(self):
+        return await self.ws.recv()
+
+    async def close(self):
+        await self.ws.close()
+
+
+class _IpcClient:
+    async def connect(self, server):
+        if sys.platform == "win32":
+            loop = asyncio.get_running_loop()
+            self.reader = asyncio.StreamReader(limit=dl.WS_MAX_MESSAGE_SIZE)
+            protocol = asyncio.StreamReaderProtocol(self.reader)
+            transport, _ = await loop.create_pipe_connection(lambda: protocol, server.ipc_address)
+            self.writer = asyncio.StreamWriter(transport, protocol, self.reader, loop)
+        else:
+            self.reader, self.writer = await asyncio.open_unix_connection(
+                server.ipc_address, limit=dl.WS_MAX_MESSAGE_SIZE)
+
+    async def send(self, text):
+        self.writer.write(text.encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+    async def recv(self):
+        return (await self.reader.readline()).decode("utf-8")
+
+    async def close(self):
+        self.writer.close()
+
+
+async def _measure(client, server, messages, rounds):
+    await client.connect(server)
+    ping = json.dumps({"type": "ping"})
+
+    latencies = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        await client.send(ping)
+        await client.recv()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    for i in range(messages):
+        await client.send(json.dumps({"type": "time", "currentTime": i / 60.0}))
+    # 同一连接内消息有序，收到 pong 即代表之前的消息都已处理
+    await client.send(ping)
+    await client.recv()
+    elapsed = time.perf_counter() - t0
+    await client.close()
+
+    latencies.sort()
+    return {
+        "throughput_msg_per_s": round(messages / elapsed, 1),
+        "rtt_p50_ms": round(statistics.median(latencies), 4),
+        "rtt_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        ipc_address = r"\\.\pipe\harmonia-lyrics-bench"
+    else:
+        # 套接字所在目录须为当前用户独占
+        ipc_address = os.path.join(tempfile.mkdtemp(), "harmonia-bench.sock")
+    server = dl.LyricsServer(_CountingApp(), port=BENCH_PORT, ipc_address=ipc_address)
+    server.start()
+    time.sleep(0.5)
+    try:
+        results = {
+            "websocket": asyncio.run(_measure(_WebSocketClient(), server, args.messages, args.rounds)),
+            "ipc": asyncio.run(_measure(_IpcClient(), server, args.messages, args.rounds)),
+        }
+    finally:
+        server.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
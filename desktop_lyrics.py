@@ -1,5 +1,6 @@
+import time
+_STARTUP_T0 = time.perf_counter()
 import asyncio
-import websockets
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
@@ -7,49 +8,101 @@ import json
 import queue
 import threading
 import re
-import pystray
-from PIL import Image, ImageDraw
 import tkinter.font as tkfont
-import time
 import math
 import ctypes
-import numpy as np
+import importlib
+import gc
+import multiprocessing
 from colorsys import hls_to_rgb
 import os
 import sys
+import hashlib
+import struct
+import tempfile
+import stat
+from collections import OrderedDict, deque
+import perf_stats
+import lyric_parser
+
+# ============ 启动时间线（--startup-trace） ============
+STARTUP_TRACE = False
+
+def _trace_startup(label):
+    if STARTUP_TRACE:
+        print(f"[startup] {(time.perf_counter() - _STARTUP_T0) * 1000.0:8.1f} ms  {label}")
+
+def _timed_import(name):
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    _trace_startup(f"import {name}（{(time.perf_counter() - t0) * 1000.0:.1f} ms）")
+    return module
+
+# ============ 依赖库延迟导入 ============
+# numpy/websockets/requests/PyAudio 较重，首次用到时才导入，保证歌词窗口尽快出现
+np = None
+websockets = None
+requests = None
+
+def _import_numpy():
+    global np
+    if np is None:
+        np = _timed_import("numpy")
+    return np
+
+def _import_websockets():
+    global websockets
+    if websockets is None:
+        websockets = _timed_import("websockets")
+    return websockets
+
+def _import_requests():
+    global requests
+    if requests is None:
+        try:
+            requests = _timed_import("requests")
+        except ImportError:
+            print("❌ 未找到 requests 库，更新功能将不可用。请运行: pip install requests")
+    return requests
 
-# ============ 依赖库检查 ============
 try:
-    import requests
+    import uvloop
 except ImportError:
-    print("❌ 未找到 requests 库，更新功能将不可用。请运行: pip install requests")
-    requests = None
+    uvloop = None
 
 # ============ 音频库导入和错误处理 ============
 AUDIO_AVAILABLE = False
 PA = None
-
-try:
-    import pyaudiowpatch as pyaudio
-    PA = pyaudio
-    AUDIO_AVAILABLE = True
-    print("✅ [develop]成功导入 pyaudiowpatch，系统音频捕获可用")
-except ImportError:
-    print("⚠️  [develop]未找到 pyaudiowpatch，尝试导入标准 PyAudio...")
-    try:
-        import pyaudio
-        PA = pyaudio
-        AUDIO_AVAILABLE = True
-        print("✅ [develop]成功导入标准 PyAudio，麦克风输入可用")
-    except ImportError:
-        print("❌ [develop]未找到 PyAudio，音频功能将不可用")
-        print("安装命令: pip install pyaudiowpatch")
-        AUDIO_AVAILABLE = False
-        PA = None
-except Exception as e:
-    print(f"❌ 导入音频库时出错: {e}")
-    AUDIO_AVAILABLE = False
-    PA = None
+_AUDIO_PROBED = False
+_AUDIO_PROBE_LOCK = threading.Lock()
+
+def _load_audio_backend():
+    """首次调用时导入 pyaudiowpatch/PyAudio，返回音频是否可用"""
+    global AUDIO_AVAILABLE, PA, _AUDIO_PROBED
+    with _AUDIO_PROBE_LOCK:
+        if _AUDIO_PROBED:
+            return AUDIO_AVAILABLE
+        _AUDIO_PROBED = True
+        try:
+            PA = _timed_import("pyaudiowpatch")
+            AUDIO_AVAILABLE = True
+            print("✅ [develop]成功导入 pyaudiowpatch，系统音频捕获可用")
+        except ImportError:
+            print("⚠️  [develop]未找到 pyaudiowpatch，尝试导入标准 PyAudio...")
+            try:
+                PA = _timed_import("pyaudio")
+                AUDIO_AVAILABLE = True
+                print("✅ [develop]成功导入标准 PyAudio，麦克风输入可用")
+            except ImportError:
+                print("❌ [develop]未找到 PyAudio，音频功能将不可用")
+                print("安装命令: pip install pyaudiowpatch")
+                AUDIO_AVAILABLE = False
+                PA = None
+        except Exception as e:
+            print(f"❌ 导入音频库时出错: {e}")
+            AUDIO_AVAILABLE = False
+            PA = None
+        return AUDIO_AVAILABLE
 
 # 全局样式
 BG_COLOR = "black"
@@ -67,6 +120,33 @@ WINDOW_ALPHA = 0.85
 HOVER_ALPHA = 0.75
 WEBSOCKET_PORT = 8765
 
+# WebSocket 传输参数（permessage-deflate 压缩 + 歌词解析缓存）
+WS_DEFLATE_WINDOW_BITS = 15      # 压缩窗口，越大压缩率越高
+WS_DEFLATE_MEM_LEVEL = 8
+WS_DEFLATE_LEVEL = 6
+WS_MAX_MESSAGE_SIZE = 8 * 1024 * 1024   # 单帧上限，逐字歌词+翻译可能超过默认的1MB
+LYRIC_CACHE_SIZE = 32            # 已解析歌词缓存条数（按内容哈希）
+UPCOMING_MAX_TRACKS = 2          # upcoming 消息最多预处理的曲目数
+PARSE_IN_PROCESS_MIN_CHARS = 128 * 1024   # 歌词超过此长度时在子进程中解析，避免解析线程长时间占用 GIL
+PREPARED_SONG_CACHE_SIZE = 4     # 已预解析、预排版的待播歌曲数
+LINE_LAYOUT_CACHE_SIZE = 16      # 当前行排版缓存条数
+WS_CLOSE_TIMEOUT = 1.0           # 单个连接关闭握手超时
+SPECTRUM_DEFAULT_FPS = 30        # 频谱订阅默认帧率，实际不超过音频分析帧率
+SPECTRUM_MAX_FPS = 60
+SPECTRUM_PROTOCOL_VERSION = 1
+SPECTRUM_WS_PATH = "/spectrum"   # 频谱订阅专用路径，连接不协商 permessage-deflate
+WS_SHUTDOWN_TIMEOUT = 3.0        # 服务器整体停止超时
+
+# 本地 IPC 通道（与 WebSocket 相同的 JSON 协议，每行一条消息）
+IPC_ENABLED = True
+IPC_PIPE_NAME = r"\\.\pipe\harmonia-lyrics"                  # Windows 命名管道
+# Unix 域套接字：优先放在 XDG_RUNTIME_DIR，否则放在临时目录下当前用户独占（0700）的子目录
+IPC_SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR")
+    or os.path.join(tempfile.gettempdir(), f"harmonia-lyrics-{getattr(os, 'getuid', lambda: 0)()}"),
+    "harmonia-lyrics.sock")
+IPC_PROBE_TIMEOUT = 0.5          # 启动时探测已有套接字是否仍有实例在监听
+
 # 卡拉OK参数（优化后）
 MAX_FPS_MOVING = 60          # 动画时帧率
 IDLE_FPS = 10                # 空闲帧率
@@ -79,39 +159,501 @@ LAST_LINE_FALLBACK = 3.0
 OUTLINE_SIZE = 1
 OUTLINE_COLOR = "#000000"
 OUTLINE_NEIGHBORS = 4
+OUTLINE_NEIGHBOR_LEVELS = (0, 4, 8)   # outline_offsets 支持的描边方向数，其他值向下取整
 TIME_FREEZE_ON_STALE_SEC = 0.8
 RENDER_TRANSLATION_ON_CANVAS = True
 TRANSLATION_TOP_GAP = 8
 TRANSLATION_MATCH_WINDOW = 0.6
 
+# 多行歌词视图
+LYRIC_VIEW_LINES = 1         # 同时显示的歌词行数，1 为单行模式，3~7 显示上下文行
+CONTEXT_FONT_SIZE = 18
+CONTEXT_FG = "#8C8CA0"       # 上下文行颜色
+CONTEXT_LINE_GAP = 6         # 上下文行之间的间距
+CONTEXT_BLOCK_GAP = 10       # 上下文行与当前行（含翻译）之间的间距
+CONTEXT_SCROLL_TIME = 0.25   # 换行滚动动画时长（秒）
+VIEW_LINE_CHOICES = (1, 3, 5, 7)
+
 # 透明色键
 TRANSPARENT_KEY = "#FF00FF"
 
+# 性能统计（默认关闭，托盘菜单或 F12 打开屏幕统计）
+PERF_OVERLAY_INTERVAL_MS = 500
+_PERF_FRAME = perf_stats.timer("animation_tick")
+_PERF_QUEUE = perf_stats.timer("process_queue")
+_PERF_BARS = perf_stats.timer("update_bars")
+_PERF_REBUILD = perf_stats.timer("rebuild_items")
+_PERF_AUDIO_READ = perf_stats.timer("audio_read")
+_PERF_DSP = perf_stats.timer("audio_dsp")
+_PERF_CALIBRATE = perf_stats.timer("latency_calibrate")
+_PERF_AUDIO_OPEN = perf_stats.timer("audio_open")
+_PERF_PARSE = perf_stats.timer("lyric_parse")
+_PERF_LIBRARY = perf_stats.timer("library_lookup")
+_PERF_SWITCH_READY = perf_stats.timer("song_switch_ready")            # 切歌到歌词就绪
+_PERF_SWITCH_FIRST_LINE = perf_stats.timer("song_switch_first_line")  # 切歌到首行显示
+_PERF_PREFETCH_HITS = perf_stats.counter("prefetch_hits")
+_PERF_PREFETCH_MISSES = perf_stats.counter("prefetch_misses")
+_PERF_QUEUE_MSGS = perf_stats.counter("queue_messages")
+_PERF_AUDIO_FRAMES = perf_stats.counter("audio_frames")
+_PERF_AUDIO_RECONNECTS = perf_stats.counter("audio_reconnects")
+_TRACE = perf_stats.trace
+
+# 无头运行/基准测试开关
+FORCE_AUDIO_SIMULATION = False   # 不打开音频设备，律动条使用合成音频
+SIM_AUDIO_REALTIME = True        # 合成音频按采样率节流；False 时尽快生成，用作分析负载压测
+SIM_AUDIO_RATE = 48000
+SIM_AUDIO_SEED = 0
+SIM_AUDIO_BPM = 120.0
+SIM_AUDIO_SWEEP_SEC = 8.0        # 扫频周期
+CHECK_UPDATE_ON_START = True
+
 # 颜色LUT步进数
 COLOR_LUT_STEPS = 100
 SHIMMER_LUT_STEPS = 50
 
+# 音频分析参数
+AUDIO_CHUNK = 2048           # FFT 点数（2 的幂）
+AUDIO_SMOOTH_ALPHA = 0.65
+AUDIO_MIN_DB = -20.0
+AUDIO_MAX_DB = 70.0
+
+# 音频设备：缓存上次成功打开的设备，流失效或默认输出设备变化时重连
+AUDIO_DEVICE_CHECK_SEC = 2.0     # 检查设备插拔/默认输出设备切换的间隔
+AUDIO_RECONNECT_MIN_SEC = 0.5    # 重连失败后的初始等待，每次失败翻倍
+AUDIO_RECONNECT_MAX_SEC = 10.0
+AUDIO_HANDOFF_TIMEOUT_SEC = 2.0  # 新 worker 等待旧 worker 关闭采集流的上限
+
+# 多分辨率频谱：低频频带改用降采样后的长窗 FFT，避免多个低频律动条落在同一个 FFT 频点上
+MULTIRES_ENABLED = True
+MULTIRES_DECIMATION = 8      # 低频支路降采样倍数（48kHz -> 6kHz）
+MULTIRES_LOW_FFT = 2048      # 低频支路 FFT 点数（48kHz 下约 2.9Hz 分辨率）
+MULTIRES_MIN_BINS = 2        # 短 FFT 在频带内不足这么多个频点时改用低频支路
+MULTIRES_FIR_TAPS = 65       # 抗混叠低通滤波器阶数
+
+# 音画延迟校准（用系统输出音频的起始包络对齐逐字歌词）
+CALIBRATION_ENABLED = True
+CALIB_ENV_RATE = 100         # 起始包络重采样频率（Hz）
+CALIB_WINDOW_SEC = 20.0      # 互相关滑动窗口长度（播放时间）
+CALIB_INTERVAL_SEC = 5.0     # 两次估计的间隔（播放时间）
+CALIB_MAX_OFFSET_SEC = 0.8   # 搜索的最大延迟
+CALIB_MIN_ONSETS = 12        # 窗口内字起始数不足时不估计
+CALIB_MIN_CONFIDENCE = 0.35  # 相关系数低于此值的估计丢弃（无关歌词约 0.15~0.27）
+CALIB_SMOOTHING = 0.3        # 新估计的平滑权重
+CALIB_ONSET_SIGMA = 0.03     # 起始脉冲的高斯展宽（秒）
+CALIB_MAX_GAP_SEC = 1.0      # 相邻音频帧播放时间相差超过此值视为跳转，重新积累
+CALIB_VOCAL_BAND = (200.0, 3500.0)
+CALIB_RING_SIZE = 8192       # 起始强度环形缓冲容量（帧）
+
+# 律动条尺寸
+VIS_STRIP_HEIGHT_PX = 80     # 横向律动条高度
+VIS_SIDE_STRIP_PX = 140      # 纵向律动条宽度
+VIS_BAR_SPACING_PX = 1
+VIS_MIN_BAR_PX = 2
+VIS_MAX_BARS = 200
+# 律动条窗口列表，共用同一路音频分析；空列表表示只在任务栏旁放一个
+# 每项可含 edge（auto/top/bottom/left/right）、monitor（显示器序号，0 为主显示器）、
+# bars（律动条数上限）、color_mode（gradient/rainbow/pulse/solid）
+VIS_SURFACES = []
+VIS_SURFACE_EDGES = ("auto", "top", "bottom", "left", "right")
+VIS_COLOR_MODES = ("gradient", "rainbow", "pulse", "solid")
+
+APP_DATA_DIR = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "HarmoniaDesktopLyrics")
+
+# 本地歌词库（由 lyric_library.py import 生成），收到 song 时先查库
+LYRIC_LIBRARY_ENABLED = True
+LYRIC_LIBRARY_PATH = os.path.join(APP_DATA_DIR, "library.sqlite3")
+
+# 性能追踪（飞行记录器）：常开的环形缓冲，托盘菜单或卡顿时导出为 Chrome trace JSON
+TRACE_ENABLED = True
+TRACE_SLOW_FRAME_MS = 150.0          # 界面线程一帧（含迟到）超过此值时自动导出，0 关闭
+TRACE_AUTO_DUMP_INTERVAL_SEC = 60.0  # 两次自动导出的最小间隔
+TRACE_KEEP_FILES = 10                # 只保留最近的追踪文件
+TRACE_DIR = os.path.join(APP_DATA_DIR, "traces")
+
+# 自适应画质（按掉帧比例和界面线程忙碌比例升降档位）
+QUALITY_GOVERNOR_ENABLED = True
+QUALITY_WINDOW_SEC = 1.0         # 每个统计窗口的时长
+QUALITY_DOWN_MISS_RATIO = 0.20   # 掉帧比例高于此值降级
+QUALITY_DOWN_BUSY = 0.60         # 界面线程忙碌比例高于此值降级
+QUALITY_UP_MISS_RATIO = 0.02     # 连续 QUALITY_UP_HOLD_SEC 低于以下两项才升级
+QUALITY_UP_BUSY = 0.25
+QUALITY_UP_HOLD_SEC = 5.0
+QUALITY_MIN_DWELL_SEC = 2.0      # 两次切换之间的最短间隔
+
+# 画质档位：描边层数上限、律动条数量比例、帧率上限、发光层、逐字渐变
+QUALITY_LEVELS = [
+    {"name": "高", "outline_cap": 8, "bar_scale": 1.0, "fps_cap": 144, "glow": True, "karaoke": True},
+    {"name": "中", "outline_cap": 4, "bar_scale": 1.0, "fps_cap": 45, "glow": False, "karaoke": True},
+    {"name": "低", "outline_cap": 4, "bar_scale": 0.5, "fps_cap": 30, "glow": False, "karaoke": True},
+    {"name": "最低", "outline_cap": 0, "bar_scale": 0.25, "fps_cap": 20, "glow": False, "karaoke": False},
+]
+
+# ============ 运行时配置（可热重载） ============
+CONFIG_PATH = os.path.join(APP_DATA_DIR, "config.toml")
+CONFIG_POLL_MS = 1000
+
+_COLOR_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+# 配置项：节 -> 键 -> (模块常量名, 类型, 下限, 上限, 变更后需要重建的部分)
+# 重建分组：timing 每帧读取无需重建；lut 颜色表；fonts 字体与布局；items 画布元素；
+# audio 分析参数；fft 频带划分；visualizer 重建律动条窗口；server 重启监听；quality 自动画质开关
+CONFIG_SCHEMA = {
+    "render": {
+        "max_fps_moving": ("MAX_FPS_MOVING", int, 1, 240, "timing"),
+        "idle_fps": ("IDLE_FPS", int, 1, 144, "timing"),
+        "paused_fps": ("PAUSED_FPS", int, 1, 60, "timing"),
+        "trace_slow_frame_ms": ("TRACE_SLOW_FRAME_MS", float, 0.0, 60000.0, "timing"),
+        "karaoke_fade_time": ("KARAOKE_FADE_TIME", float, 0.0, 5.0, "timing"),
+        "min_fade_time": ("MIN_FADE_TIME", float, 0.0, 5.0, "timing"),
+        "outline_size": ("OUTLINE_SIZE", int, 0, 4, "items"),
+        "outline_neighbors": ("OUTLINE_NEIGHBORS", int, 0, 8, "items"),
+        "color_lut_steps": ("COLOR_LUT_STEPS", int, 2, 1024, "lut"),
+        "lyric_color": ("LYRIC_FG", str, None, None, "lut"),
+        "highlight_color": ("KARAOKE_HL_COLOR", str, None, None, "lut"),
+        "font_name": ("FONT_NAME", str, None, None, "fonts"),
+        "lyric_font_size": ("LYRIC_FONT_SIZE", int, 6, 120, "fonts"),
+        "translation_font_size": ("TRANSLATION_FONT_SIZE", int, 6, 120, "fonts"),
+        "song_font_size": ("SONG_FONT_SIZE", int, 6, 120, "fonts"),
+        "view_lines": ("LYRIC_VIEW_LINES", int, 1, 7, "view"),
+        "context_font_size": ("CONTEXT_FONT_SIZE", int, 6, 120, "view"),
+        "context_color": ("CONTEXT_FG", str, None, None, "view"),
+        "context_scroll_time": ("CONTEXT_SCROLL_TIME", float, 0.0, 2.0, "view"),
+    },
+    "audio": {
+        "chunk": ("AUDIO_CHUNK", int, 256, 16384, "fft"),
+        "smooth_alpha": ("AUDIO_SMOOTH_ALPHA", float, 0.0, 0.99, "audio"),
+        "min_db": ("AUDIO_MIN_DB", float, -120.0, 120.0, "audio"),
+        "max_db": ("AUDIO_MAX_DB", float, -120.0, 120.0, "audio"),
+        "multires_decimation": ("MULTIRES_DECIMATION", int, 2, 32, "fft"),
+        "multires_low_fft": ("MULTIRES_LOW_FFT", int, 256, 16384, "fft"),
+        "calibration_max_offset": ("CALIB_MAX_OFFSET_SEC", float, 0.1, 2.0, "calibration"),
+        "calibration_min_confidence": ("CALIB_MIN_CONFIDENCE", float, 0.0, 1.0, "calibration"),
+    },
+    "visualizer": {
+        "strip_height_px": ("VIS_STRIP_HEIGHT_PX", int, 10, 600, "visualizer"),
+        "side_strip_px": ("VIS_SIDE_STRIP_PX", int, 10, 600, "visualizer"),
+        "bar_spacing_px": ("VIS_BAR_SPACING_PX", int, 0, 20, "visualizer"),
+        "min_bar_px": ("VIS_MIN_BAR_PX", int, 1, 50, "visualizer"),
+        "max_bars": ("VIS_MAX_BARS", int, 8, 512, "visualizer"),
+        "surfaces": ("VIS_SURFACES", list, None, None, "visualizer"),
+    },
+    "server": {
+        "websocket_port": ("WEBSOCKET_PORT", int, 1, 65535, "server"),
+    },
+    "quality": {
+        "governor_enabled": ("QUALITY_GOVERNOR_ENABLED", bool, None, None, "quality"),
+        "window_sec": ("QUALITY_WINDOW_SEC", float, 0.1, 10.0, "timing"),
+        "down_miss_ratio": ("QUALITY_DOWN_MISS_RATIO", float, 0.0, 1.0, "timing"),
+        "down_busy": ("QUALITY_DOWN_BUSY", float, 0.0, 1.0, "timing"),
+        "up_miss_ratio": ("QUALITY_UP_MISS_RATIO", float, 0.0, 1.0, "timing"),
+        "up_busy": ("QUALITY_UP_BUSY", float, 0.0, 1.0, "timing"),
+        "up_hold_sec": ("QUALITY_UP_HOLD_SEC", float, 0.0, 600.0, "timing"),
+        "min_dwell_sec": ("QUALITY_MIN_DWELL_SEC", float, 0.0, 600.0, "timing"),
+    },
+}
+
+
+def _validate_surfaces(surfaces):
+    errors = []
+    for i, spec in enumerate(surfaces):
+        where = f"visualizer.surfaces[{i}]"
+        if not isinstance(spec, dict):
+            errors.append(f"{where} 应为表/对象")
+            continue
+        unknown = set(spec) - {"edge", "monitor", "bars", "color_mode"}
+        if unknown:
+            errors.append(f"{where} 未知配置项: {', '.join(sorted(unknown))}")
+        if spec.get("edge", "auto") not in VIS_SURFACE_EDGES:
+            errors.append(f"{where}.edge 应为 {'/'.join(VIS_SURFACE_EDGES)}")
+        monitor = spec.get("monitor", 0)
+        if not isinstance(monitor, int) or isinstance(monitor, bool) or monitor < 0:
+            errors.append(f"{where}.monitor 应为非负整数")
+        bars = spec.get("bars", VIS_MAX_BARS)
+        if not isinstance(bars, int) or isinstance(bars, bool) or not (8 <= bars <= 512):
+            errors.append(f"{where}.bars 超出范围 [8, 512]")
+        if spec.get("color_mode", "gradient") not in VIS_COLOR_MODES:
+            errors.append(f"{where}.color_mode 应为 {'/'.join(VIS_COLOR_MODES)}")
+    return errors
+
+
+class ConfigManager:
+    """从 TOML/JSON 文件读取配置并覆盖模块常量，文件修改后自动重载
+
+    文件中没有的键恢复为内置默认值；任何一项校验失败则整份配置不生效。
+    """
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self._mtime = None
+        self._defaults = {name: globals()[name]
+                          for section in CONFIG_SCHEMA.values()
+                          for name, *_ in section.values()}
+
+    def _resolve_path(self):
+        if os.path.exists(self.path):
+            return self.path
+        json_path = os.path.splitext(self.path)[0] + ".json"
+        if os.path.exists(json_path):
+            return json_path
+        return None
+
+    def _read(self, path):
+        if path.endswith(".toml"):
+            try:
+                import tomllib
+            except ImportError:
+                raise ValueError("当前 Python 不支持 TOML（需要 3.11+），请改用 config.json")
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def validate(self, raw):
+        """返回 (常量名 -> 值, 错误列表)"""
+        values = dict(self._defaults)
+        errors = []
+        if not isinstance(raw, dict):
+            return values, ["配置文件顶层必须是表/对象"]
+        for section_name, section in raw.items():
+            schema = CONFIG_SCHEMA.get(section_name)
+            if schema is None or not isinstance(section, dict):
+                errors.append(f"未知配置节: {section_name}")
+                continue
+            for key, value in section.items():
+                spec = schema.get(key)
+                if spec is None:
+                    errors.append(f"未知配置项: {section_name}.{key}")
+                    continue
+                name, typ, lo, hi, _ = spec
+                where = f"{section_name}.{key}"
+                if typ is float and isinstance(value, int) and not isinstance(value, bool):
+                    value = float(value)
+                if not isinstance(value, typ) or (typ is not bool and isinstance(value, bool)):
+                    errors.append(f"{where} 类型应为 {typ.__name__}")
+                    continue
+                if lo is not None and not (lo <= value <= hi):
+                    errors.append(f"{where} 超出范围 [{lo}, {hi}]")
+                    continue
+                if name.endswith(("_FG", "_COLOR")) and not _COLOR_RE.match(value):
+                    errors.append(f"{where} 应为 #RRGGBB 颜色")
+                    continue
+                values[name] = value
+        if values["AUDIO_MIN_DB"] >= values["AUDIO_MAX_DB"]:
+            errors.append("audio.min_db 必须小于 audio.max_db")
+        if values["AUDIO_CHUNK"] & (values["AUDIO_CHUNK"] - 1):
+            errors.append("audio.chunk 必须是 2 的幂")
+        if values["MULTIRES_LOW_FFT"] & (values["MULTIRES_LOW_FFT"] - 1):
+            errors.append("audio.multires_low_fft 必须是 2 的幂")
+        # 升级阈值不低于降级阈值时没有滞回，档位会来回跳
+        if values["QUALITY_UP_MISS_RATIO"] >= values["QUALITY_DOWN_MISS_RATIO"]:
+            errors.append("quality.up_miss_ratio 必须小于 quality.down_miss_ratio")
+        if values["QUALITY_UP_BUSY"] >= values["QUALITY_DOWN_BUSY"]:
+            errors.append("quality.up_busy 必须小于 quality.down_busy")
+        errors.extend(_validate_surfaces(values["VIS_SURFACES"]))
+        values["OUTLINE_NEIGHBORS"] = clamp_outline_neighbors(values["OUTLINE_NEIGHBORS"])
+        return values, errors
+
+    def load(self):
+        """读取并应用配置，返回需要重建的分组集合；失败时保留当前配置并返回空集合"""
+        path = self._resolve_path()
+        try:
+            self._mtime = os.path.getmtime(path) if path else None
+            raw = self._read(path) if path else {}
+        except (OSError, ValueError) as e:
+            print(f"读取配置失败: {e}")
+            return set()
+        values, errors = self.validate(raw)
+        if errors:
+            for err in errors:
+                print(f"配置无效: {err}")
+            return set()
+        groups = set()
+        g = globals()
+        for section in CONFIG_SCHEMA.values():
+            for name, _, _, _, group in section.values():
+                if g[name] != values[name]:
+                    g[name] = values[name]
+                    groups.add(group)
+        if groups:
+            print(f"已应用配置 {path or '(默认)'}，变更: {', '.join(sorted(groups))}")
+        return groups
+
+    def poll(self):
+        """文件修改时间变化时重载，返回需要重建的分组"""
+        path = self._resolve_path()
+        try:
+            mtime = os.path.getmtime(path) if path else None
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return set()
+        return self.load()
+
 # ============ 更新管理模块（带进度条） ============
 CURRENT_VERSION = "v0.1.1"
 REPO_OWNER = "beststoryilove"
 REPO_NAME = "Harmonia-DesktopLyrics"
 UPDATE_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/latest"
 
+# 后台更新检查：ETag 条件请求 + 最小检查间隔，状态持久化到用户目录
+UPDATE_STATE_FILE = os.path.join(APP_DATA_DIR, "update_state.json")
+UPDATE_CHECK_INTERVAL_SEC = 6 * 3600
+UPDATE_REQUEST_TIMEOUT = 10
+
+# 更新下载：断点续传 + 大块写入 + 限频进度回调 + 校验后原子替换
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_PROGRESS_INTERVAL = 0.1   # 进度回调最小间隔（秒），避免刷爆 Tk 事件队列
+DOWNLOAD_MAX_RETRIES = 5
+DOWNLOAD_RETRY_BACKOFF = 1.0
+
+class UpdateDownloader:
+    """可续传的流式下载器：先写入 .part 临时文件，校验通过后原子重命名
+
+    断线后用 Range 请求从已下载位置继续，并带上首次响应的 ETag/Last-Modified 作为 If-Range，
+    服务器上的文件变了会返回 200 整个文件，此时截断 .part 从头写；校验值存放在 .part.validator。
+    expected_sha256 为空时只校验长度。
+    on_progress(done, total) 在下载线程中调用，频率不超过 DOWNLOAD_PROGRESS_INTERVAL。
+    """
+    def __init__(self, url, dest_path, expected_sha256=None, expected_size=None, on_progress=None,
+                 chunk_size=DOWNLOAD_CHUNK_SIZE, max_retries=DOWNLOAD_MAX_RETRIES):
+        self.url = url
+        self.dest_path = dest_path
+        self.part_path = dest_path + ".part"
+        self.validator_path = self.part_path + ".validator"
+        self.expected_sha256 = (expected_sha256 or "").lower() or None
+        self.expected_size = expected_size
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self._last_report = 0.0
+
+    def _report(self, done, total, force=False):
+        if self.on_progress is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_report >= DOWNLOAD_PROGRESS_INTERVAL:
+            self._last_report = now
+            self.on_progress(done, total)
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.dest_path) or ".", exist_ok=True)
+        total = self.expected_size
+        retries = 0
+        while True:
+            offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+            try:
+                total = self._fetch(offset, total)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                print(f"下载中断，{DOWNLOAD_RETRY_BACKOFF * retries:.0f} 秒后续传（第 {retries} 次）: {e}")
+                time.sleep(DOWNLOAD_RETRY_BACKOFF * retries)
+        self._verify(total)
+        os.replace(self.part_path, self.dest_path)
+        self._remove(self.validator_path)
+        return self.dest_path
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _read_validator(self):
+        try:
+            with open(self.validator_path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _write_validator(self, headers):
+        """If-Range 只接受强 ETag，弱 ETag 时退回 Last-Modified"""
+        etag = headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+        if validator:
+            with open(self.validator_path, "w", encoding="utf-8") as f:
+                f.write(validator)
+        else:
+            self._remove(self.validator_path)
+
+    def _fetch(self, offset, total):
+        validator = self._read_validator() if offset else None
+        if offset and validator is None:
+            # 不知道 .part 来自哪个版本的文件，不能在它后面接着写
+            offset = 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+        with requests.get(self.url, headers=headers, stream=True, timeout=30) as r:
+            if offset and r.status_code == 416:
+                if total and offset == total:
+                    return total
+                # 总长未知时无法判断 .part 是否已完整，比服务器文件还长则说明文件已变；都从头下载
+                print(f"续传位置 {offset} 不被服务器接受，重新下载")
+            else:
+                return self._receive(r, offset, total)
+        self._remove(self.part_path)
+        self._remove(self.validator_path)
+        return self._fetch(0, self.expected_size)
+
+    def _receive(self, r, offset, total):
+        r.raise_for_status()
+        if r.status_code == 206:
+            content_range = r.headers.get("Content-Range", "")
+            if "/" in content_range and not content_range.endswith("/*"):
+                total = int(content_range.rsplit("/", 1)[1])
+        else:
+            # If-Range 不匹配（文件已变）或服务器不支持 Range：返回的是整个文件，截断后从头写
+            if offset:
+                print("服务器上的文件已变化或不支持续传，从头下载")
+            offset = 0
+            length = r.headers.get("Content-Length")
+            total = int(length) if length is not None else self.expected_size
+            self._write_validator(r.headers)
+        done = offset
+        self._report(done, total, force=True)
+        with open(self.part_path, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    done += len(chunk)
+                    self._report(done, total)
+        self._report(done, total, force=True)
+        if total is not None and done < total:
+            raise requests.ConnectionError(f"连接提前关闭（{done}/{total} 字节）")
+        return total
+
+    def _verify(self, total):
+        size = os.path.getsize(self.part_path)
+        try:
+            if total is not None and size != total:
+                raise ValueError(f"文件大小不符: {size} != {total}")
+            if self.expected_sha256:
+                digest = hashlib.sha256()
+                with open(self.part_path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+                if digest.hexdigest() != self.expected_sha256:
+                    raise ValueError("SHA-256 校验失败")
+        except ValueError:
+            os.remove(self.part_path)
+            self._remove(self.validator_path)
+            raise
+
 class UpdateManager:
-    def __init__(self, root):
+    def __init__(self, root, api_url=UPDATE_API_URL, state_path=UPDATE_STATE_FILE,
+                 min_interval=UPDATE_CHECK_INTERVAL_SEC):
         self.root = root
-        self.check_window = None
+        self.api_url = api_url
+        self.state_path = state_path
+        self.min_interval = min_interval
+        self.notice_window = None
+        self.release = None
 
     def start_check(self):
-        if requests is None:
+        """在后台线程检查更新，只有发现新版本时才弹出非模态提示"""
+        if _import_requests() is None:
             return
-        self.check_window = tk.Toplevel(self.root)
-        self.check_window.title("检查更新")
-        self.check_window.geometry("300x100")
-        self.center_window(self.check_window)
-        self.check_window.transient(self.root)
-        self.check_window.grab_set()
-        tk.Label(self.check_window, text="正在检查更新中...", font=("Microsoft YaHei UI", 12)).pack(expand=True)
         threading.Thread(target=self._check_thread, daemon=True).start()
 
     def _parse_version(self, v_str):
@@ -121,34 +663,103 @@ class UpdateManager:
         except Exception:
             return (0, 0, 0)
 
-    def _check_thread(self):
+    def _load_state(self):
         try:
-            response = requests.get(UPDATE_API_URL, timeout=10)
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"保存更新状态失败: {e}")
+
+    def fetch_latest_release(self, force=False):
+        """返回最新发布信息 {"tag_name", "body"}
+
+        距上次检查不足 min_interval 时直接使用缓存；否则带 If-None-Match 请求，
+        304 时沿用缓存的发布信息。不依赖 Tk，可单独针对本地 HTTP 桩测试。
+        """
+        state = self._load_state()
+        cached = state.get("release")
+        if not force and cached and time.time() - state.get("last_check", 0) < self.min_interval:
+            return cached
+        headers = {"Accept": "application/vnd.github+json"}
+        if cached and state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        response = requests.get(self.api_url, headers=headers, timeout=UPDATE_REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached:
+            release = cached
+        else:
             response.raise_for_status()
             data = response.json()
-            latest_tag = data.get("tag_name", "")
-            body = data.get("body", "暂无更新日志")
+            release = {
+                "tag_name": data.get("tag_name", ""),
+                "body": data.get("body") or "暂无更新日志",
+                # 发布附件的 sha256 摘要（GitHub 返回 "sha256:<hex>"），下载后用于校验
+                "assets": {a.get("name", ""): {"digest": a.get("digest"), "size": a.get("size")}
+                           for a in data.get("assets") or []},
+            }
+            state["etag"] = response.headers.get("ETag", "")
+        state["release"] = release
+        state["last_check"] = time.time()
+        self._save_state(state)
+        return release
+
+    def _check_thread(self):
+        try:
+            release = self.fetch_latest_release()
+            self.release = release
+            latest_tag = release.get("tag_name", "")
             remote_ver_str = latest_tag.replace("updata", "").strip()
             local_ver = self._parse_version(CURRENT_VERSION)
             remote_ver = self._parse_version(remote_ver_str)
             print(f"[Update] Local: {local_ver}, Remote: {remote_ver}")
-            self.root.after(0, self.check_window.destroy)
             if remote_ver > local_ver:
-                self.root.after(0, lambda: self._show_update_dialog(latest_tag, remote_ver_str, body))
-            else:
-                self.root.after(0, lambda: self._show_no_update_dialog(remote_ver_str))
+                body = release.get("body", "暂无更新日志")
+                self.root.after(0, lambda: self._show_update_notice(latest_tag, remote_ver_str, body))
         except Exception as e:
             print(f"检查更新失败: {e}")
-            self.root.after(0, self.check_window.destroy)
 
-    def _show_update_dialog(self, tag, version_part, body):
-        msg = f"发现新版本！\n\n当前版本: {CURRENT_VERSION}\n最新版本: {version_part}\n\n更新日志：\n{body}\n\n是否立即更新？"
-        if messagebox.askyesno("发现新版本", msg, parent=self.root):
+    def _show_update_notice(self, tag, version_part, body):
+        """右下角非模态提示，不抢占焦点"""
+        if self.notice_window is not None:
+            return
+        win = tk.Toplevel(self.root)
+        self.notice_window = win
+        win.title("发现新版本")
+        win.attributes("-topmost", True)
+        win.resizable(False, False)
+
+        def close():
+            self.notice_window = None
+            win.destroy()
+
+        def update_now():
+            close()
             self._download_update(tag, version_part)
 
-    def _show_no_update_dialog(self, remote_version):
-        msg = f"您正在使用最新版，欢迎使用Harmonia桌面歌词！\n\n当前版本: {CURRENT_VERSION}\n(远程版本: {remote_version})"
-        messagebox.showinfo("检查完成", msg, parent=self.root)
+        win.protocol("WM_DELETE_WINDOW", close)
+        tk.Label(win, text=f"发现新版本 {version_part}（当前 {CURRENT_VERSION}）",
+                 font=("Microsoft YaHei UI", 11, "bold")).pack(padx=16, pady=(12, 4), anchor="w")
+        summary = body if len(body) <= 300 else body[:300] + "..."
+        tk.Label(win, text=summary, font=("Microsoft YaHei UI", 9), fg="#444444",
+                 justify="left", wraplength=320).pack(padx=16, pady=4, anchor="w")
+        buttons = tk.Frame(win)
+        buttons.pack(fill="x", padx=16, pady=(4, 12))
+        tk.Button(buttons, text="稍后", command=close).pack(side="right", padx=(6, 0))
+        tk.Button(buttons, text="立即更新", command=update_now).pack(side="right")
+        win.update_idletasks()
+        x = win.winfo_screenwidth() - win.winfo_width() - 24
+        y = win.winfo_screenheight() - win.winfo_height() - 96
+        win.geometry(f"+{x}+{y}")
 
     def _download_update(self, tag, version_part):
         filename = f"Harmonia-DesktopLyrics-{version_part}.exe"
@@ -172,23 +783,17 @@ class UpdateManager:
                          daemon=True).start()
 
     def _download_file_thread(self, url, save_path, window, progress_var, percent_label):
+        asset = ((self.release or {}).get("assets") or {}).get(os.path.basename(save_path)) or {}
+        digest = asset.get("digest") or ""
+        expected_sha256 = digest.split(":", 1)[1] if digest.startswith("sha256:") else None
+
+        def on_progress(done, total):
+            percent = done / total * 100 if total else 0.0
+            self.root.after(0, lambda: self._update_progress_ui(progress_var, percent_label, percent))
+
         try:
-            with requests.get(url, stream=True, timeout=30) as r:
-                r.raise_for_status()
-                total_length = r.headers.get('content-length')
-                with open(save_path, 'wb') as f:
-                    if total_length is None:
-                        f.write(r.content)
-                        self.root.after(0, lambda: self._update_progress_ui(progress_var, percent_label, 100))
-                    else:
-                        dl = 0
-                        total_length = int(total_length)
-                        for chunk in r.iter_content(chunk_size=8192):
-                            if chunk:
-                                dl += len(chunk)
-                                f.write(chunk)
-                                percent = (dl / total_length) * 100
-                                self.root.after(0, lambda p=percent: self._update_progress_ui(progress_var, percent_label, p))
+            UpdateDownloader(url, save_path, expected_sha256=expected_sha256,
+                             expected_size=asset.get("size"), on_progress=on_progress).run()
             self.root.after(0, window.destroy)
             self.root.after(0, lambda: messagebox.showinfo("下载完成", f"下载成功！\n请前往下载目录运行新版本：\n{save_path}", parent=self.root))
         except Exception as e:
@@ -270,112 +875,425 @@ def _detect_taskbar_edge():
     else:
         return ("bottom", r)
 
-# ============ 改进的音频线程 ============
-class _AudioWorker:
-    def __init__(self, num_bars, on_levels, stop_event: threading.Event):
+def _enumerate_monitors():
+    """各显示器的 (整屏矩形, 工作区矩形)，主显示器在前；非 Windows 返回空列表"""
+    if not hasattr(ctypes, "windll"):
+        return []
+
+    class MONITORINFO(ctypes.Structure):
+        _fields_ = [("cbSize", ctypes.c_ulong),
+                    ("rcMonitor", RECT),
+                    ("rcWork", RECT),
+                    ("dwFlags", ctypes.c_ulong)]
+
+    user32 = ctypes.windll.user32
+    found = []
+
+    @ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(RECT), ctypes.c_ssize_t)
+    def _enum_proc(hmonitor, hdc, rect, lparam):
+        info = MONITORINFO()
+        info.cbSize = ctypes.sizeof(MONITORINFO)
+        if user32.GetMonitorInfoW(ctypes.c_void_p(hmonitor), ctypes.byref(info)):
+            found.append((info.dwFlags & 1, info.rcMonitor, info.rcWork))
+        return 1
+
+    try:
+        user32.EnumDisplayMonitors(None, None, _enum_proc, 0)
+    except Exception:
+        return []
+    found.sort(key=lambda m: -m[0])
+    return [(mon, work) for _, mon, work in found]
+
+# ============ 频谱分析 ============
+class _BandPlan:
+    """一条 FFT 支路负责的若干律动条：含频点的频带用 reduceat 一次取最大值，
+    比单个频点还窄的频带在频带中心对 dB 谱插值，相邻律动条不再显示同一个频点的值"""
+    def __init__(self, freqs, bars, lo, hi):
+        self.freqs = freqs
+        starts = np.searchsorted(freqs, lo)
+        ends = np.searchsorted(freqs, hi)
+        full = ends > starts
+        # 频带首尾相接，非空频带的区间恰好首尾相连，reduceat 的分段与频带一一对应
+        self.reduce_bars = bars[full]
+        self.starts = starts[full]
+        self.stop = int(ends[full][-1]) if full.any() else 0
+        self.interp_bars = bars[~full]
+        self.interp_freqs = np.sqrt(lo * hi)[~full]
+
+    def apply(self, db, out):
+        if self.reduce_bars.size:
+            out[self.reduce_bars] = np.maximum.reduceat(db[:self.stop], self.starts)
+        if self.interp_bars.size:
+            out[self.interp_bars] = np.interp(self.interp_freqs, self.freqs, db)
+
+
+class SpectrumAnalyzer:
+    """把一帧 PCM 变成 num_bars 个对数频带的 dB 值
+
+    高频频带直接用本帧 chunk 点 FFT；短 FFT 分辨率不够的低频频带改用低频支路：
+    输入经 FIR 低通后按 MULTIRES_DECIMATION 抽取，累积最近 MULTIRES_LOW_FFT 个样本做长窗 FFT，
+    频率分辨率提高 MULTIRES_LOW_FFT * MULTIRES_DECIMATION / chunk 倍，运算量只相当于再做一次短 FFT。
+    """
+    def __init__(self, num_bars, rate, chunk, multires=None):
+        _import_numpy()
         self.num_bars = num_bars
-        self.on_levels = on_levels
-        self.stop_event = stop_event
-        self.min_db = -20.0
-        self.max_db = 70.0
-        self.smooth_alpha = 0.65
-        self.peak_decay = 1.0
-        self.p = None
-        self.stream = None
-        self.rate = 48000
-        self.chunk = 2048
-        self.band_idx = None
-        self.freqs = None
-        self.display_levels = np.zeros(self.num_bars, dtype=np.float32)
-        self._update_throttle = 0.033
-        self._last_update = 0.0
-        self.simulation_mode = False
-        self.simulation_time = 0.0
-        self.simulation_freq = 0.0
+        self.rate = rate
+        self.chunk = chunk
+        self.window = np.hanning(chunk).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(chunk, d=1.0 / rate)
+        f_min, f_max = 20.0, min(20000.0, rate / 2.0)
+        edges = np.geomspace(f_min, f_max, num_bars + 1)
+        lo, hi = edges[:-1], edges[1:]
+        bars = np.arange(num_bars)
+
+        if multires is None:
+            multires = MULTIRES_ENABLED
+        dec = MULTIRES_DECIMATION
+        low = np.zeros(num_bars, dtype=bool)
+        if multires and chunk % dec == 0:
+            low_max = rate / dec / 2.0 * 0.8   # 低通过渡带以上的频率不可靠
+            short_bins = np.searchsorted(self.freqs, hi) - np.searchsorted(self.freqs, lo)
+            low = (hi <= low_max) & (short_bins < MULTIRES_MIN_BINS)
+        self.multires = bool(low.any())
+        self.high_plan = _BandPlan(self.freqs, bars[~low], lo[~low], hi[~low])
+        self.low_plan = None
+        if self.multires:
+            n = MULTIRES_LOW_FFT
+            self.dec = dec
+            self.low_freqs = np.fft.rfftfreq(n, d=dec / rate)
+            self.low_plan = _BandPlan(self.low_freqs, bars[low], lo[low], hi[low])
+            self.low_window = np.hanning(n).astype(np.float32)
+            self.low_buf = np.zeros(n, dtype=np.float32)
+            taps = MULTIRES_FIR_TAPS
+            m = np.arange(taps) - (taps - 1) / 2.0
+            fc = 0.8 / (2.0 * dec)
+            h = np.sinc(2.0 * fc * m) * np.hamming(taps)
+            self.fir = (h / h.sum()).astype(np.float32)[::-1].copy()
+            self.fir_tail = np.zeros(taps - 1, dtype=np.float32)
+            # 汉宁窗下正弦的 FFT 幅度与点数成正比，折算到短 FFT 的刻度，两条支路衔接处不跳变
+            self.low_gain_db = 20.0 * math.log10(chunk / n)
+
+    @property
+    def low_bars(self):
+        return int(self.low_plan.reduce_bars.size + self.low_plan.interp_bars.size) if self.low_plan else 0
+
+    def process(self, x):
+        """x 为 chunk 个单声道样本；返回 (各频带 dB, 短 FFT 幅度谱)"""
+        mag = np.abs(np.fft.rfft(x * self.window)) + 1e-10
+        db = 20.0 * np.log10(mag)
+        out = np.empty(self.num_bars, dtype=np.float32)
+        self.high_plan.apply(db, out)
+        if self.low_plan is not None:
+            ext = np.concatenate((self.fir_tail, x))
+            self.fir_tail = ext[-(len(self.fir) - 1):]
+            dec = np.lib.stride_tricks.sliding_window_view(ext, len(self.fir))[::self.dec] @ self.fir
+            k = len(dec)
+            buf = self.low_buf
+            buf[:-k] = buf[k:]
+            buf[-k:] = dec
+            low_db = 20.0 * np.log10(np.abs(np.fft.rfft(buf * self.low_window)) + 1e-10) + self.low_gain_db
+            self.low_plan.apply(low_db, out)
+        return out, mag
+
+# ============ 模拟音频 ============
+class SyntheticAudioSource:
+    """确定性的合成音频：底鼓/踩镲节拍、贝斯音符、对数扫频和粉红噪声
+
+    模拟模式下代替声卡，生成的 PCM 与实时采集走同一条 FFT/平滑/校准/推流流程，
+    没有音频设备的机器上也能得到真实的分析负载。随机数只来自私有的 Generator，
+    相同 seed 得到逐样本相同的输出；每次 read() 整块向量化生成，相位按样本序号连续。
+    realtime=True 时像阻塞的声卡流一样，每块按 frames / rate 节流。
+    """
+    BASS_STEPS = (0, 0, 5, 7)      # 每两拍换一个贝斯音（相对 A1 的半音）
+    SWEEP_RANGE = (200.0, 4000.0)
+    PINK_TAPS = 256
+
+    def __init__(self, rate=SIM_AUDIO_RATE, seed=SIM_AUDIO_SEED, bpm=SIM_AUDIO_BPM, realtime=True):
+        _import_numpy()
+        self.rate = rate
+        self.beat = 60.0 / bpm
+        self.realtime = realtime
+        self.rng = np.random.default_rng(seed)
+        self.pos = 0
+        self._deadline = None
+        self._bass = 55.0 * 2.0 ** (np.asarray(self.BASS_STEPS) / 12.0)
+        # 1/sqrt(f) 幅度响应的 FIR，把白噪声整形成粉红噪声；保留上一块末尾样本保证连续
+        n = self.PINK_TAPS
+        f = np.arange(n // 2 + 1, dtype=np.float64)
+        f[0] = 1.0
+        kernel = np.roll(np.fft.irfft(1.0 / np.sqrt(f), n), n // 2) * np.hanning(n)
+        self._pink_kernel = kernel / np.sqrt(np.sum(kernel ** 2))
+        self._noise_tail = np.zeros(n - 1)
+
+    def read(self, frames):
+        """返回 frames 个单声道 float32 样本（约 -1~1）"""
+        t = (self.pos + np.arange(frames)) / self.rate
+        self.pos += frames
+        beat = self.beat
+        tb = t % beat
+        kick = np.sin(2.0 * np.pi * (45.0 * tb + 4.4 * (1.0 - np.exp(-tb / 0.04)))) * np.exp(-tb / 0.15)
+        white = self.rng.standard_normal(frames)
+        hat = white * np.exp(-((t + beat * 0.5) % beat) / 0.015)
+        bar = t / (2.0 * beat)
+        step = bar.astype(np.int64) % len(self._bass)
+        bass = np.sin(2.0 * np.pi * self._bass[step] * t) * np.exp(-(bar % 1.0) * 1.5)
+        f0, f1 = self.SWEEP_RANGE
+        period = SIM_AUDIO_SWEEP_SEC
+        ratio = math.log(f1 / f0)
+        tau = t % period
+        sweep = np.sin(2.0 * np.pi * f0 * period / ratio * np.expm1(tau / period * ratio))
+        noise = np.concatenate((self._noise_tail, white))
+        pink = np.convolve(noise, self._pink_kernel, mode="valid")
+        self._noise_tail = noise[-(self.PINK_TAPS - 1):]
+        out = (0.35 * kick + 0.08 * hat + 0.2 * bass + 0.12 * sweep + 0.03 * pink).astype(np.float32)
+        if self.realtime:
+            now = time.perf_counter()
+            if self._deadline is None or now - self._deadline > 0.5:
+                # 首次读取或落后太多（如调试暂停）时重新对齐，不追赶
+                self._deadline = now
+            self._deadline += frames / self.rate
+            delay = self._deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return out
+
+# ============ 音频设备管理 ============
+def _default_device_signature():
+    """(输出设备数, 默认输出设备 id)，用于发现设备插拔和默认设备切换
+
+    PortAudio 的设备列表在初始化时就固定了，要看到变化只能重新初始化；这里改用 winmm
+    查询，每次只需几微秒，可以在音频线程里定期调用。非 Windows 返回 None（不检测）。
+    """
+    winmm = _winmm()
+    if winmm is None:
+        return None
+    try:
+        count = winmm.waveOutGetNumDevs()
+        preferred = ctypes.c_uint(0)
+        flags = ctypes.c_uint(0)
+        # DRVM_MAPPER_PREFERRED_GET：向 WAVE_MAPPER 查询当前首选（默认）输出设备
+        err = winmm.waveOutMessage(_WAVE_MAPPER, _DRVM_MAPPER_PREFERRED_GET,
+                                   ctypes.byref(preferred), ctypes.byref(flags))
+    except (OSError, ctypes.ArgumentError) as e:
+        print(f"⚠️  [develop]查询默认输出设备失败: {e}")
+        return None
+    return (count, preferred.value if err == 0 else None)
+
+
+_WAVE_MAPPER = ctypes.c_void_p(0xFFFFFFFF)   # (HWAVEOUT)WAVE_MAPPER
+_DRVM_MAPPER_PREFERRED_GET = 0x2015
+_WINMM = None
+
+
+def _winmm():
+    """加载 winmm 并声明用到的函数原型；64 位下指针参数必须经 argtypes 按指针宽度传递"""
+    global _WINMM
+    if _WINMM is None:
+        windll = getattr(ctypes, "windll", None)
+        if windll is None:
+            _WINMM = False
+        else:
+            winmm = windll.winmm
+            winmm.waveOutGetNumDevs.argtypes = []
+            winmm.waveOutGetNumDevs.restype = ctypes.c_uint
+            winmm.waveOutMessage.argtypes = [ctypes.c_void_p, ctypes.c_uint,
+                                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint)]
+            winmm.waveOutMessage.restype = ctypes.c_uint
+            _WINMM = winmm
+    return _WINMM or None
+
+
+class AudioDeviceManager:
+    """跨多次启动律动条复用 PortAudio 实例、设备枚举和上次成功打开的参数
+
+    open() 优先按缓存参数直接打开，不重新枚举、不重复打印设备表；缓存失效（设备已不存在、
+    回环时默认输出设备已换）才依次尝试 WASAPI 回环、默认输入和任意输入设备。
+    changed() 比较打开时与当前的设备签名；流读取失败或设备变化时由 _AudioWorker 调用
+    open(refresh=True) 重新初始化 PortAudio 刷新设备列表；旧实例上仍有流未关闭（交接中的旧
+    采集线程可能还阻塞在 read()）时只将其退役，等最后一个流 close() 后再 terminate。
+    backend 为 PyAudio 模块或接口相同的替身，默认使用 _load_audio_backend() 导入的模块。
+    """
+    def __init__(self, backend=None, signature=_default_device_signature):
+        self._backend = backend
+        self.signature = signature
+        self._lock = threading.Lock()
+        self.pa = None
+        self.devices = None
+        self.last_params = None
+        self.device_signature = None
+        self._stream_pa = {}   # 未关闭的流 -> 打开它的 PortAudio 实例
+        self.enumerations = 0
+        self.opens = 0
+        self.cached_opens = 0
+
+    @property
+    def backend(self):
+        return self._backend or PA
+
+    def available(self):
+        return self._backend is not None or (_load_audio_backend() and PA is not None)
+
+    def snapshot(self):
+        params = self.last_params
+        return {
+            "device": params["name"] if params else None,
+            "kind": params["kind"] if params else None,
+            "rate": params["rate"] if params else None,
+            "channels": params["channels"] if params else None,
+            "enumerations": self.enumerations,
+            "opens": self.opens,
+            "cached_opens": self.cached_opens,
+        }
+
+    def open(self, chunk, refresh=False):
+        """打开采集流，返回 (stream, rate, channels)；全部方式失败返回 None
+
+        refresh=True 时先重新初始化 PortAudio，用于设备插拔、默认设备切换之后。
+        """
+        with self._lock:
+            t0 = _PERF_AUDIO_OPEN.begin()
+            try:
+                self.device_signature = self.signature()
+                if refresh:
+                    self._terminate()
+                self._ensure_devices()
+                if self.last_params is not None:
+                    opened = self._open_cached(chunk)
+                    if opened:
+                        self.cached_opens += 1
+                        return opened
+                for method in (self._try_wasapi_loopback, self._try_default_input, self._try_any_input_device):
+                    try:
+                        opened = method(chunk)
+                        if opened:
+                            print(f"✅ [develop]成功使用 {method.__name__} 打开音频流")
+                            return opened
+                    except Exception as e:
+                        print(f"⚠️  {method.__name__} 失败: {e}")
+                return None
+            finally:
+                _PERF_AUDIO_OPEN.end(t0)
+
+    def changed(self):
+        """打开之后是否有设备插拔或默认输出设备切换"""
+        sig = self.signature()
+        return sig is not None and self.device_signature is not None and sig != self.device_signature
+
+    def close(self, stream):
+        """只关闭流，PortAudio 实例留给下一次打开；已退役的实例在其最后一个流关闭后 terminate"""
+        if stream is None:
+            return
+        try:
+            if hasattr(stream, "is_active") and stream.is_active():
+                stream.stop_stream()
+        except Exception:
+            pass
+        try:
+            stream.close()
+        except Exception:
+            pass
+        with self._lock:
+            pa = self._stream_pa.pop(stream, None)
+            if pa is not None and pa is not self.pa and pa not in self._stream_pa.values():
+                self._terminate_pa(pa)
 
-    def _open_audio_stream(self):
-        if not AUDIO_AVAILABLE or PA is None:
-            print("⚠️  [develop]音频库不可用，启用模拟模式")
-            self.simulation_mode = True
-            return False
+    def _terminate(self):
+        if self.pa is not None and self.pa not in self._stream_pa.values():
+            self._terminate_pa(self.pa)
+        self.pa = None
+        self.devices = None
+
+    @staticmethod
+    def _terminate_pa(pa):
         try:
-            self.p = PA.PyAudio()
-            print(f"✅ [develop]成功初始化 PyAudio，版本: {PA.__version__}")
+            pa.terminate()
+        except Exception:
+            pass
+
+    def _ensure_devices(self):
+        if self.pa is None:
+            self.pa = self.backend.PyAudio()
+            print(f"✅ [develop]成功初始化 PyAudio，版本: {self.backend.__version__}")
+        if self.devices is None:
+            self.devices = []
             print("\n=== 可用音频设备 ===")
-            for i in range(self.p.get_device_count()):
+            for i in range(self.pa.get_device_count()):
                 try:
-                    dev_info = self.p.get_device_info_by_index(i)
-                    print(f"[{i}] {dev_info['name']}")
-                    print(f"   输入通道: {dev_info['maxInputChannels']}, 输出通道: {dev_info['maxOutputChannels']}")
-                    print(f"   默认采样率: {dev_info['defaultSampleRate']}")
-                except:
-                    pass
-            print("===================\n")
-            stream_methods = [
-                self._try_wasapi_loopback,
-                self._try_default_input,
-                self._try_any_input_device
-            ]
-            for method in stream_methods:
-                try:
-                    stream = method()
-                    if stream:
-                        print(f"✅ [develop]成功使用 {method.__name__} 打开音频流")
-                        self.stream = stream
-                        return True
-                except Exception as e:
-                    print(f"⚠️  {method.__name__} 失败: {e}")
+                    dev_info = self.pa.get_device_info_by_index(i)
+                except Exception:
                     continue
-            print("❌ [develop]所有音频打开方式都失败，启用模拟模式")
-            self.simulation_mode = True
-            return False
+                self.devices.append(dev_info)
+                print(f"[{i}] {dev_info['name']}")
+                print(f"   输入通道: {dev_info['maxInputChannels']}, 输出通道: {dev_info['maxOutputChannels']}")
+                print(f"   默认采样率: {dev_info['defaultSampleRate']}")
+            print("===================\n")
+            self.enumerations += 1
+
+    def _open_params(self, chunk, kind, dev_info, channels, rate, loopback=False):
+        kwargs = {"as_loopback": True} if loopback else {}
+        stream = self.pa.open(
+            format=self.backend.paInt16,
+            channels=channels,
+            rate=rate,
+            input=True,
+            frames_per_buffer=chunk,
+            input_device_index=dev_info["index"],
+            **kwargs
+        )
+        self._stream_pa[stream] = self.pa
+        self.last_params = {"kind": kind, "name": dev_info["name"], "rate": rate,
+                            "channels": channels, "loopback": loopback}
+        self.opens += 1
+        return stream, rate, channels
+
+    def _open_cached(self, chunk):
+        params = self.last_params
+        if params["kind"] == "wasapi_loopback":
+            # 回环跟随默认输出设备，默认设备换了就不再使用缓存的设备
+            try:
+                wasapi_info = self.pa.get_host_api_info_by_type(self.backend.paWASAPI)
+                dev_info = self.pa.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
+            except Exception:
+                return None
+            if dev_info["name"] != params["name"]:
+                return None
+        else:
+            # 重新枚举后设备序号可能变化，按名称查找
+            dev_info = next((d for d in self.devices if d["name"] == params["name"]), None)
+            if dev_info is None:
+                return None
+        try:
+            opened = self._open_params(chunk, params["kind"], dev_info, params["channels"],
+                                       params["rate"], params["loopback"])
         except Exception as e:
-            print(f"❌ [develop]PyAudio 初始化失败: {e}")
-            self.simulation_mode = True
-            return False
+            print(f"⚠️  [develop]按缓存参数打开 {params['name']} 失败: {e}")
+            return None
+        print(f"✅ [develop]按缓存参数打开音频设备: {params['name']}")
+        return opened
 
-    def _try_wasapi_loopback(self):
+    def _try_wasapi_loopback(self, chunk):
         try:
-            wasapi_info = self.p.get_host_api_info_by_type(PA.paWASAPI)
+            wasapi_info = self.pa.get_host_api_info_by_type(self.backend.paWASAPI)
             print(f"✅ [develop]检测到 WASAPI，默认输出设备索引: {wasapi_info['defaultOutputDevice']}")
-            default_out = self.p.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
+            default_out = self.pa.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
             rate = int(default_out.get("defaultSampleRate", 48000)) or 48000
             print(f"📊 [develop]设备信息:")
             print(f"   名称: {default_out['name']}")
             print(f"   采样率: {rate} Hz")
             print(f"   输出通道数: {default_out.get('maxOutputChannels', 2)}")
             try:
-                stream = self.p.open(
-                    format=PA.paInt16,
-                    channels=min(2, int(default_out.get("maxOutputChannels", 2))),
-                    rate=rate,
-                    input=True,
-                    frames_per_buffer=self.chunk,
-                    input_device_index=default_out["index"],
-                    as_loopback=True
-                )
-                self.rate = rate
-                return stream
+                return self._open_params(chunk, "wasapi_loopback", default_out,
+                                         min(2, int(default_out.get("maxOutputChannels", 2))), rate, True)
             except Exception as e:
                 print(f"⚠️  [develop]直接回环失败: {e}")
             print("🔍 [develop]搜索回环设备...")
-            for i in range(self.p.get_device_count()):
+            for dev_info in self.devices:
                 try:
-                    dev_info = self.p.get_device_info_by_index(i)
                     if "loopback" in dev_info['name'].lower() or "立体声混音" in dev_info['name']:
                         print(f"✅ [develop]找到回环设备: {dev_info['name']}")
-                        rate = int(dev_info["defaultSampleRate"])
-                        channels = min(2, int(dev_info.get("maxInputChannels", 2)))
-                        stream = self.p.open(
-                            format=PA.paInt16,
-                            channels=channels,
-                            rate=rate,
-                            input=True,
-                            frames_per_buffer=self.chunk,
-                            input_device_index=i
-                        )
-                        self.rate = rate
-                        return stream
+                        return self._open_params(chunk, "loopback_device", dev_info,
+                                                 min(2, int(dev_info.get("maxInputChannels", 2))),
+                                                 int(dev_info["defaultSampleRate"]))
                 except:
                     continue
             return None
@@ -383,131 +1301,202 @@ class _AudioWorker:
             print(f"⚠️  [develop]WASAPI 检测失败: {e}")
             return None
 
-    def _try_default_input(self):
+    def _try_default_input(self, chunk):
         try:
-            default_input = self.p.get_default_input_device_info()
+            default_input = self.pa.get_default_input_device_info()
             rate = int(default_input.get("defaultSampleRate", 48000))
             channels = min(2, int(default_input.get("maxInputChannels", 1)))
             print(f"🎤 [develop]使用默认输入设备: {default_input['name']}")
             print(f"   [develop]采样率: {rate} Hz, 通道数: {channels}")
-            stream = self.p.open(
-                format=PA.paInt16,
-                channels=channels,
-                rate=rate,
-                input=True,
-                frames_per_buffer=self.chunk,
-                input_device_index=default_input["index"]
-            )
-            self.rate = rate
-            return stream
+            return self._open_params(chunk, "default_input", default_input, channels, rate)
         except Exception as e:
             print(f"⚠️  [develop]默认输入设备失败: {e}")
             return None
 
-    def _try_any_input_device(self):
+    def _try_any_input_device(self, chunk):
+        for dev_info in self.devices:
+            try:
+                if dev_info.get("maxInputChannels", 0) > 0:
+                    rate = int(dev_info.get("defaultSampleRate", 48000))
+                    channels = min(2, int(dev_info.get("maxInputChannels", 1)))
+                    print(f"🔊 [develop]尝试输入设备 [{dev_info['index']}]: {dev_info['name']}")
+                    return self._open_params(chunk, "any_input", dev_info, channels, rate)
+            except Exception:
+                continue
+        return None
+
+
+# 进程内唯一，律动条关闭再打开时沿用已打开过的设备
+AUDIO_DEVICES = AudioDeviceManager()
+
+# ============ 改进的音频线程 ============
+class _AudioWorker:
+    def __init__(self, num_bars, on_levels, stop_event: threading.Event, calibrator=None, publisher=None,
+                 devices=None, wait_for=None):
+        _import_numpy()
+        self.num_bars = num_bars
+        self.on_levels = on_levels
+        self.stop_event = stop_event
+        self.calibrator = calibrator
+        self.publisher = publisher
+        self.devices = devices or AUDIO_DEVICES
+        self.wait_for = wait_for
+        self.min_db = AUDIO_MIN_DB
+        self.max_db = AUDIO_MAX_DB
+        self.smooth_alpha = AUDIO_SMOOTH_ALPHA
+        self.peak_decay = 1.0
+        self.stream = None
+        self.rate = 48000
+        self.channels = 1
+        self._last_device_check = 0.0
+        self.chunk = AUDIO_CHUNK
+        self._fft_dirty = False
+        self.analyzer = None
+        self.freqs = None
+        self.display_levels = np.zeros(self.num_bars, dtype=np.float32)
+        self._update_throttle = 0.033
+        self._last_update = 0.0
+        self.simulation_mode = False
+        self.synth = None
+
+    def _open_audio_stream(self):
+        if FORCE_AUDIO_SIMULATION:
+            print("🎵 [develop]已强制启用模拟模式")
+            self.simulation_mode = True
+            return False
+        if not self.devices.available():
+            print("⚠️  [develop]音频库不可用，启用模拟模式")
+            self.simulation_mode = True
+            return False
         try:
-            for i in range(self.p.get_device_count()):
-                try:
-                    dev_info = self.p.get_device_info_by_index(i)
-                    if dev_info.get("maxInputChannels", 0) > 0:
-                        rate = int(dev_info.get("defaultSampleRate", 48000))
-                        channels = min(2, int(dev_info.get("maxInputChannels", 1)))
-                        print(f"🔊 [develop]尝试输入设备 [{i}]: {dev_info['name']}")
-                        stream = self.p.open(
-                            format=PA.paInt16,
-                            channels=channels,
-                            rate=rate,
-                            input=True,
-                            frames_per_buffer=self.chunk,
-                            input_device_index=i
-                        )
-                        self.rate = rate
-                        return stream
-                except Exception as e:
-                    continue
-            return None
+            opened = self.devices.open(self.chunk)
         except Exception as e:
-            print(f"⚠️  [develop]所有输入设备尝试失败: {e}")
-            return None
+            print(f"❌ [develop]PyAudio 初始化失败: {e}")
+            self.simulation_mode = True
+            return False
+        if opened is None:
+            print("❌ [develop]所有音频打开方式都失败，启用模拟模式")
+            self.simulation_mode = True
+            return False
+        self.stream, self.rate, self.channels = opened
+        self._last_device_check = time.monotonic()
+        return True
+
+    def _reconnect(self, reason):
+        """流失效或设备变化后重新打开，失败时指数退避；停止事件置位时放弃"""
+        print(f"⚠️  [develop]{reason}，重新连接音频设备...")
+        _PERF_AUDIO_RECONNECTS.add()
+        self.devices.close(self.stream)
+        self.stream = None
+        # 第一次先按缓存参数直接打开（设备短暂出错时最快），之后每次都刷新设备列表
+        refresh = self.devices.changed()
+        delay = AUDIO_RECONNECT_MIN_SEC
+        while not self.stop_event.is_set():
+            try:
+                opened = self.devices.open(self.chunk, refresh=refresh)
+            except Exception as e:
+                print(f"⚠️  [develop]重新打开音频设备失败: {e}")
+                opened = None
+            if opened:
+                rate = self.rate
+                self.stream, self.rate, self.channels = opened
+                if self.rate != rate:
+                    self._fft_dirty = True
+                self._last_device_check = time.monotonic()
+                return True
+            refresh = True
+            print(f"⏳ [develop]{delay:.1f}s 后重试")
+            self.stop_event.wait(delay)
+            delay = min(delay * 2.0, AUDIO_RECONNECT_MAX_SEC)
+        return False
+
+    def reload_config(self):
+        """配置热重载：分析参数立即生效，FFT 参数变化时由音频线程重建频带"""
+        self.min_db = AUDIO_MIN_DB
+        self.max_db = AUDIO_MAX_DB
+        self.smooth_alpha = AUDIO_SMOOTH_ALPHA
+        if self.chunk != AUDIO_CHUNK:
+            self.chunk = AUDIO_CHUNK
+            self._fft_dirty = True
+        if self.analyzer is not None and self._multires_key != (MULTIRES_DECIMATION, MULTIRES_LOW_FFT):
+            self._fft_dirty = True
 
     def _prepare_fft_bands(self):
-        self.freqs = np.fft.rfftfreq(self.chunk, d=1.0 / self.rate)
-        f_min, f_max = 20.0, min(20000.0, self.rate / 2.0)
-        edges = np.geomspace(f_min, f_max, self.num_bars + 1)
-        self.band_idx = []
-        for i in range(self.num_bars):
-            lo, hi = edges[i], edges[i + 1]
-            sel = np.where((self.freqs >= lo) & (self.freqs < hi))[0]
-            if sel.size == 0:
-                center = math.sqrt(lo * hi)
-                nearest = int(np.argmin(np.abs(self.freqs - center)))
-                sel = np.array([nearest], dtype=int)
-            self.band_idx.append(sel)
-
-    def _generate_simulation_data(self):
-        self.simulation_time += 0.05
-        self.simulation_freq = 5.0 + 4.0 * math.sin(self.simulation_time * 0.3)
-        np.random.seed(int(self.simulation_time * 10))
-        base = np.random.randn(self.num_bars) * 0.3
-        for i in range(self.num_bars):
-            freq = 0.1 + 0.9 * (i / self.num_bars)
-            base[i] += 0.5 * math.sin(self.simulation_time * freq * self.simulation_freq)
-        levels = (base - base.min()) / (base.max() - base.min() + 1e-10)
-        if np.random.random() < 0.1:
-            peak_pos = np.random.randint(0, self.num_bars)
-            levels[peak_pos] = 1.0
-        return levels.astype(np.float32)
+        self.analyzer = SpectrumAnalyzer(self.num_bars, self.rate, self.chunk)
+        self._multires_key = (MULTIRES_DECIMATION, MULTIRES_LOW_FFT)
+        self.freqs = self.analyzer.freqs
+
+    def _read_frame(self):
+        """读取一帧单声道 float32 样本；返回 None 表示本轮没有数据"""
+        if self.simulation_mode:
+            return self.synth.read(self.chunk)
+        now_m = time.monotonic()
+        if now_m - self._last_device_check >= AUDIO_DEVICE_CHECK_SEC:
+            self._last_device_check = now_m
+            if self.devices.changed():
+                self._reconnect("音频设备已变化")
+                return None
+        try:
+            buf = self.stream.read(self.chunk, exception_on_overflow=False)
+        except Exception as e:
+            self._reconnect(f"读取音频流失败: {e}")
+            return None
+        data = np.frombuffer(buf, dtype=np.int16).astype(np.float32) / 32768.0
+        if self.channels >= 2:
+            try:
+                data = data.reshape(-1, self.channels).mean(axis=1)
+            except Exception:
+                pass
+        return data[:self.chunk]
+
+    def _process_frame(self, data):
+        t0 = _PERF_DSP.begin()
+        band_vals, mag = self.analyzer.process(data)
+        # 合成音频与正在播放的歌曲无关，送进校准器只会估出虚假的延迟
+        if self.calibrator is not None and self.calibrator.enabled and not self.simulation_mode:
+            self.calibrator.push(mag, self.freqs, self.chunk / self.rate)
+        levels = (band_vals - self.min_db) / (self.max_db - self.min_db)
+        levels = np.clip(levels, 0.0, 1.0)
+        prev = self.display_levels
+        up = np.maximum(levels, prev * (1.0 - self.peak_decay))
+        smoothed = self.smooth_alpha * prev + (1.0 - self.smooth_alpha) * up
+        self.display_levels = smoothed
+        _PERF_DSP.end(t0)
+        _PERF_AUDIO_FRAMES.add()
+        if self.publisher is not None and self.publisher.active:
+            self.publisher.publish(smoothed)
+        now_t = time.perf_counter()
+        if now_t - self._last_update >= self._update_throttle:
+            self._last_update = now_t
+            self.on_levels(self.display_levels.copy())
 
     def run(self):
+        if self.wait_for is not None:
+            # 上一个 worker 可能还阻塞在 read() 中，等它关掉采集流再打开，避免两路流同时存在
+            self.wait_for.join(AUDIO_HANDOFF_TIMEOUT_SEC)
+            self.wait_for = None
         if not self._open_audio_stream():
-            print("🎵 [develop]进入模拟模式，律动条将显示模拟波形")
+            print("🎵 [develop]进入模拟模式，律动条将显示合成音频的频谱")
             self.simulation_mode = True
-        if not self.simulation_mode and self.stream:
+        if self.simulation_mode:
+            self.synth = SyntheticAudioSource(realtime=SIM_AUDIO_REALTIME)
+            self.rate = self.synth.rate
+        if self.simulation_mode or self.stream:
             self._prepare_fft_bands()
-            window = np.hanning(self.chunk).astype(np.float32)
         print("▶️  [develop]开始音频处理循环...")
         while not self.stop_event.is_set():
             try:
-                if self.simulation_mode:
-                    levels = self._generate_simulation_data()
-                    self.display_levels = levels
-                    now_t = time.perf_counter()
-                    if now_t - self._last_update >= self._update_throttle:
-                        self._last_update = now_t
-                        self.on_levels(self.display_levels.copy())
-                    time.sleep(self._update_throttle)
-                elif self.stream:
-                    try:
-                        buf = self.stream.read(self.chunk, exception_on_overflow=False)
-                    except Exception as e:
-                        print(f"⚠️  [develop]读取音频流失败: {e}")
-                        time.sleep(0.1)
-                        continue
-                    data = np.frombuffer(buf, dtype=np.int16).astype(np.float32) / 32768.0
-                    if getattr(self.stream, "_channels", 1) >= 2:
-                        try:
-                            data = data.reshape(-1, self.stream._channels).mean(axis=1)
-                        except Exception:
-                            pass
-                    x = data[:self.chunk] * window
-                    spec = np.fft.rfft(x)
-                    mag = np.abs(spec) + 1e-10
-                    db = 20.0 * np.log10(mag)
-                    band_vals = np.empty(self.num_bars, dtype=np.float32)
-                    for i, sel in enumerate(self.band_idx):
-                        band_vals[i] = db[sel].max()
-                    levels = (band_vals - self.min_db) / (self.max_db - self.min_db)
-                    levels = np.clip(levels, 0.0, 1.0)
-                    prev = self.display_levels
-                    up = np.maximum(levels, prev * (1.0 - self.peak_decay))
-                    smoothed = self.smooth_alpha * prev + (1.0 - self.smooth_alpha) * up
-                    self.display_levels = smoothed
-                    now_t = time.perf_counter()
-                    if now_t - self._last_update >= self._update_throttle:
-                        self._last_update = now_t
-                        self.on_levels(self.display_levels.copy())
-                else:
+                if not (self.simulation_mode or self.stream):
                     time.sleep(0.1)
+                    continue
+                if self._fft_dirty:
+                    self._fft_dirty = False
+                    self._prepare_fft_bands()
+                t0 = _PERF_AUDIO_READ.begin()
+                data = self._read_frame()
+                _PERF_AUDIO_READ.end(t0)
+                if data is not None:
+                    self._process_frame(data)
             except Exception as e:
                 print(f"⚠️  [develop]音频处理异常: {e}")
                 time.sleep(0.1)
@@ -515,26 +1504,398 @@ class _AudioWorker:
 
     def _cleanup(self):
         print("🧹 [develop]清理音频资源...")
-        try:
-            if self.stream and hasattr(self.stream, 'is_active') and self.stream.is_active():
-                self.stream.stop_stream()
-        except Exception:
-            pass
-        try:
-            if self.stream:
-                self.stream.close()
-        except Exception:
-            pass
-        try:
-            if self.p:
-                self.p.terminate()
-        except Exception:
-            pass
+        self.devices.close(self.stream)
+        self.stream = None
+
+# ============ 音画延迟校准 ============
+class LatencyCalibrator:
+    """估计系统输出声音相对网页 currentTime 的延迟
+
+    音频线程每个 FFT 帧调用 push()：人声频段的谱通量（对数幅度正向差分之和）作为起始强度，
+    连同该帧对应的播放时间存入定长环形缓冲。每隔 CALIB_INTERVAL_SEC 取最近 CALIB_WINDOW_SEC
+    重采样成等间隔包络，与逐字歌词字起始时间生成的期望起始序列做 FFT 互相关，峰值所在的
+    滞后即为延迟。每次只处理固定长度的窗口，开销与歌曲长度无关。
+
+    clock() 返回未校准的播放时间，时间冻结（暂停）时返回 None。offset 为正表示声音晚于
+    currentTime，_now_playback_time 会减去它。
+    """
+    def __init__(self, clock):
+        _import_numpy()
+        self.clock = clock
+        self.enabled = CALIBRATION_ENABLED
+        self.offset = 0.0
+        self.confidence = 0.0
+        self.estimates = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._onsets = np.zeros(0)
+        self._t = np.zeros(CALIB_RING_SIZE)
+        self._v = np.zeros(CALIB_RING_SIZE)
+        self._pos = 0
+        self._count = 0
+        self._prev_log = None
+        self._band = None
+        self._band_key = None
+        self._last_t = None
+        self._last_estimate_t = None
+        sigma = CALIB_ONSET_SIGMA * CALIB_ENV_RATE
+        k = np.arange(-int(3 * sigma) - 1, int(3 * sigma) + 2)
+        self._kernel = np.exp(-0.5 * (k / sigma) ** 2)
+
+    def set_onsets(self, onsets):
+        """切歌时设置期望的字起始时间（秒），并清空已积累的窗口"""
+        arr = np.unique(np.asarray(onsets, dtype=np.float64))
+        with self._lock:
+            self._onsets = arr
+            self._reset_window()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+
+    def _reset_window(self):
+        self._count = 0
+        self._prev_log = None
+        self._last_t = None
+        self._last_estimate_t = None
+
+    def push(self, mag, freqs, frame_sec):
+        """音频线程调用：mag 为本帧幅度谱，frame_sec 为帧长（秒）"""
+        t = self.clock()
+        with self._lock:
+            if t is None:
+                self._prev_log = None
+                return
+            t -= frame_sec * 0.5    # read() 返回时整帧已采集完，取帧中心
+            if self._last_t is not None and not (-0.1 <= t - self._last_t <= CALIB_MAX_GAP_SEC):
+                # 跳转后旧数据与新位置无法对齐，重新积累
+                self._reset_window()
+            self._last_t = t
+            key = (len(freqs), float(freqs[-1]))
+            if key != self._band_key:
+                lo, hi = CALIB_VOCAL_BAND
+                sel = np.where((freqs >= lo) & (freqs < hi))[0]
+                self._band = slice(int(sel[0]), int(sel[-1]) + 1) if sel.size else slice(0, len(freqs))
+                self._band_key = key
+                self._prev_log = None
+            logm = np.log(mag[self._band])
+            flux = 0.0 if self._prev_log is None else float(np.maximum(logm - self._prev_log, 0.0).sum())
+            self._prev_log = logm
+            self._t[self._pos] = t
+            self._v[self._pos] = flux
+            self._pos = (self._pos + 1) % CALIB_RING_SIZE
+            self._count = min(self._count + 1, CALIB_RING_SIZE)
+            if self._last_estimate_t is None:
+                self._last_estimate_t = t
+            elif t - self._last_estimate_t >= CALIB_INTERVAL_SEC:
+                self._last_estimate_t = t
+                t0 = _PERF_CALIBRATE.begin()
+                self._estimate()
+                _PERF_CALIBRATE.end(t0)
+
+    def _estimate(self):
+        n = self._count
+        idx = (self._pos - n + np.arange(n)) % CALIB_RING_SIZE
+        ts = np.maximum.accumulate(self._t[idx])
+        vs = self._v[idx]
+        t_end = ts[-1]
+        t_start = max(ts[0], t_end - CALIB_WINDOW_SEC)
+        if t_end - t_start < CALIB_WINDOW_SEC * 0.5:
+            return None
+        lo_i, hi_i = np.searchsorted(self._onsets, (t_start, t_end))
+        if hi_i - lo_i < CALIB_MIN_ONSETS:
+            return None
+        grid = np.arange(t_start, t_end, 1.0 / CALIB_ENV_RATE)
+        size = len(grid)
+        env = np.convolve(np.interp(grid, ts, vs), self._kernel, mode="same")
+        expected = np.zeros(size)
+        pos = np.round((self._onsets[lo_i:hi_i] - t_start) * CALIB_ENV_RATE).astype(int)
+        np.add.at(expected, pos[pos < size], 1.0)
+        expected = np.convolve(expected, self._kernel, mode="same")
+        env = (env - env.mean()) / (env.std() + 1e-12)
+        expected = (expected - expected.mean()) / (expected.std() + 1e-12)
+
+        # 补零后的循环互相关等于线性互相关：corr[k] = sum(env[i + k] * expected[i])
+        max_lag = int(CALIB_MAX_OFFSET_SEC * CALIB_ENV_RATE)
+        nfft = 1 << (size + max_lag - 1).bit_length()
+        corr = np.fft.irfft(np.fft.rfft(env, nfft) * np.conj(np.fft.rfft(expected, nfft)), nfft) / size
+        lags = np.concatenate((corr[nfft - max_lag:], corr[:max_lag + 1]))
+        k = int(np.argmax(lags))
+        peak = float(lags[k])
+        self.confidence = peak
+        if peak < CALIB_MIN_CONFIDENCE or k == 0 or k == len(lags) - 1:
+            # 相关太弱（间奏、说唱、伴奏过强）或峰值落在搜索边界，不采纳
+            self.rejected += 1
+            return None
+        y0, y1, y2 = lags[k - 1], lags[k], lags[k + 1]
+        denom = y0 - 2.0 * y1 + y2
+        frac = 0.5 * (y0 - y2) / denom if denom != 0 else 0.0
+        lag_sec = float((k - max_lag + frac) / CALIB_ENV_RATE)
+        if self.estimates == 0:
+            self.offset = lag_sec
+        else:
+            self.offset += CALIB_SMOOTHING * (lag_sec - self.offset)
+        self.estimates += 1
+        return lag_sec
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "offset_ms": round(self.offset * 1000.0, 1),
+            "confidence": round(self.confidence, 3),
+            "estimates": self.estimates,
+            "rejected": self.rejected,
+        }
+
+# ============ 帧调度 ============
+class FrameScheduler:
+    """按 perf_counter 上的绝对截止时间调度动画帧
+
+    下一帧截止时间 = 上一帧截止时间 + 周期，after 的延迟由截止时间减去当前时间得出，
+    因此本帧的耗时和 after 的毫秒取整都不会累积成漂移。已经错过的帧直接跳过，
+    不会排队补帧。
+    """
+    def __init__(self):
+        self.deadline = None
+        self.period = 0.0
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.skipped_frames = 0
+
+    def frame_started(self, now):
+        """记录一帧开始，返回是否错过截止时间（迟到超过半个周期）"""
+        self.frames += 1
+        if self.deadline is None:
+            return False
+        missed = now - self.deadline > max(0.002, self.period * 0.5)
+        if missed:
+            self.missed_deadlines += 1
+        return missed
+
+    def next_delay_ms(self, fps, now):
+        fps = max(1, min(fps, 144))
+        period = 1.0 / fps
+        base = self.deadline if self.deadline is not None else now
+        if period != self.period:
+            # 帧率切换时以当前时刻为基准，避免沿用旧周期的相位
+            base = max(base, now - period)
+        deadline = base + period
+        if deadline <= now:
+            skipped = int((now - deadline) // period) + 1
+            self.skipped_frames += skipped
+            deadline += skipped * period
+        self.deadline = deadline
+        self.period = period
+        return max(0, int(round((deadline - now) * 1000.0)))
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "target_period_ms": round(self.period * 1000.0, 3),
+            "missed_deadlines": self.missed_deadlines,
+            "skipped_frames": self.skipped_frames,
+        }
+
+# ============ 自适应画质 ============
+class QualityGovernor:
+    """根据帧耗时和掉帧情况自动升降画质（带滞回）
+
+    animation_tick 报告每帧耗时与是否错过截止时间，律动条报告每次刷新耗时；
+    每个统计窗口结束时计算掉帧比例和界面线程忙碌比例，决定是否切换档位。
+    on_change(old_level, new_level) 在界面线程中调用，由调用方重建受影响的部分。
+    snapshot() 由 WebSocket 线程调用，history 的写入和复制都在 _lock 内进行。
+    """
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.enabled = QUALITY_GOVERNOR_ENABLED
+        self.level = 0
+        self.history = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._window_start = time.perf_counter()
+        self._frames = 0
+        self._missed = 0
+        self._busy = 0.0
+        self._last_change = self._window_start
+        self._good_since = None
+        self.last_window = {}
+
+    @property
+    def profile(self):
+        return QUALITY_LEVELS[self.level]
+
+    def report_frame(self, work_sec, missed):
+        self._frames += 1
+        self._busy += work_sec
+        if missed:
+            self._missed += 1
+        now = time.perf_counter()
+        if now - self._window_start >= QUALITY_WINDOW_SEC:
+            self._evaluate(now)
+
+    def report_bars(self, work_sec):
+        self._busy += work_sec
+
+    def _evaluate(self, now):
+        elapsed = now - self._window_start
+        miss_ratio = self._missed / self._frames if self._frames else 0.0
+        busy = self._busy / elapsed
+        self.last_window = {"frames": self._frames, "miss_ratio": round(miss_ratio, 3), "busy": round(busy, 3)}
+        self._window_start = now
+        self._frames = 0
+        self._missed = 0
+        self._busy = 0.0
+        if not self.enabled or now - self._last_change < QUALITY_MIN_DWELL_SEC:
+            return
+        if miss_ratio > QUALITY_DOWN_MISS_RATIO or busy > QUALITY_DOWN_BUSY:
+            self._good_since = None
+            if self.level < len(QUALITY_LEVELS) - 1:
+                self._set_level(self.level + 1, f"掉帧 {miss_ratio:.0%}，忙碌 {busy:.0%}", now)
+        elif miss_ratio < QUALITY_UP_MISS_RATIO and busy < QUALITY_UP_BUSY:
+            if self._good_since is None:
+                self._good_since = now
+            elif now - self._good_since >= QUALITY_UP_HOLD_SEC and self.level > 0:
+                self._good_since = None
+                self._set_level(self.level - 1, f"余量充足，忙碌 {busy:.0%}", now)
+        else:
+            self._good_since = None
+
+    def _set_level(self, level, reason, now=None):
+        old = self.level
+        if level == old:
+            return
+        self._last_change = now or time.perf_counter()
+        with self._lock:
+            self.level = level
+            self.history.append({
+                "time": time.strftime("%H:%M:%S"),
+                "from": QUALITY_LEVELS[old]["name"],
+                "to": QUALITY_LEVELS[level]["name"],
+                "reason": reason,
+            })
+        print(f"画质调整: {QUALITY_LEVELS[old]['name']} -> {QUALITY_LEVELS[level]['name']}（{reason}）")
+        if self.on_change:
+            self.on_change(old, level)
+
+    def set_enabled(self, enabled):
+        """关闭自动调整时恢复最高画质"""
+        self.enabled = enabled
+        if not enabled:
+            self._set_level(0, "自动画质已关闭")
+
+    def snapshot(self):
+        with self._lock:
+            level = self.level
+            history = list(self.history)
+        # last_window 每个窗口整体替换，不会原地修改
+        profile = QUALITY_LEVELS[level]
+        return {
+            "enabled": self.enabled,
+            "level": level,
+            "name": profile["name"],
+            "profile": dict(profile),
+            "last_window": dict(self.last_window),
+            "history": history,
+        }
+
+# ============ 共享音频分析 ============
+def make_band_resampler(n_src, n_dst):
+    """把 n_src 个频带映射到 n_dst 根律动条：变少时每组取最大值（不丢峰值），变多时线性插值"""
+    if n_dst == n_src:
+        return lambda levels: levels
+    if n_dst < n_src:
+        starts = (np.arange(n_dst) * n_src) // n_dst
+        return lambda levels: np.maximum.reduceat(levels, starts)
+    pos = np.linspace(0.0, n_src - 1, n_dst)
+    src = np.arange(n_src)
+    return lambda levels: np.interp(pos, src, levels).astype(np.float32)
+
+
+class SpectrumSource:
+    """一路音频采集与频谱分析，结果分发给所有律动条窗口
+
+    _AudioWorker 按 VIS_MAX_BARS 个频带分析一次，每个窗口再把这组数值重采样成自己的
+    律动条数，多个显示器、多条边上的律动条不必各开一路音频流、各做一次 FFT。
+    只要有一个窗口可见就保持采集，全部隐藏时停止。
+    """
+    def __init__(self, root, calibrator=None, publisher=None):
+        self.root = root
+        self.calibrator = calibrator
+        self.publisher = publisher
+        self.num_bars = VIS_MAX_BARS
+        self.surfaces = []
+        self.worker = None
+        self.thread = None
+        self._retired = None
+        self._stop_evt = None
+
+    def add(self, surface):
+        self.surfaces.append(surface)
+        self.update_running()
+
+    def remove(self, surface):
+        if surface in self.surfaces:
+            self.surfaces.remove(surface)
+        self.update_running()
+
+    def update_running(self):
+        if any(surface._visible for surface in self.surfaces):
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        if self.worker is not None or not (FORCE_AUDIO_SIMULATION or _load_audio_backend()):
+            return
+        # 每次启动用新的停止事件，旧线程阻塞在 read() 中时也不会被重新唤醒
+        self._stop_evt = threading.Event()
+
+        def on_levels(arr):
+            try:
+                # 优化：使用 after_idle 避免高频率更新抢占事件循环
+                self.root.after_idle(self._fan_out, arr)
+            except Exception:
+                pass
+
+        self.worker = _AudioWorker(self.num_bars, on_levels, self._stop_evt, self.calibrator, self.publisher,
+                                   wait_for=self._retired)
+        self.thread = threading.Thread(target=self.worker.run, name="audio", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """只通知停止，不在界面线程 join（音频线程可能正等着 after_idle 回到界面线程）；
+        下一个 worker 打开设备前会先等旧线程退出"""
+        if self.worker is None:
+            return
+        self._stop_evt.set()
+        self._retired = self.thread
+        self.worker = None
+        self.thread = None
+
+    def restart(self):
+        """VIS_MAX_BARS 变化后按新的频带数重建分析"""
+        self.stop()
+        self.num_bars = VIS_MAX_BARS
+        self.update_running()
+
+    def reload_config(self):
+        if self.worker is not None:
+            self.worker.reload_config()
+
+    def _fan_out(self, levels):
+        for surface in self.surfaces:
+            surface.render(levels)
 
 # ============ 优化后的律动条 ============
 class VisualizerOverlay:
-    def __init__(self, root):
+    """一个律动条窗口：位置、律动条数和配色由 spec 决定，数值来自共享的 SpectrumSource"""
+    def __init__(self, root, source, governor=None, spec=None, visible=True):
+        _import_numpy()
+        spec = spec or {}
         self.root = root
+        self.source = source
+        self.governor = governor
+        quality = governor.profile if governor else QUALITY_LEVELS[0]
+        self.glow_enabled = quality["glow"]
+        max_bars = max(8, int(min(spec.get("bars", VIS_MAX_BARS), VIS_MAX_BARS) * quality["bar_scale"]))
         self.win = tk.Toplevel(self.root)
         self.win.overrideredirect(True)
         self.win.attributes("-topmost", True)
@@ -544,29 +1905,17 @@ class VisualizerOverlay:
         except Exception:
             pass
 
-        edge, tb_rect = _detect_taskbar_edge()
-        screen_w, screen_h = _get_screen_size()
-        self.strip_height_px = 80
-        self.side_strip_px = 140
-        self.bar_spacing_px = 1
-        self.min_bar_px = 2
-        self.color_mode = "gradient"
+        self.strip_height_px = VIS_STRIP_HEIGHT_PX
+        self.side_strip_px = VIS_SIDE_STRIP_PX
+        self.bar_spacing_px = VIS_BAR_SPACING_PX
+        self.min_bar_px = VIS_MIN_BAR_PX
+        self.color_mode = spec.get("color_mode", "gradient")
         self.base_color = "#00ff7f"
         self.gradient_colors = VisualEffects.gradient_color("#00ff7f", "#ff007f", 100)
         self.rainbow_offset = 0.0
         self.pulse_phase = 0.0
 
-        if edge in ("bottom", "top"):
-            win_w = screen_w
-            win_h = self.strip_height_px
-            x = 0
-            y = max(0, tb_rect.top - win_h) if edge == "bottom" else max(0, tb_rect.bottom)
-        else:
-            win_w = self.side_strip_px
-            win_h = screen_h
-            x = max(0, tb_rect.right) if edge == "left" else max(0, tb_rect.left - win_w)
-            y = 0
-
+        x, y, win_w, win_h = self._place(spec.get("edge", "auto"), spec.get("monitor", 0))
         self.vertical_layout = (win_h > win_w)
         self.win.geometry(f"{win_w}x{win_h}+{x}+{y}")
         self.canvas = tk.Canvas(self.win, width=win_w, height=win_h,
@@ -575,17 +1924,17 @@ class VisualizerOverlay:
         self.win.update_idletasks()
         self._apply_click_through_and_colorkey()
 
-        # 计算条形数量和大小（上限200）
+        # 计算条形数量和大小（上限 VIS_MAX_BARS，低画质时按比例减少）
         if not self.vertical_layout:
             full = self.min_bar_px + self.bar_spacing_px
-            self.num_bars = min(max(80, win_w // max(1, full)), 200)
+            self.num_bars = min(max(80, win_w // max(1, full)), max_bars)
             total_spacing = (self.num_bars + 1) * self.bar_spacing_px
             avail = max(1, win_w - total_spacing)
             self.bar_w = max(self.min_bar_px, avail // self.num_bars)
             self.bar_h = win_h
         else:
             full = self.min_bar_px + self.bar_spacing_px
-            self.num_bars = min(max(80, win_h // max(1, full)), 200)
+            self.num_bars = min(max(80, win_h // max(1, full)), max_bars)
             total_spacing = (self.num_bars + 1) * self.bar_spacing_px
             avail = max(1, win_h - total_spacing)
             self.bar_w = max(self.min_bar_px, (win_w - 2 * self.bar_spacing_px))
@@ -627,30 +1976,66 @@ class VisualizerOverlay:
                                                  fill=self.base_color, width=0)
                 self.bars.append(r)
 
-        # 音频处理
-        self._stop_evt = threading.Event()
-        self.worker = None
-        self.thread = None
-        self._running = False
+        # 共享频带数值重采样为本窗口的律动条数
+        self._src_bars = source.num_bars
+        self._resample = make_band_resampler(source.num_bars, self.num_bars)
 
         # 历史数据用于平滑
         self.last_levels = np.zeros(self.num_bars, dtype=np.float32)
         self.peak_levels = np.zeros(self.num_bars, dtype=np.float32)
 
-        # 尝试启动音频
-        self._start_audio()
-
         self.alive = True
-        self._visible = True
+        self._visible = visible
+        if not visible:
+            self.win.withdraw()
+        source.add(self)
 
         # 启动颜色动画
         self.rainbow_speed = 0.02
         self.pulse_speed = 0.05
         self._animate_colors()
 
+    def _place(self, edge, monitor):
+        """返回 (x, y, 宽, 高)：auto 贴在主显示器任务栏旁，否则贴在指定显示器工作区的对应边"""
+        strip, side = self.strip_height_px, self.side_strip_px
+        if edge == "auto":
+            try:
+                edge, tb_rect = _detect_taskbar_edge()
+                screen_w, screen_h = _get_screen_size()
+            except Exception:
+                # 非 Windows 环境（如无头基准测试）：贴在屏幕底部
+                screen_w, screen_h = self.win.winfo_screenwidth(), self.win.winfo_screenheight()
+                edge, tb_rect = "bottom", RECT(0, screen_h, screen_w, screen_h)
+            if edge in ("bottom", "top"):
+                y = max(0, tb_rect.top - strip) if edge == "bottom" else max(0, tb_rect.bottom)
+                return 0, y, screen_w, strip
+            x = max(0, tb_rect.right) if edge == "left" else max(0, tb_rect.left - side)
+            return x, 0, side, screen_h
+        monitors = _enumerate_monitors()
+        if monitors:
+            work = monitors[min(monitor, len(monitors) - 1)][1]
+        else:
+            work = RECT(0, 0, self.win.winfo_screenwidth(), self.win.winfo_screenheight())
+        w, h = work.right - work.left, work.bottom - work.top
+        if edge == "bottom":
+            return work.left, work.bottom - strip, w, strip
+        if edge == "top":
+            return work.left, work.top, w, strip
+        if edge == "left":
+            return work.left, work.top, side, h
+        return work.right - side, work.top, side, h
+
+    def render(self, levels):
+        if len(levels) != self._src_bars:
+            # 分析重建之前排队的旧数据
+            return
+        self._update_bars(self._resample(levels))
+
     def _animate_colors(self):
         """颜色动画循环"""
-        if self.alive and self._visible:
+        if not self.alive:
+            return
+        if self._visible:
             self.rainbow_offset = (self.rainbow_offset + self.rainbow_speed) % 1.0
             self.pulse_phase = (self.pulse_phase + self.pulse_speed) % (2 * math.pi)
         self.win.after(50, self._animate_colors)
@@ -673,6 +2058,8 @@ class VisualizerOverlay:
     def _update_bars(self, levels):
         if not self.alive or not self._visible:
             return
+        t0 = _PERF_BARS.begin()
+        t_start = time.perf_counter()
 
         # 应用平滑
         smooth_levels = 0.7 * levels + 0.3 * self.last_levels
@@ -701,7 +2088,7 @@ class VisualizerOverlay:
                 self.canvas.itemconfig(self.bars[i], fill=color)
 
                 # 发光层优化：仅状态变化时更新
-                should_glow = lv > 0.7
+                should_glow = self.glow_enabled and lv > 0.7
                 if should_glow != self.last_glow_state[i]:
                     self.last_glow_state[i] = should_glow
                     if should_glow:
@@ -727,7 +2114,7 @@ class VisualizerOverlay:
                 self.canvas.itemconfig(self.bars[i], fill=color)
 
                 # 发光层优化
-                should_glow = lv > 0.7
+                should_glow = self.glow_enabled and lv > 0.7
                 if should_glow != self.last_glow_state[i]:
                     self.last_glow_state[i] = should_glow
                     if should_glow:
@@ -737,6 +2124,17 @@ class VisualizerOverlay:
                                           glow_x1, y1 - 2, x2 + 2, y2 + 2)
                     else:
                         self.canvas.itemconfig(self.glow_bars[i], state='hidden')
+        _PERF_BARS.end(t0)
+        if self.governor is not None:
+            self.governor.report_bars(time.perf_counter() - t_start)
+
+    def set_glow(self, enabled):
+        self.glow_enabled = enabled
+        if not enabled:
+            for i, glow in enumerate(self.glow_bars):
+                if self.last_glow_state[i]:
+                    self.canvas.itemconfig(glow, state='hidden')
+                    self.last_glow_state[i] = False
 
     def _apply_click_through_and_colorkey(self):
         GWL_EXSTYLE = -20
@@ -744,6 +2142,8 @@ class VisualizerOverlay:
         WS_EX_LAYERED = 0x00080000
         WS_EX_TOOLWINDOW = 0x00000080
         LWA_COLORKEY = 0x00000001
+        if not hasattr(ctypes, "windll"):
+            return
         user32 = ctypes.windll.user32
         GetWindowLong = user32.GetWindowLongW
         SetWindowLong = user32.SetWindowLongW
@@ -805,69 +2205,462 @@ class VisualizerOverlay:
         except Exception:
             pass
 
-    def _start_audio(self):
-        if self._running or not AUDIO_AVAILABLE:
+    def show(self):
+        self.win.deiconify()
+        self.win.lift()
+        self._apply_click_through_and_colorkey()
+        self._visible = True
+        self.source.update_running()
+
+    def hide(self):
+        self._visible = False
+        self.source.update_running()
+        self.win.withdraw()
+
+    def destroy(self):
+        if not self.alive:
+            return
+        self.alive = False
+        self._visible = False
+        self.source.remove(self)
+        try:
+            self.win.destroy()
+        except Exception:
+            pass
+
+# ------- 卡拉OK着色（歌词窗口与离线渲染 lyric_export 共用）-------
+def hex_to_rgb(hx):
+    hx = hx.lstrip('#')
+    return (int(hx[0:2], 16), int(hx[2:4], 16), int(hx[4:6], 16))
+
+
+def rgb_to_hex(rgb):
+    return "#{:02X}{:02X}{:02X}".format(*rgb)
+
+
+def lerp_color_hex(a_hex, b_hex, t):
+    a = hex_to_rgb(a_hex)
+    b = hex_to_rgb(b_hex)
+    t = max(0.0, min(1.0, t))
+    return rgb_to_hex(tuple(int(round(a[i] + (b[i] - a[i]) * t)) for i in range(3)))
+
+
+def build_color_lut(color_a, color_b, steps):
+    a = hex_to_rgb(color_a)
+    b = hex_to_rgb(color_b)
+    lut = []
+    for i in range(steps + 1):
+        t = i / steps
+        eased_t = t * t * (3 - 2 * t)
+        rgb = tuple(int(round(a[j] + (b[j] - a[j]) * eased_t)) for j in range(3))
+        lut.append(rgb_to_hex(rgb))
+    return lut
+
+
+def lut_color(progress, lut):
+    progress = max(0.0, min(1.0, progress))
+    return lut[int(progress * (len(lut) - 1))]
+
+
+def word_char_progress(now, ch_start, ch_duration):
+    """逐字歌词中单个字符的高亮进度 0~1；时长或渐变时长为 0（配置允许）时直接跳变"""
+    fade_t = max(MIN_FADE_TIME, min(KARAOKE_FADE_TIME, ch_duration * 0.9))
+    if ch_duration <= 0 or fade_t <= 0:
+        return 1.0 if now >= ch_start else 0.0
+    return max(0.0, min(1.0, (now - ch_start) / fade_t))
+
+
+def fallback_char_progress(now, i, line_start, line_end, n):
+    """没有逐字时间时，把整行时长平均分给 n 个字符"""
+    char_delay = (line_end - line_start) / max(1, n)
+    ch_start = line_start + i * char_delay
+    fade_t = min(KARAOKE_FADE_TIME, max(0.05, char_delay * 0.9))
+    if fade_t <= 0:
+        return 1.0 if now >= ch_start else 0.0
+    return max(0.0, min(1.0, (now - ch_start) / fade_t))
+
+
+def karaoke_char_color(p, now, i, color_lut, shimmer_lut):
+    color = lut_color(p, color_lut)
+    if KARAOKE_SHIMMER > 0.0 and p > 0.5:
+        shimmer = KARAOKE_SHIMMER * max(0.0, math.sin(now * 6.28 + i * 0.6))
+        color = lerp_color_hex(color, lut_color(shimmer, shimmer_lut), shimmer)
+    return color
+
+
+def clamp_outline_neighbors(neighbors):
+    """取不超过 neighbors 的最大可用描边方向数（OUTLINE_NEIGHBOR_LEVELS）"""
+    return max(v for v in OUTLINE_NEIGHBOR_LEVELS if v <= max(0, neighbors))
+
+
+def outline_offsets(size, neighbors):
+    neighbors = clamp_outline_neighbors(neighbors)
+    if size <= 0 or neighbors == 0:
+        return []
+    o = size
+    if neighbors == 8:
+        return [(-o, 0), (o, 0), (0, -o), (0, o), (-o, -o), (-o, o), (o, -o), (o, o)]
+    return [(-o, 0), (o, 0), (0, -o), (0, o)]
+
+
+def find_translation_index(translations, target_t):
+    """与 target_t 时间最接近且在 TRANSLATION_MATCH_WINDOW 内的翻译行，没有则返回 -1"""
+    best_idx = -1
+    best_diff = 1e9
+    for i, tline in enumerate(translations):
+        diff = abs(tline['time'] - target_t)
+        if diff < best_diff:
+            best_diff = diff
+            best_idx = i
+        if tline['time'] - target_t > TRANSLATION_MATCH_WINDOW:
+            break
+    if best_idx != -1 and best_diff <= TRANSLATION_MATCH_WINDOW:
+        return best_idx
+    return -1
+
+# ------- 多行歌词视图 -------
+class ScrollingLyricView:
+    """在当前行上下显示若干上下文行，换行时平滑滚动
+
+    只为可见窗口内的行创建画布元素，滚出窗口的行在动画结束后删除；每行文本宽度按行号缓存。
+    所有上下文元素共用标签 "ctx"，滚动动画每帧只对该标签执行一次 canvas.move，
+    帧开销与歌曲长度无关。当前行本身仍由 DesktopLyrics 的逐字渲染负责。
+    """
+    TAG = "ctx"
+
+    def __init__(self, app):
+        self.app = app
+        self.canvas = app.lyric_canvas
+        self.font = tkfont.Font(family=FONT_NAME, size=CONTEXT_FONT_SIZE)
+        self.items = {}          # 行号 -> 画布元素 id 列表
+        self.expiring = []       # 已滚出窗口、等动画结束后删除的元素
+        self.width_cache = {}    # 行号 -> 文本宽度
+        self.center_index = -1
+        self._scroll_total = 0.0
+        self._scroll_done = 0.0
+        self._scroll_start = 0.0
+
+    @property
+    def enabled(self):
+        return LYRIC_VIEW_LINES > 1
+
+    @property
+    def animating(self):
+        return bool(self._scroll_total)
+
+    def _span(self):
+        """(上方行数, 下方行数)，偶数行数时下方多一行"""
+        before = (LYRIC_VIEW_LINES - 1) // 2
+        return before, LYRIC_VIEW_LINES - 1 - before
+
+    def pitch(self):
+        return self.font.metrics("linespace") + CONTEXT_LINE_GAP
+
+    def extra_height(self):
+        """多行模式下窗口需要额外增加的高度"""
+        if not self.enabled:
+            return 0
+        return (LYRIC_VIEW_LINES - 1) * self.pitch() + 2 * CONTEXT_BLOCK_GAP
+
+    def _line_y(self, d):
+        """相对当前行偏移 d 行的上下文行顶部坐标；当前行块与 _rebuild_items 的布局一致"""
+        app = self.app
+        canvas_h = max(1, self.canvas.winfo_height())
+        line_space = app.lyric_font.metrics("linespace")
+        y_cur = (canvas_h - line_space) // 2
+        if d > 0:
+            # 有翻译的歌曲始终预留翻译行，保证每次换行的位移都正好是一个行距
+            bottom = y_cur + line_space
+            if RENDER_TRANSLATION_ON_CANVAS and app.translations_data:
+                bottom += TRANSLATION_TOP_GAP + app.translation_font.metrics("linespace")
+            return bottom + CONTEXT_BLOCK_GAP + (d - 1) * self.pitch()
+        return y_cur - CONTEXT_BLOCK_GAP - self.font.metrics("linespace") - (-d - 1) * self.pitch()
+
+    def _create_line(self, idx, y):
+        text = self.app.lyrics_data[idx]["text"]
+        width = self.width_cache.get(idx)
+        if width is None:
+            width = self.width_cache[idx] = self.font.measure(text)
+        x = (max(1, self.canvas.winfo_width()) - width) // 2
+        ids = []
+        for dx, dy in self.app._build_outline_offsets():
+            ids.append(self.canvas.create_text(x + dx, y + dy, text=text, fill=OUTLINE_COLOR,
+                                               font=self.font, anchor="nw", tags=(self.TAG,)))
+        ids.append(self.canvas.create_text(x, y, text=text, fill=CONTEXT_FG, font=self.font,
+                                           anchor="nw", tags=(self.TAG,)))
+        return ids
+
+    def _window(self, index):
+        before, after = self._span()
+        n = len(self.app.lyrics_data)
+        return [i for i in range(index - before, index + after + 1) if i != index and 0 <= i < n]
+
+    def reset(self):
+        """删除全部上下文元素（换歌、清屏或布局变化时调用）"""
+        self.canvas.delete(self.TAG)
+        self.items = {}
+        self.expiring = []
+        self.width_cache = {}
+        self.center_index = -1
+        self._scroll_total = self._scroll_done = 0.0
+
+    def relayout(self):
+        """字体、窗口尺寸或行数变化后按当前行重新生成"""
+        index = self.center_index
+        self.reset()
+        if index >= 0:
+            self.on_line_change(index)
+
+    def on_line_change(self, index):
+        if not self.enabled or index < 0:
+            return
+        old = self.center_index
+        self.center_index = index
+        self._finish_scroll()
+        delta = index - old
+        if old < 0 or abs(delta) != 1:
+            # 首次显示或跳转：直接在最终位置生成，不做动画
+            self.canvas.delete(self.TAG)
+            self.items = {i: self._create_line(i, self._line_y(i - index)) for i in self._window(index)}
             return
-        self._stop_evt.clear()
 
-        def on_levels(arr):
+        window = set(self._window(index))
+        for idx in list(self.items):
+            if idx in window:
+                continue
+            ids = self.items.pop(idx)
+            if idx == index:
+                # 成为当前行，由逐字渲染接管
+                for iid in ids:
+                    self.canvas.delete(iid)
+            else:
+                self.expiring.extend(ids)
+        # 新出现的行先放在滚动前的位置，随后和其他行一起整体移动 -offset
+        offset = delta * self.pitch()
+        for idx in window:
+            if idx not in self.items:
+                self.items[idx] = self._create_line(idx, self._line_y(idx - index) + offset)
+        if CONTEXT_SCROLL_TIME <= 0:
+            self.canvas.move(self.TAG, 0, -offset)
+            self._drop_expiring()
+            return
+        self._scroll_total = float(-offset)
+        self._scroll_done = 0.0
+        self._scroll_start = time.perf_counter()
+
+    def step(self, now):
+        """推进滚动动画，返回动画是否仍在进行"""
+        if not self._scroll_total:
+            return False
+        t = min(1.0, (now - self._scroll_start) / CONTEXT_SCROLL_TIME)
+        target = self._scroll_total * t * t * (3 - 2 * t)
+        dy = target - self._scroll_done
+        if dy:
+            self.canvas.move(self.TAG, 0, dy)
+            self._scroll_done = target
+        if t >= 1.0:
+            self._scroll_total = self._scroll_done = 0.0
+            self._drop_expiring()
+            return False
+        return True
+
+    def _finish_scroll(self):
+        remaining = self._scroll_total - self._scroll_done
+        if remaining:
+            self.canvas.move(self.TAG, 0, remaining)
+        self._scroll_total = self._scroll_done = 0.0
+        self._drop_expiring()
+
+    def _drop_expiring(self):
+        for iid in self.expiring:
+            self.canvas.delete(iid)
+        self.expiring = []
+
+# ------- 后台歌词解析 -------
+class LyricParseWorker(threading.Thread):
+    """在后台线程解析歌词，结果作为一个整体通过消息队列交回界面线程
+
+    当前歌曲的任务（解析网页端歌词或查本地歌词库）带歌曲代号（song_generation），
+    切歌后代号递增；过时的任务在执行前跳过，完成时已过时的结果由 process_queue 丢弃。
+    积压的当前歌曲任务只处理最新的一个，并且总是先于待播歌曲的预解析任务。
+    解析是纯 Python 代码，与界面线程争用 GIL；超长歌词（PARSE_IN_PROCESS_MIN_CHARS）
+    交给子进程解析，本线程只分块还原结果。
+    """
+    def __init__(self, app):
+        super().__init__(daemon=True, name="lyric-parser")
+        self.app = app
+        self._jobs = queue.Queue()
+        self._prefetch = deque()
+        self._library = None
+        self._library_mtime = None
+        self._pool = None
+
+    def lookup_library(self, generation, title, artist):
+        self._jobs.put(("library", generation, title, artist, None))
+
+    def submit(self, generation, lyric, tlyric, content_hash=None):
+        self._jobs.put(("current", generation, lyric, tlyric, content_hash))
+
+    def prefetch(self, key, lyric, tlyric, content_hash=None):
+        self._jobs.put(("prefetch", key, lyric, tlyric, content_hash))
+
+    def _next_job(self):
+        current = None
+        block = not self._prefetch
+        while True:
             try:
-                # 优化：使用 after_idle 避免高频率更新抢占事件循环
-                self.win.after_idle(self._update_bars, arr)
-            except Exception:
-                pass
+                job = self._jobs.get(block=block)
+            except queue.Empty:
+                break
+            block = False
+            if job[0] in ("current", "library"):
+                current = job
+            else:
+                self._prefetch.append(job)
+                while len(self._prefetch) > UPCOMING_MAX_TRACKS:
+                    self._prefetch.popleft()
+        if current is not None:
+            return current
+        return self._prefetch.popleft()
+
+    def _parse(self, lyric, tlyric, content_hash):
+        t0 = _PERF_PARSE.begin()
+        try:
+            if len(lyric or "") + len(tlyric or "") >= PARSE_IN_PROCESS_MIN_CHARS:
+                entry = self._parse_in_process(lyric, tlyric)
+            else:
+                entry = lyric_parser.parse_lyric_entry(lyric, tlyric)
+        finally:
+            _PERF_PARSE.end(t0)
+        self.app._store_parsed_lyric(content_hash, entry)
+        return entry
 
-        self.worker = _AudioWorker(self.num_bars, on_levels, self._stop_evt)
-        self.thread = threading.Thread(target=self.worker.run, daemon=True)
-        self.thread.start()
-        self._running = True
+    def _start_pool(self):
+        """创建解析子进程并立即启动：启动子进程的那几十毫秒放在程序启动时，而不是第一首长歌词播放时"""
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            # spawn：不在带 Tk 和多个线程的进程里 fork
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self._pool.submit(lyric_parser.parse_lyric_entry_chunks, [], [])
+        except OSError as e:
+            print(f"⚠️  无法启动歌词解析子进程: {e}")
+            self._pool = None
+
+    def _parse_in_process(self, lyric, tlyric):
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            if self._pool is None:
+                self._start_pool()
+            if self._pool is None:
+                return lyric_parser.parse_lyric_entry(lyric, tlyric)
+            packed = self._pool.submit(lyric_parser.parse_lyric_entry_chunks,
+                                       lyric_parser.split_text(lyric), lyric_parser.split_text(tlyric)).result()
+        except (BrokenProcessPool, OSError) as e:
+            print(f"⚠️  子进程解析失败，改在解析线程中进行: {e}")
+            self._pool = None
+            return lyric_parser.parse_lyric_entry(lyric, tlyric)
+        # 还原期间暂停分代回收：结果有数十万个对象，逐块增长会反复触发扫描整个堆的完整回收
+        # （每次数十毫秒，且发生在持有 GIL 的线程里）；还原后冻结，之后的完整回收也不再扫描它们
+        gc.disable()
+        try:
+            entry = lyric_parser.join_entry_chunks(packed)
+            gc.freeze()
+        finally:
+            gc.enable()
+        return entry
+
+    def _open_library(self):
+        """歌词库在本线程中打开（sqlite3 连接不能跨线程），文件被重新导入后重新打开"""
+        try:
+            mtime = os.path.getmtime(LYRIC_LIBRARY_PATH)
+        except OSError:
+            return None
+        if self._library is None or mtime != self._library_mtime:
+            import lyric_library
+            if self._library is not None:
+                self._library.close()
+            self._library = lyric_library.LyricLibrary(LYRIC_LIBRARY_PATH, readonly=True)
+            self._library_mtime = mtime
+        return self._library
+
+    def _lookup(self, generation, title, artist):
+        t0 = _PERF_LIBRARY.begin()
+        try:
+            library = self._open_library()
+            entry = library.lookup(title, artist) if library is not None else None
+        except Exception as e:
+            print(f"查询本地歌词库失败: {e}")
+            entry = None
+        _PERF_LIBRARY.end(t0)
+        if entry is not None:
+            self.app.safe_update("library_done", (generation, entry))
+
+    def run(self):
+        self._start_pool()
+        while True:
+            kind, token, lyric, tlyric, content_hash = self._next_job()
+            if kind != "prefetch" and token != self.app.song_generation:
+                continue
+            if kind == "library":
+                self._lookup(token, lyric, tlyric)
+                continue
+            try:
+                entry = self._parse(lyric, tlyric, content_hash)
+            except Exception as e:
+                print(f"解析歌词时出错: {e}")
+                if kind == "current":
+                    self.app.safe_update("parse_failed", token)
+                continue
+            if kind == "current":
+                self.app.safe_update("parse_done", (token, entry))
+            else:
+                self.app.safe_update("prefetch_done", (token, entry))
 
-    def _stop_audio(self):
-        if not self._running:
-            return
-        try:
-            self._stop_evt.set()
-        except Exception:
-            pass
-        self._running = False
+# 入队时带歌曲代号的消息类型，数据为 (代号, 原数据)
+GENERATION_MESSAGES = ("song", "clear", "full_lyric", "parsed_lyric")
 
-    def show(self):
-        self.win.deiconify()
-        self.win.lift()
-        self._apply_click_through_and_colorkey()
-        self._start_audio()
-        self._visible = True
 
-    def hide(self):
-        self._stop_audio()
-        self.win.withdraw()
-        self._visible = False
+def drain_message_queue(message_queue, limit):
+    """取出至多 limit 条消息，按到达顺序返回 [(类型, 数据)]
 
-    def destroy(self):
-        if not self.alive:
-            return
-        self.alive = False
-        self._stop_audio()
+    只有 time 合并为最新一条（放在最后一次到达的位置）；其余消息逐条保留，
+    同一批里的多个 prefetch_done、先后到达的 song 和 full_lyric 都不会互相覆盖。
+    """
+    batch = []
+    time_idx = None
+    while len(batch) < limit:
         try:
-            self.win.destroy()
-        except Exception:
-            pass
+            msg = message_queue.get_nowait()
+        except queue.Empty:
+            break
+        if msg[0] == "time":
+            if time_idx is not None:
+                batch[time_idx] = None
+            time_idx = len(batch)
+        batch.append(msg)
+    return [msg for msg in batch if msg is not None]
 
 # ------- 歌词主窗口（优化版）-------
 class DesktopLyrics:
-    TIME_TAG_RE = re.compile(r"\[(\d{1,2}):(\d{1,2})(?:[.:](\d{1,3}))?\]")
-    YRC_TAG_RE = re.compile(r"\[(\d+),(\d+)\]")
+    TIME_TAG_RE = lyric_parser.TIME_TAG_RE
+    YRC_TAG_RE = lyric_parser.YRC_TAG_RE
 
     def __init__(self):
         self.root = tk.Tk()
+        _trace_startup("Tk 根窗口已创建")
         self.root.title(f"Harmonia桌面歌词 - {CURRENT_VERSION}")
         self.root.overrideredirect(True)
         self.root.attributes("-topmost", True)
-        self.root.attributes("-transparentcolor", BG_COLOR)
+        try:
+            self.root.attributes("-transparentcolor", BG_COLOR)
+        except tk.TclError:
+            pass
         screen_width = self.root.winfo_screenwidth()
         self.root.geometry(f"{screen_width}x{WINDOW_HEIGHT}+0+100")
         self.root.config(bg=BG_COLOR)
 
+        self.config = ConfigManager()
+        self.config.load()
         self._build_fonts()
 
         self.connection_status = "disconnected"
@@ -885,17 +2678,54 @@ class DesktopLyrics:
         self.current_words = None
 
         self.visualizer_enabled = True
-        self.visualizer = None
+        # 律动条窗口（VIS_SURFACES 每项一个）共用一路音频分析 audio_source
+        self.visualizers = []
+        self.audio_source = None
+        # 音画延迟校准依赖音频线程，随律动条一起创建
+        self.calibrator = None
+        # 律动条频谱通过 WebSocket 二进制帧转发给订阅的客户端（OBS/浏览器源）
+        self.spectrum = SpectrumPublisher()
         self.is_locked = False
+        self.perf_overlay_enabled = False
+        self._perf_overlay_job = None
+        perf_stats.trace.set_enabled(TRACE_ENABLED)
+        self._last_trace_dump = 0.0
+        self.governor = QualityGovernor(on_change=self._on_quality_change)
+        self.frame_scheduler = FrameScheduler()
+        # Windows 默认定时器精度约 15.6ms，提高到 1ms，after 才能贴近帧截止时间
+        self._timer_resolution_set = False
+        if hasattr(ctypes, "windll"):
+            try:
+                self._timer_resolution_set = ctypes.windll.winmm.timeBeginPeriod(1) == 0
+            except Exception:
+                pass
 
         self._build_ui()
+        self.scroll_view = ScrollingLyricView(self)
+        if self.scroll_view.enabled:
+            self._apply_view_lines()
 
         self.message_queue = queue.Queue()
+        # 每次切歌或清屏递增，后台解析结果只在代号一致时生效
+        self.song_generation = 0
+        # 入队一侧的代号：song/clear 入队时递增，随后的歌词消息带上它（见 safe_update）
+        self._queued_generation = 0
+        self._enqueue_lock = threading.Lock()
+        self._parse_worker = LyricParseWorker(self)
+        self._parse_worker.start()
         self.root.after(100, self.process_queue)
         self.tray_icon = None
-        self._create_tray_icon()
 
-        self.connected_clients = set()
+        self.server = None
+
+        # 已解析歌词缓存：内容哈希 -> 解析结果，WebSocket 线程也会读取
+        self._lyric_cache = OrderedDict()
+        self._lyric_cache_lock = threading.Lock()
+        self._current_entry = None
+        # 客户端预告的待播歌曲：(歌名, 歌手) -> 解析结果，首行排版已放入 _line_layout_cache
+        self._prepared_songs = OrderedDict()
+        self._line_layout_cache = OrderedDict()
+        self._switch_t0 = None
 
         self.drag_data = {"x": 0, "y": 0, "dragging": False}
         self._last_sync_time = 0.0
@@ -917,25 +2747,158 @@ class DesktopLyrics:
         self._shimmer_lut = self._build_color_lut(KARAOKE_HL_COLOR, "#FFFFFF", SHIMMER_LUT_STEPS)
 
         self.root.after(self._frame_delay_ms(IDLE_FPS), self.animation_tick)
+        self.root.after(CONFIG_POLL_MS, self._poll_config)
 
-        if self.visualizer_enabled:
-            try:
-                self.visualizer = VisualizerOverlay(self.root)
-                self.visualizer.show()
-            except Exception as e:
-                print(f"创建律动条失败：{e}")
-                print("律动条将不可用，但歌词功能正常")
-                self.visualizer = None
-                self.visualizer_enabled = False
+        # 分阶段启动：歌词窗口先显示，托盘/律动条/更新检查在首帧之后再启动
+        self.updater = None
+        self.root.after_idle(self._on_first_frame)
+        _trace_startup("歌词窗口已构建")
 
+    def _on_first_frame(self):
+        _trace_startup("首帧已显示")
+        self._create_tray_icon()
+        self.root.after(0, self._start_visualizer_deferred)
+
+    def _start_visualizer_deferred(self):
+        if self.visualizer_enabled and not self.visualizers:
+            self._create_visualizer()
+            _trace_startup("律动条已启动")
         self.updater = UpdateManager(self.root)
-        self.root.after(1000, self.updater.start_check)
+        if CHECK_UPDATE_ON_START:
+            self.root.after(1000, self.updater.start_check)
 
     def _build_fonts(self):
         self.lyric_font = tkfont.Font(family=FONT_NAME, size=LYRIC_FONT_SIZE, weight="bold")
         self.translation_font = tkfont.Font(family=FONT_NAME, size=TRANSLATION_FONT_SIZE, weight="normal")
         self.song_font = tkfont.Font(family=FONT_NAME, size=SONG_FONT_SIZE, weight="bold")
 
+    def _create_visualizer(self, visible=True):
+        try:
+            if self.calibrator is None:
+                self.calibrator = LatencyCalibrator(self._raw_playback_time)
+                self.calibrator.set_onsets(self._word_onsets())
+            if self.audio_source is None:
+                self.audio_source = SpectrumSource(self.root, self.calibrator, self.spectrum)
+            for spec in VIS_SURFACES or [{}]:
+                surface = VisualizerOverlay(self.root, self.audio_source, self.governor, spec, visible)
+                self.visualizers.append(surface)
+                if visible:
+                    surface.show()
+        except Exception as e:
+            print(f"创建律动条失败：{e}")
+            print("律动条将不可用，但歌词功能正常")
+            self._destroy_visualizers()
+            self.visualizer_enabled = False
+            self._update_tray_menu()
+
+    def _destroy_visualizers(self):
+        for surface in self.visualizers:
+            surface.destroy()
+        self.visualizers = []
+
+    def _recreate_visualizer(self):
+        """重建所有律动条窗口；音频分析不中断，除非律动条总数上限变了
+
+        先建好新窗口再销毁旧窗口，SpectrumSource 上的窗口数不会降到 0，也就不会停掉采集。
+        """
+        visible = any(surface._visible for surface in self.visualizers)
+        old = self.visualizers
+        self.visualizers = []
+        if self.audio_source is not None and self.audio_source.num_bars != VIS_MAX_BARS:
+            self.audio_source.restart()
+        self._create_visualizer(visible)
+        for surface in old:
+            surface.destroy()
+
+    def _on_quality_change(self, old, new):
+        before, after = QUALITY_LEVELS[old], QUALITY_LEVELS[new]
+        if before["outline_cap"] != after["outline_cap"]:
+            self._items_dirty = True
+            self.scroll_view.relayout()
+        if before["karaoke"] != after["karaoke"]:
+            self._layout_dirty = True
+            self._items_dirty = True
+        if self.visualizers:
+            if before["bar_scale"] != after["bar_scale"]:
+                self._recreate_visualizer()
+            elif before["glow"] != after["glow"]:
+                for surface in self.visualizers:
+                    surface.set_glow(after["glow"])
+        self._update_tray_menu()
+
+    def _toggle_calibration(self, *_):
+        def _do():
+            if self.calibrator is not None:
+                self.calibrator.set_enabled(not self.calibrator.enabled)
+            self._update_tray_menu()
+        self.root.after(0, _do)
+
+    def _calibration_menu_text(self):
+        cal = self.calibrator
+        if cal is None:
+            return "延迟校准：需开启律动条"
+        if not cal.enabled:
+            return "延迟校准：关"
+        return f"延迟校准：开（{cal.offset * 1000.0:+.0f} ms）" if cal.estimates else "延迟校准：开（估计中）"
+
+    def _toggle_quality_governor(self, *_):
+        def _do():
+            self.governor.set_enabled(not self.governor.enabled)
+            self._update_tray_menu()
+        self.root.after(0, _do)
+
+    def _karaoke_active(self):
+        """逐字渐变是否实际生效（最低画质档位会退回整行渲染）"""
+        return self.karaoke_enabled and self.governor.profile["karaoke"]
+
+    def _poll_config(self):
+        try:
+            groups = self.config.poll()
+            if groups:
+                self._apply_config_groups(groups)
+        except Exception as e:
+            print(f"应用配置时出错: {e}")
+        self.root.after(CONFIG_POLL_MS, self._poll_config)
+
+    def _apply_config_groups(self, groups):
+        """只重建受影响的缓存，不重启程序"""
+        if "lut" in groups:
+            self._color_lut = self._build_color_lut(LYRIC_FG, KARAOKE_HL_COLOR, COLOR_LUT_STEPS)
+            self._shimmer_lut = self._build_color_lut(KARAOKE_HL_COLOR, "#FFFFFF", SHIMMER_LUT_STEPS)
+            self._items_dirty = True
+        if "fonts" in groups:
+            self._line_layout_cache.clear()
+            # 修改已有字体对象，使用它的控件和画布元素会自动更新
+            self.lyric_font.configure(family=FONT_NAME, size=LYRIC_FONT_SIZE)
+            self.translation_font.configure(family=FONT_NAME, size=TRANSLATION_FONT_SIZE)
+            self.song_font.configure(family=FONT_NAME, size=SONG_FONT_SIZE)
+            self._layout_dirty = True
+            self._items_dirty = True
+        if "items" in groups:
+            self._items_dirty = True
+        if "view" in groups or "fonts" in groups:
+            self.scroll_view.font.configure(family=FONT_NAME, size=CONTEXT_FONT_SIZE)
+            self._apply_view_lines()
+        elif "items" in groups:
+            self.scroll_view.relayout()
+        if self.visualizers:
+            if "visualizer" in groups:
+                self._recreate_visualizer()
+            elif groups & {"audio", "fft"}:
+                self.audio_source.reload_config()
+        if "server" in groups and self.server is not None:
+            threading.Thread(target=self._restart_server, daemon=True).start()
+        if "quality" in groups:
+            self.governor.set_enabled(QUALITY_GOVERNOR_ENABLED)
+            self._update_tray_menu()
+
+    def _restart_server(self):
+        old = self.server
+        if old is not None and not old.stop():
+            print("旧的WebSocket服务器未能在超时内停止")
+        self.server = LyricsServer(self)
+        self.server.start()
+
     def _build_ui(self):
         self.main_frame = tk.Frame(self.root, bg=BG_COLOR)
         self.main_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -953,23 +2916,14 @@ class DesktopLyrics:
         self.root.bind("<B1-Motion>", self._on_move)
         self.root.bind("<Enter>", self._on_enter)
         self.root.bind("<Leave>", self._on_leave)
+        self.root.bind("<F12>", self._toggle_perf_overlay)
         self.root.attributes("-alpha", WINDOW_ALPHA)
 
     def _build_color_lut(self, color_a, color_b, steps):
-        a = self._hex_to_rgb(color_a)
-        b = self._hex_to_rgb(color_b)
-        lut = []
-        for i in range(steps + 1):
-            t = i / steps
-            eased_t = t * t * (3 - 2 * t)
-            rgb = tuple(int(round(a[j] + (b[j] - a[j]) * eased_t)) for j in range(3))
-            lut.append(self._rgb_to_hex(rgb))
-        return lut
+        return build_color_lut(color_a, color_b, steps)
 
     def _get_color_from_lut(self, progress, lut):
-        progress = max(0.0, min(1.0, progress))
-        idx = int(progress * (len(lut) - 1))
-        return lut[idx]
+        return lut_color(progress, lut)
 
     def _on_enter(self, _):
         if not self.is_locked:
@@ -1012,22 +2966,97 @@ class DesktopLyrics:
         def _do():
             self.visualizer_enabled = not self.visualizer_enabled
             if self.visualizer_enabled:
-                if self.visualizer is None:
-                    try:
-                        self.visualizer = VisualizerOverlay(self.root)
-                        self.visualizer.show()
-                    except Exception as e:
-                        print(f"创建律动条失败：{e}")
-                        self.visualizer = None
-                        self.visualizer_enabled = False
+                if not self.visualizers:
+                    self._create_visualizer()
                 else:
-                    self.visualizer.show()
+                    for surface in self.visualizers:
+                        surface.show()
+            else:
+                for surface in self.visualizers:
+                    surface.hide()
+            self._update_tray_menu()
+        self.root.after(0, _do)
+
+    def _cycle_view_lines(self, *_):
+        def _do():
+            global LYRIC_VIEW_LINES
+            choices = VIEW_LINE_CHOICES
+            pos = choices.index(LYRIC_VIEW_LINES) if LYRIC_VIEW_LINES in choices else -1
+            LYRIC_VIEW_LINES = choices[(pos + 1) % len(choices)]
+            self._apply_view_lines()
+            self._update_tray_menu()
+        self.root.after(0, _do)
+
+    def _apply_view_lines(self):
+        """按 LYRIC_VIEW_LINES 调整窗口高度，上下文行在画布尺寸变化后重建"""
+        if self.root.winfo_ismapped():
+            width = self.root.winfo_width()
+        else:
+            width = self.root.winfo_screenwidth()
+        height = WINDOW_HEIGHT + self.scroll_view.extra_height()
+        self.root.geometry(f"{width}x{height}")
+        self.scroll_view.relayout()
+        if self.scroll_view.enabled and self.scroll_view.center_index < 0:
+            self.scroll_view.on_line_change(self.last_lyric_index)
+
+    def _toggle_perf_overlay(self, *_):
+        def _do():
+            self.perf_overlay_enabled = not self.perf_overlay_enabled
+            perf_stats.registry.set_enabled(self.perf_overlay_enabled)
+            if self._perf_overlay_job is not None:
+                self.root.after_cancel(self._perf_overlay_job)
+                self._perf_overlay_job = None
+            if self.perf_overlay_enabled:
+                self._refresh_perf_overlay()
             else:
-                if self.visualizer:
-                    self.visualizer.hide()
+                self.lyric_canvas.delete("perfstats")
             self._update_tray_menu()
         self.root.after(0, _do)
 
+    def _on_slow_frame(self, stall_ms):
+        _TRACE.instant("slow_frame", {"ms": round(stall_ms, 1)})
+        now = time.monotonic()
+        if now - self._last_trace_dump >= TRACE_AUTO_DUMP_INTERVAL_SEC:
+            self._last_trace_dump = now
+            print(f"界面卡顿 {stall_ms:.0f} ms，导出性能追踪")
+            self._dump_trace("slow")
+
+    def _export_trace(self, *_):
+        self._dump_trace("manual")
+
+    def _dump_trace(self, reason):
+        """在后台线程复制环形缓冲并写出 Chrome trace JSON，可拖入 https://ui.perfetto.dev 查看"""
+        path = os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S") + f"-{reason}.json")
+
+        def _write():
+            try:
+                n = perf_stats.trace.dump(path)
+                print(f"性能追踪已导出（{n} 个事件）: {path}")
+                files = sorted(f for f in os.listdir(TRACE_DIR) if f.startswith("trace-") and f.endswith(".json"))
+                for old in files[:-TRACE_KEEP_FILES]:
+                    os.remove(os.path.join(TRACE_DIR, old))
+            except OSError as e:
+                print(f"导出性能追踪失败: {e}")
+        threading.Thread(target=_write, name="trace-dump", daemon=True).start()
+
+    def _refresh_perf_overlay(self):
+        """屏幕左上角显示各热点路径耗时"""
+        snap = perf_stats.registry.snapshot()
+        lines = []
+        for name, t in snap["timers_ms"].items():
+            if t.get("count"):
+                lines.append(f"{name}: p50 {t['p50']:.2f}  p99 {t['p99']:.2f}  max {t['max']:.2f} ms")
+        for name, rate in snap["rates_per_s"].items():
+            lines.append(f"{name}: {rate:.1f}/s")
+        text = "\n".join(lines) or "性能统计：等待数据..."
+        if self.lyric_canvas.find_withtag("perfstats"):
+            self.lyric_canvas.itemconfig("perfstats", text=text)
+        else:
+            self.lyric_canvas.create_text(6, 4, text=text, fill="#00FF7F", font=(FONT_NAME, 9),
+                                          anchor="nw", tags=("perfstats",))
+        self.lyric_canvas.tag_raise("perfstats")
+        self._perf_overlay_job = self.root.after(PERF_OVERLAY_INTERVAL_MS, self._refresh_perf_overlay)
+
     def _start_move(self, event):
         if not self.is_locked:
             self.drag_data["start_x"] = event.x_root
@@ -1050,7 +3079,7 @@ class DesktopLyrics:
         screen_height = self.root.winfo_screenheight()
         window_width = self.root.winfo_width()
         x = max(0, min(x, screen_width - window_width))
-        y = max(0, min(y, screen_height - WINDOW_HEIGHT))
+        y = max(0, min(y, screen_height - self.root.winfo_height()))
         self.root.geometry(f"+{x}+{y}")
 
     def _update_tray_menu(self):
@@ -1061,9 +3090,16 @@ class DesktopLyrics:
                 pass
 
     def _create_tray_icon(self):
+        # PIL/pystray 的导入和图标绘制都放在托盘线程里，不占用界面线程
+        threading.Thread(target=self._run_tray_icon, daemon=True).start()
+
+    def _run_tray_icon(self):
         try:
-            image = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(image)
+            pystray = _timed_import("pystray")
+            PIL_Image = _timed_import("PIL.Image")
+            PIL_ImageDraw = _timed_import("PIL.ImageDraw")
+            image = PIL_Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+            draw = PIL_ImageDraw.Draw(image)
             draw.ellipse([(20, 12), (44, 36)], fill="#E6E6FA", outline="#FFFFFF", width=2)
             draw.rectangle([(42, 18), (46, 50)], fill="#E6E6FA")
             points = [(38, 28), (52, 22), (52, 34), (38, 28)]
@@ -1079,34 +3115,47 @@ class DesktopLyrics:
                 ),
                 pystray.MenuItem(lambda _: f"律动条：{'开' if self.visualizer_enabled else '关'}",
                                 self._toggle_visualizer),
+                pystray.MenuItem(lambda _: f"歌词行数：{LYRIC_VIEW_LINES}",
+                                self._cycle_view_lines),
+                pystray.MenuItem(lambda _: f"性能统计：{'开' if self.perf_overlay_enabled else '关'}",
+                                self._toggle_perf_overlay),
+                pystray.MenuItem("导出性能追踪", self._export_trace, enabled=lambda _: _TRACE.enabled),
+                pystray.MenuItem(
+                    lambda _: f"自动画质：{'开' if self.governor.enabled else '关'}（当前：{self.governor.profile['name']}）",
+                    self._toggle_quality_governor),
+                pystray.MenuItem(lambda _: self._calibration_menu_text(), self._toggle_calibration,
+                                enabled=lambda _: self.calibrator is not None),
                 pystray.MenuItem("断开连接", self._disconnect_client),
                 pystray.MenuItem("退出", self._quit)
             )
             self.tray_icon = pystray.Icon("harmonia_lyrics", image, "Harmonia桌面歌词", self.tray_menu)
-            threading.Thread(target=self.tray_icon.run, daemon=True).start()
+            _trace_startup("托盘图标就绪")
+            self.tray_icon.run()
         except Exception as e:
             print(f"创建托盘图标失败: {e}")
 
     def _disconnect_client(self, *_):
-        if self.connected_clients:
+        if self.server and self.server.connection_count():
             print("主动断开客户端连接")
-            for client in list(self.connected_clients):
-                try:
-                    asyncio.run_coroutine_threadsafe(client.close(), asyncio.get_event_loop())
-                except Exception as e:
-                    print(f"断开连接时出错: {e}")
-            self.connected_clients.clear()
+            self.server.close_all()
             self.safe_update("clear")
             self.safe_update("status", "disconnected")
 
     def _quit(self, *_):
         print("退出应用程序")
+        if self._timer_resolution_set:
+            try:
+                ctypes.windll.winmm.timeEndPeriod(1)
+            except Exception:
+                pass
+            self._timer_resolution_set = False
         try:
-            if self.visualizer:
-                self.visualizer.destroy()
+            self._destroy_visualizers()
         except Exception:
             pass
-        self._disconnect_client()
+        if self.server:
+            if not self.server.stop():
+                print("WebSocket服务器未能在超时内停止")
         self.root.after(100, self.root.destroy)
         if self.tray_icon:
             try:
@@ -1127,101 +3176,10 @@ class DesktopLyrics:
         return payload or ""
 
     def parse_lyrics(self, payload):
-        text = self._normalize_lyric_payload(payload)
-        if not text:
-            return []
-        entries = []
-        lines = text.splitlines()
-        for raw in lines:
-            line = raw.strip()
-            if not line:
-                continue
-            lrc_tags = list(self.TIME_TAG_RE.finditer(line))
-            if lrc_tags:
-                pure = self.TIME_TAG_RE.sub("", line).strip()
-                if pure == "":
-                    continue
-                for m in lrc_tags:
-                    mm = int(m.group(1))
-                    ss = int(m.group(2))
-                    frac = m.group(3)
-                    if frac is None:
-                        ms = 0
-                    else:
-                        if len(frac) == 1:
-                            ms = int(frac) * 100
-                        elif len(frac) == 2:
-                            ms = int(frac) * 10
-                        else:
-                            ms = int(frac[:3])
-                    t = mm * 60 + ss + ms / 1000.0
-                    entries.append({"time": t, "text": pure})
-                continue
-            yrc_match = self.YRC_TAG_RE.match(line)
-            if yrc_match:
-                start_ms = int(yrc_match.group(1))
-                t = start_ms / 1000.0
-                pure = re.sub(r"\[.*?\]|\(.*?\)", "", line).strip()
-                pure = re.sub(r'\s+', ' ', pure)
-                if pure:
-                    entries.append({"time": t, "text": pure})
-                continue
-        entries.sort(key=lambda x: x["time"])
-        return entries
+        return lyric_parser.parse_lrc(self._normalize_lyric_payload(payload))
 
     def parse_yrc(self, yrc_text):
-        if not yrc_text:
-            return []
-        entries = []
-        lines = yrc_text.splitlines()
-        line_tag_re = re.compile(r'^\[(\d+),(\d+)\](.*)')
-        word_tag_re = re.compile(r'\((\d+),(\d+),\d+\)([^\(]*)')
-        for raw in lines:
-            line = raw.strip()
-            if not line:
-                continue
-            m = line_tag_re.match(line)
-            if not m:
-                continue
-            line_start_ms = int(m.group(1))
-            rest = m.group(3)
-            words_raw = []
-            for wm in word_tag_re.finditer(rest):
-                w_start = int(wm.group(1))
-                w_dur = int(wm.group(2))
-                w_text = wm.group(3)
-                if w_text:
-                    words_raw.append({
-                        'start': w_start / 1000.0,
-                        'duration': w_dur / 1000.0,
-                        'text': w_text
-                    })
-            if not words_raw:
-                pure = re.sub(r'\[.*?\]|\(.*?\)', '', line).strip()
-                if pure:
-                    entries.append({
-                        'time': line_start_ms / 1000.0,
-                        'text': pure
-                    })
-            else:
-                expanded_words = []
-                full_chars = []
-                for w in words_raw:
-                    for ch in w['text']:
-                        expanded_words.append({
-                            'char': ch,
-                            'start': w['start'],
-                            'duration': w['duration']
-                        })
-                        full_chars.append(ch)
-                full_text = ''.join(full_chars)
-                entries.append({
-                    'time': line_start_ms / 1000.0,
-                    'text': full_text,
-                    'words': expanded_words
-                })
-        entries.sort(key=lambda x: x['time'])
-        return entries
+        return lyric_parser.parse_yrc(yrc_text)
 
     def _sync_time(self, server_time: float):
         try:
@@ -1233,40 +3191,64 @@ class DesktopLyrics:
     def _now_playback_time(self) -> float:
         dt = time.perf_counter() - self._last_sync_mono
         if dt > TIME_FREEZE_ON_STALE_SEC:
-            return self._last_sync_time
+            now = self._last_sync_time
+        else:
+            now = self._last_sync_time + dt
+        cal = self.calibrator
+        if cal is not None and cal.enabled:
+            now -= cal.offset
+        return now
+
+    def _raw_playback_time(self):
+        """未校准的播放时间，供音频线程的延迟校准使用；时间冻结时返回 None"""
+        dt = time.perf_counter() - self._last_sync_mono
+        if dt > TIME_FREEZE_ON_STALE_SEC:
+            return None
         return self._last_sync_time + dt
 
+    def _word_onsets(self):
+        """当前逐字歌词所有字的起始时间；非逐字歌词返回空列表（不参与校准）"""
+        if not self.has_word_lyrics:
+            return []
+        return [w["start"] for line in self.lyrics_data for w in line.get("words", ())]
+
     def invalidate_layout(self):
         self._layout_dirty = True
+        self.scroll_view.relayout()
 
-    def _prepare_line_layout(self):
-        s = self.current_lyric or ""
-        if not s:
-            self._line_positions = []
-            self._line_width = 0
-            self._layout_dirty = False
-            return
+    def _line_layout(self, s, karaoke):
+        """计算（或从缓存取）一行的逐字位置和总宽度"""
         canvas_w = max(1, self.lyric_canvas.winfo_width())
+        key = (s, canvas_w, karaoke)
+        cached = self._line_layout_cache.get(key)
+        if cached is not None:
+            self._line_layout_cache.move_to_end(key)
+            return cached
         widths = [self.lyric_font.measure(ch) for ch in s]
-        total_w = self.lyric_font.measure(s) if not self.karaoke_enabled else sum(widths)
+        total_w = self.lyric_font.measure(s) if not karaoke else sum(widths)
         x = (canvas_w - total_w) // 2
         pos = []
-        if self.karaoke_enabled:
+        if karaoke:
             for ch, w in zip(s, widths):
                 pos.append((ch, x))
                 x += w
-        self._line_positions = pos
-        self._line_width = total_w
+        layout = self._line_layout_cache[key] = (pos, total_w)
+        while len(self._line_layout_cache) > LINE_LAYOUT_CACHE_SIZE:
+            self._line_layout_cache.popitem(last=False)
+        return layout
+
+    def _prepare_line_layout(self):
+        s = self.current_lyric or ""
+        if not s:
+            self._line_positions = []
+            self._line_width = 0
+            self._layout_dirty = False
+            return
+        self._line_positions, self._line_width = self._line_layout(s, self._karaoke_active())
         self._layout_dirty = False
 
     def _build_outline_offsets(self):
-        o = OUTLINE_SIZE
-        if o <= 0:
-            return []
-        if OUTLINE_NEIGHBORS >= 8:
-            return [(-o, 0), (o, 0), (0, -o), (0, o), (-o, -o), (-o, o), (o, -o), (o, o)]
-        else:
-            return [(-o, 0), (o, 0), (0, -o), (0, o)]
+        return outline_offsets(OUTLINE_SIZE, min(OUTLINE_NEIGHBORS, self.governor.profile["outline_cap"]))
 
     def _clear_placeholder(self):
         try:
@@ -1275,73 +3257,77 @@ class DesktopLyrics:
             pass
 
     def _rebuild_items(self):
-        self._clear_placeholder()
-        for ids in self._outline_items:
-            for iid in ids:
+        t0 = _PERF_REBUILD.begin()
+        try:
+            self._clear_placeholder()
+            for ids in self._outline_items:
+                for iid in ids:
+                    self.lyric_canvas.delete(iid)
+            for iid in self._char_items:
                 self.lyric_canvas.delete(iid)
-        for iid in self._char_items:
-            self.lyric_canvas.delete(iid)
-        if self._trans_item:
-            self.lyric_canvas.delete(self._trans_item)
-            self._trans_item = None
-        for iid in self._trans_outline_items:
-            self.lyric_canvas.delete(iid)
-        self._trans_outline_items = []
-        self._char_items = []
-        self._outline_items = []
-
-        s = self.current_lyric or ""
-        canvas_w = max(1, self.lyric_canvas.winfo_width())
-        canvas_h = max(1, self.lyric_canvas.winfo_height())
-        line_space = self.lyric_font.metrics("linespace")
-        y = (canvas_h - line_space) // 2
-        outline_offsets = self._build_outline_offsets()
-
-        if not s:
-            return
-
-        if self.karaoke_enabled:
-            for (ch, x) in self._line_positions:
+            if self._trans_item:
+                self.lyric_canvas.delete(self._trans_item)
+                self._trans_item = None
+            for iid in self._trans_outline_items:
+                self.lyric_canvas.delete(iid)
+            self._trans_outline_items = []
+            self._char_items = []
+            self._outline_items = []
+
+            s = self.current_lyric or ""
+            canvas_w = max(1, self.lyric_canvas.winfo_width())
+            canvas_h = max(1, self.lyric_canvas.winfo_height())
+            line_space = self.lyric_font.metrics("linespace")
+            y = (canvas_h - line_space) // 2
+            outline_offsets = self._build_outline_offsets()
+
+            if not s:
+                return
+
+            if self._karaoke_active():
+                for (ch, x) in self._line_positions:
+                    one_outline_ids = []
+                    for dx, dy in outline_offsets:
+                        oid = self.lyric_canvas.create_text(
+                            x + dx, y + dy, text=ch, fill=OUTLINE_COLOR, font=self.lyric_font, anchor="nw"
+                        )
+                        one_outline_ids.append(oid)
+                    self._outline_items.append(one_outline_ids)
+                    mid = self.lyric_canvas.create_text(
+                        x, y, text=ch, fill=LYRIC_FG, font=self.lyric_font, anchor="nw"
+                    )
+                    self._char_items.append(mid)
+            else:
+                total_w = self._line_width or self.lyric_font.measure(s)
+                x0 = (canvas_w - total_w) // 2
                 one_outline_ids = []
                 for dx, dy in outline_offsets:
                     oid = self.lyric_canvas.create_text(
-                        x + dx, y + dy, text=ch, fill=OUTLINE_COLOR, font=self.lyric_font, anchor="nw"
+                        x0 + dx, y + dy, text=s, fill=OUTLINE_COLOR, font=self.lyric_font, anchor="nw"
                     )
                     one_outline_ids.append(oid)
                 self._outline_items.append(one_outline_ids)
                 mid = self.lyric_canvas.create_text(
-                    x, y, text=ch, fill=LYRIC_FG, font=self.lyric_font, anchor="nw"
+                    x0, y, text=s, fill=LYRIC_FG, font=self.lyric_font, anchor="nw"
                 )
                 self._char_items.append(mid)
-        else:
-            total_w = self._line_width or self.lyric_font.measure(s)
-            x0 = (canvas_w - total_w) // 2
-            one_outline_ids = []
-            for dx, dy in outline_offsets:
-                oid = self.lyric_canvas.create_text(
-                    x0 + dx, y + dy, text=s, fill=OUTLINE_COLOR, font=self.lyric_font, anchor="nw"
-                )
-                one_outline_ids.append(oid)
-            self._outline_items.append(one_outline_ids)
-            mid = self.lyric_canvas.create_text(
-                x0, y, text=s, fill=LYRIC_FG, font=self.lyric_font, anchor="nw"
-            )
-            self._char_items.append(mid)
-
-        if RENDER_TRANSLATION_ON_CANVAS and self.current_translation:
-            trans = self.current_translation
-            trans_width = self.translation_font.measure(trans)
-            tx = (canvas_w - trans_width) // 2
-            ty = y + line_space + TRANSLATION_TOP_GAP
-            for dx, dy in outline_offsets:
-                oid = self.lyric_canvas.create_text(
-                    tx + dx, ty + dy, text=trans, fill=OUTLINE_COLOR,
-                    font=self.translation_font, anchor="nw"
+
+            if RENDER_TRANSLATION_ON_CANVAS and self.current_translation:
+                trans = self.current_translation
+                trans_width = self.translation_font.measure(trans)
+                tx = (canvas_w - trans_width) // 2
+                ty = y + line_space + TRANSLATION_TOP_GAP
+                for dx, dy in outline_offsets:
+                    oid = self.lyric_canvas.create_text(
+                        tx + dx, ty + dy, text=trans, fill=OUTLINE_COLOR,
+                        font=self.translation_font, anchor="nw"
+                    )
+                    self._trans_outline_items.append(oid)
+                self._trans_item = self.lyric_canvas.create_text(
+                    tx, ty, text=trans, fill=TRANSLATION_FG, font=self.translation_font, anchor="nw"
                 )
-                self._trans_outline_items.append(oid)
-            self._trans_item = self.lyric_canvas.create_text(
-                tx, ty, text=trans, fill=TRANSLATION_FG, font=self.translation_font, anchor="nw"
-            )
+        finally:
+            _PERF_REBUILD.end(t0)
 
     def update_lyrics_with_time(self, current_time):
         if not hasattr(self, "last_translation_index"):
@@ -1357,6 +3343,7 @@ class DesktopLyrics:
                 break
 
         line_changed = False
+        index_changed = False
         if current_index != -1 and current_index != self.last_lyric_index:
             self.last_lyric_index = current_index
             self.current_lyric = self.lyrics_data[current_index]['text']
@@ -1367,19 +3354,11 @@ class DesktopLyrics:
                 self.next_line_start = self.current_line_start + LAST_LINE_FALLBACK
             self.current_words = self.lyrics_data[current_index].get("words")
             line_changed = True
+            index_changed = True
 
         if self.translations_data and current_index != -1:
-            target_t = self.lyrics_data[current_index]['time']
-            best_idx = -1
-            best_diff = 1e9
-            for i, tline in enumerate(self.translations_data):
-                diff = abs(tline['time'] - target_t)
-                if diff < best_diff:
-                    best_diff = diff
-                    best_idx = i
-                if tline['time'] - target_t > TRANSLATION_MATCH_WINDOW:
-                    break
-            if best_idx != -1 and best_diff <= TRANSLATION_MATCH_WINDOW:
+            best_idx = find_translation_index(self.translations_data, self.lyrics_data[current_index]['time'])
+            if best_idx != -1:
                 if best_idx != self.last_translation_index or self.current_translation != self.translations_data[best_idx]['text']:
                     self.last_translation_index = best_idx
                     self.current_translation = self.translations_data[best_idx]['text']
@@ -1412,21 +3391,23 @@ class DesktopLyrics:
             self._rebuild_items()
             self._items_dirty = False
 
+        if index_changed:
+            self.scroll_view.on_line_change(current_index)
+            if self._switch_t0 is not None:
+                _PERF_SWITCH_FIRST_LINE.record_ms((time.perf_counter() - self._switch_t0) * 1000.0)
+                self._switch_t0 = None
+
     def _hex_to_rgb(self, hx: str):
-        hx = hx.lstrip('#')
-        return (int(hx[0:2], 16), int(hx[2:4], 16), int(hx[4:6], 16))
+        return hex_to_rgb(hx)
 
     def _rgb_to_hex(self, rgb):
-        return "#{:02X}{:02X}{:02X}".format(*rgb)
+        return rgb_to_hex(rgb)
 
     def _lerp_color_hex(self, a_hex, b_hex, t: float):
-        a = self._hex_to_rgb(a_hex)
-        b = self._hex_to_rgb(b_hex)
-        t = max(0.0, min(1.0, t))
-        return self._rgb_to_hex(tuple(int(round(a[i] + (b[i] - a[i]) * t)) for i in range(3)))
+        return lerp_color_hex(a_hex, b_hex, t)
 
     def _any_char_animating(self, now):
-        if not self.karaoke_enabled or not self._char_items or not self.current_lyric:
+        if not self._karaoke_active() or not self._char_items or not self.current_lyric:
             return False
         s = self.current_lyric
         start_t = self.current_line_start
@@ -1439,58 +3420,36 @@ class DesktopLyrics:
 
     def _frame_delay_ms(self, fps):
         fps = max(1, min(fps, 144))
-        return int(1000 / fps)
+        return int(round(1000 / fps))
 
     def _fallback_karoke_render(self, now):
         s = self.current_lyric
         start_t = self.current_line_start
         end_t = max(start_t + 0.01, self.next_line_start)
-        total = end_t - start_t
-        n = max(1, len(s))
-        char_delay = total / n
-        fade_t = min(KARAOKE_FADE_TIME, max(0.05, char_delay * 0.9))
+        n = len(s)
         updates = []
         for i, mid in enumerate(self._char_items):
-            ch_start = start_t + i * char_delay
-            p = (now - ch_start) / fade_t
-            p = max(0.0, min(1.0, p))
-            color = self._get_color_from_lut(p, self._color_lut)
-            if KARAOKE_SHIMMER > 0.0 and p > 0.5:
-                shimmer = KARAOKE_SHIMMER * max(0.0, math.sin(now * 6.28 + i * 0.6))
-                shimmer_color = self._get_color_from_lut(shimmer, self._shimmer_lut)
-                color = self._lerp_color_hex(color, shimmer_color, shimmer)
-            updates.append((mid, color))
+            p = fallback_char_progress(now, i, start_t, end_t, n)
+            updates.append((mid, karaoke_char_color(p, now, i, self._color_lut, self._shimmer_lut)))
         for mid, color in updates:
             self.lyric_canvas.itemconfig(mid, fill=color)
 
     def animation_tick(self):
+        t0 = _PERF_FRAME.begin()
+        tick_start = time.perf_counter()
+        deadline = self.frame_scheduler.deadline
+        missed = self.frame_scheduler.frame_started(tick_start)
         now = self._now_playback_time()
         self.update_lyrics_with_time(now)
+        scrolling = self.scroll_view.step(tick_start)
 
-        if self.karaoke_enabled and self._char_items and self.current_lyric:
+        if self._karaoke_active() and self._char_items and self.current_lyric:
             if hasattr(self, 'current_words') and self.current_words and len(self.current_words) == len(self._char_items):
                 updates = []
                 for i, mid in enumerate(self._char_items):
                     word = self.current_words[i]
-                    ch_start = word['start']
-                    ch_duration = word['duration']
-                    try:
-                        if ch_duration <= 0:
-                            p = 1.0 if now >= ch_start else 0.0
-                        else:
-                            fade_t = max(MIN_FADE_TIME, min(KARAOKE_FADE_TIME, ch_duration * 0.9))
-                            p = (now - ch_start) / fade_t
-                            p = max(0.0, min(1.0, p))
-                    except ZeroDivisionError:
-                        print(f"[ERROR] ZeroDivisionError: ch_duration={ch_duration}, now={now:.3f}, ch_start={ch_start:.3f}")
-                        p = 0.0
-
-                    color = self._get_color_from_lut(p, self._color_lut)
-                    if KARAOKE_SHIMMER > 0.0 and p > 0.5:
-                        shimmer = KARAOKE_SHIMMER * max(0.0, math.sin(now * 6.28 + i * 0.6))
-                        shimmer_color = self._get_color_from_lut(shimmer, self._shimmer_lut)
-                        color = self._lerp_color_hex(color, shimmer_color, shimmer)
-                    updates.append((mid, color))
+                    p = word_char_progress(now, word['start'], word['duration'])
+                    updates.append((mid, karaoke_char_color(p, now, i, self._color_lut, self._shimmer_lut)))
 
                 for mid, color in updates:
                     self.lyric_canvas.itemconfig(mid, fill=color)
@@ -1499,37 +3458,49 @@ class DesktopLyrics:
 
         dt = time.perf_counter() - self._last_sync_mono
         if dt > TIME_FREEZE_ON_STALE_SEC:
-            next_delay = self._frame_delay_ms(PAUSED_FPS)
+            target_fps = PAUSED_FPS
         else:
-            moving = self._any_char_animating(now)
+            moving = self._any_char_animating(now) or scrolling
             if moving:
                 target_fps = MAX_FPS_MOVING
             else:
                 target_fps = 30 if self.visualizer_enabled else IDLE_FPS
-            next_delay = self._frame_delay_ms(target_fps)
-
-        self.root.after(next_delay, self.animation_tick)
+            target_fps = min(target_fps, self.governor.profile["fps_cap"])
+
+        _PERF_FRAME.end(t0)
+        tick_end = time.perf_counter()
+        self.governor.report_frame(tick_end - tick_start, missed)
+        if TRACE_SLOW_FRAME_MS > 0 and _TRACE.enabled:
+            # 从本该开始的时刻算起：界面线程被别的回调阻塞导致的迟到也算在内
+            stall_ms = (tick_end - min(tick_start, deadline if deadline is not None else tick_start)) * 1000.0
+            if stall_ms > TRACE_SLOW_FRAME_MS:
+                self._on_slow_frame(stall_ms)
+        self.root.after(self.frame_scheduler.next_delay_ms(target_fps, tick_end), self.animation_tick)
 
     def safe_update(self, msg_type, data=None):
+        if msg_type in GENERATION_MESSAGES:
+            # 在入队时盖上歌曲代号，歌词消息始终归属于它之前入队的那首歌
+            with self._enqueue_lock:
+                if msg_type in ("song", "clear"):
+                    self._queued_generation += 1
+                self.message_queue.put((msg_type, (self._queued_generation, data)))
+            return
         self.message_queue.put((msg_type, data))
 
     def process_queue(self):
-        processed = 0
+        t0 = _PERF_QUEUE.begin()
         max_processed = 20
-        pending_updates = {}
         try:
-            while processed < max_processed and not self.message_queue.empty():
-                msg_type, data = self.message_queue.get_nowait()
-                if msg_type == "time":
-                    pending_updates["time"] = data
-                else:
-                    pending_updates[msg_type] = data
-                processed += 1
+            batch = drain_message_queue(self.message_queue, max_processed)
+            _PERF_QUEUE_MSGS.add(len(batch))
 
-            for msg_type, data in pending_updates.items():
+            for msg_type, data in batch:
                 if msg_type == "status":
                     self.update_status(data)
                 elif msg_type == "song":
+                    self.song_generation, data = data
+                    self._switch_t0 = time.perf_counter()
+                    self._current_entry = None
                     self.current_song = data.get('song', '')
                     self.current_artist = data.get('artist', '')
                     song_text = f"{self.current_song} - {self.current_artist}"[:80]
@@ -1537,6 +3508,8 @@ class DesktopLyrics:
                     self.has_lyrics = False
                     self.lyrics_data = []
                     self.translations_data = []
+                    if self.calibrator is not None:
+                        self.calibrator.set_onsets([])
                     self.last_lyric_index = -1
                     self.last_translation_index = -1
                     self.current_lyric = ""
@@ -1560,14 +3533,55 @@ class DesktopLyrics:
                     self._layout_dirty = True
                     self._items_dirty = True
                     self._last_lyric_hash = None
-                    self._draw_center_text("正在加载歌词...", LYRIC_FG)
+                    self.scroll_view.reset()
                     self.translation_label.config(text="")
+                    prepared = self._prepared_songs.pop(self._song_key(data), None)
+                    if prepared is not None:
+                        # 预告过的歌曲：解析和首行排版都已完成，本帧直接生效
+                        _PERF_PREFETCH_HITS.add()
+                        self._sync_time(0.0)
+                        self._apply_parsed_lyrics(prepared)
+                    else:
+                        _PERF_PREFETCH_MISSES.add()
+                        self._draw_center_text("正在加载歌词...", LYRIC_FG)
+                        if LYRIC_LIBRARY_ENABLED:
+                            # 本地库命中时不必等网页端传输歌词；网页端歌词到达后仍以其为准
+                            self._parse_worker.lookup_library(self.song_generation, *self._song_key(data))
                 elif msg_type == "full_lyric":
-                    self._update_full_lyrics(data.get('lyric', ''), data.get('tlyric', ''))
+                    generation, data = data
+                    if generation == self.song_generation:
+                        self._update_full_lyrics(data.get('lyric', ''), data.get('tlyric', ''), data.get('hash'),
+                                                 generation)
+                elif msg_type == "parsed_lyric":
+                    generation, data = data
+                    if generation == self.song_generation:
+                        try:
+                            self._apply_parsed_lyrics(data)
+                        except Exception as e:
+                            print(f"应用缓存歌词时出错: {e}")
+                elif msg_type == "parse_done":
+                    generation, entry = data
+                    if generation == self.song_generation:
+                        self._apply_parsed_lyrics(entry)
+                elif msg_type == "library_done":
+                    generation, entry = data
+                    # 只在网页端歌词尚未生效时使用本地库结果
+                    if generation == self.song_generation and self._current_entry is None:
+                        self._apply_parsed_lyrics(entry)
+                elif msg_type == "upcoming":
+                    self._prefetch_upcoming(data)
+                elif msg_type == "prefetch_done":
+                    self._store_prepared_song(*data)
+                elif msg_type == "parse_failed":
+                    if data == self.song_generation:
+                        self._draw_center_text("歌词解析错误", LYRIC_FG)
                 elif msg_type == "time":
                     self._sync_time(data)
                     self.update_lyrics_with_time(self._now_playback_time())
                 elif msg_type == "clear":
+                    self.song_generation, _ = data
+                    self._switch_t0 = None
+                    self._current_entry = None
                     for ids in self._outline_items:
                         for iid in ids:
                             self.lyric_canvas.delete(iid)
@@ -1585,6 +3599,7 @@ class DesktopLyrics:
                     self._line_width = 0
                     self._last_lyric_hash = None
                     self.current_words = None
+                    self.scroll_view.reset()
                     self.translation_label.config(text="")
                     self.song_label.config(text="等待连接...", fg=SONG_FG)
                     self.current_lyric = ""
@@ -1599,39 +3614,102 @@ class DesktopLyrics:
         except Exception as e:
             print(f"处理队列时出错: {e}")
 
+        _PERF_QUEUE.end(t0)
         self.root.after(100, self.process_queue)
 
     def _is_word_lyrics(self, lyric_text):
-        if not lyric_text:
-            return False
-        return bool(re.search(r'\(\d+,\d+,\d+\)', lyric_text))
+        return lyric_parser.is_word_lyrics(lyric_text)
 
-    def _update_full_lyrics(self, lyric, tlyric):
-        try:
-            self.has_word_lyrics = self._is_word_lyrics(lyric)
-            if self.has_word_lyrics:
-                self.karaoke_enabled = True
-                self.lyrics_data = self.parse_yrc(lyric) if lyric else []
-            else:
-                self.lyrics_data = self.parse_lyrics(lyric) if lyric else []
+    def lookup_parsed_lyric(self, content_hash):
+        """按内容哈希取已解析歌词（线程安全）"""
+        if not content_hash:
+            return None
+        with self._lyric_cache_lock:
+            entry = self._lyric_cache.get(content_hash)
+            if entry is not None:
+                self._lyric_cache.move_to_end(content_hash)
+            return entry
+
+    def _store_parsed_lyric(self, content_hash, entry):
+        if not content_hash:
+            return
+        with self._lyric_cache_lock:
+            self._lyric_cache[content_hash] = entry
+            self._lyric_cache.move_to_end(content_hash)
+            while len(self._lyric_cache) > LYRIC_CACHE_SIZE:
+                self._lyric_cache.popitem(last=False)
 
-            self.translations_data = self.parse_lyrics(tlyric) if tlyric else []
-            self.last_lyric_index = -1
-            self.last_translation_index = -1
-            self.current_words = None
-            self.current_translation = ""
-            self.translation_label.config(text="")
-            self.has_lyrics = bool(self.lyrics_data)
-            self._clear_placeholder()
-            if not self.has_lyrics:
-                self._draw_center_text("当前歌曲无歌词/正在等待网页传输", LYRIC_FG)
-            self._update_tray_menu()
+    def _parse_lyric_entry(self, lyric, tlyric):
+        return lyric_parser.parse_lyric_entry(lyric, tlyric)
+
+    def _update_full_lyrics(self, lyric, tlyric, content_hash=None, generation=None):
+        try:
+            entry = self.lookup_parsed_lyric(content_hash)
+            if entry is None:
+                # 解析放到后台线程，期间继续显示当前内容或占位文字；代号取消息自带的
+                if generation is None:
+                    generation = self.song_generation
+                self._parse_worker.submit(generation, lyric, tlyric, content_hash)
+                return
+            self._apply_parsed_lyrics(entry)
         except Exception as e:
             print(f"解析歌词时出错: {e}")
             self._draw_center_text("歌词解析错误", LYRIC_FG)
 
+    @staticmethod
+    def _song_key(payload):
+        return (str(payload.get('song', '')).strip(), str(payload.get('artist', '')).strip())
+
+    def _prefetch_upcoming(self, tracks):
+        for track in tracks[:UPCOMING_MAX_TRACKS]:
+            key = self._song_key(track)
+            if key in self._prepared_songs:
+                continue
+            entry = self.lookup_parsed_lyric(track.get('hash'))
+            if entry is not None:
+                self._store_prepared_song(key, entry)
+            elif track.get('lyric'):
+                self._parse_worker.prefetch(key, track['lyric'], track.get('tlyric', ''), track.get('hash'))
+
+    def _store_prepared_song(self, key, entry):
+        """保存预解析结果，并提前排版首行（字体测量只能在界面线程进行）"""
+        if entry["lyrics"]:
+            karaoke = True if entry["word"] else self._karaoke_active()
+            self._line_layout(entry["lyrics"][0]["text"], karaoke)
+        self._prepared_songs[key] = entry
+        self._prepared_songs.move_to_end(key)
+        while len(self._prepared_songs) > PREPARED_SONG_CACHE_SIZE:
+            self._prepared_songs.popitem(last=False)
+
+    def _apply_parsed_lyrics(self, entry):
+        if entry is self._current_entry:
+            # 预告歌曲已生效后，网页端随后发送的同一份歌词无需再应用
+            return
+        self._current_entry = entry
+        if self._switch_t0 is not None:
+            _PERF_SWITCH_READY.record_ms((time.perf_counter() - self._switch_t0) * 1000.0)
+        self.has_word_lyrics = entry["word"]
+        if self.has_word_lyrics:
+            self.karaoke_enabled = True
+        self.lyrics_data = entry["lyrics"]
+        self.translations_data = entry["translations"]
+        if self.calibrator is not None:
+            self.calibrator.set_onsets(self._word_onsets())
+        self.scroll_view.reset()
+        self.last_lyric_index = -1
+        self.last_translation_index = -1
+        self.current_words = None
+        self.current_translation = ""
+        self.translation_label.config(text="")
+        self.has_lyrics = bool(self.lyrics_data)
+        self._clear_placeholder()
+        if not self.has_lyrics:
+            self._draw_center_text("当前歌曲无歌词/正在等待网页传输", LYRIC_FG)
+        self._update_tray_menu()
+
     def _draw_center_text(self, text: str, color: str):
         self.lyric_canvas.delete("all")
+        self.scroll_view.reset()
         if not text:
             return
         canvas_w = max(1, self.lyric_canvas.winfo_width())
@@ -1655,62 +3733,646 @@ class DesktopLyrics:
             self._quit()
 
 # ------- WebSocket 服务器 -------
-def start_websocket_server(desktop_lyrics):
-    async def handle_connection(websocket):
+def lyric_content_hash(lyric, tlyric):
+    """歌词内容哈希：sha1(歌词 + NUL + 翻译)，UTF-8 编码，网页端按相同规则计算"""
+    h = hashlib.sha1()
+    h.update((lyric or "").encode("utf-8"))
+    h.update(b"\x00")
+    h.update((tlyric or "").encode("utf-8"))
+    return h.hexdigest()
+
+def _build_ws_extensions():
+    from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+    return [ServerPerMessageDeflateFactory(
+        server_max_window_bits=WS_DEFLATE_WINDOW_BITS,
+        client_max_window_bits=WS_DEFLATE_WINDOW_BITS,
+        compress_settings={"level": WS_DEFLATE_LEVEL, "memLevel": WS_DEFLATE_MEM_LEVEL},
+    )]
+
+class ClientSession:
+    """单个网页客户端的歌曲/歌词/时钟状态"""
+    def __init__(self, websocket, client_id):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.song = None
+        self.lyric = None            # (消息类型, 数据)，切换为活动源时重放
+        self.last_time = 0.0
+        self.last_time_mono = 0.0
+        self.connected_at = time.perf_counter()
+
+    def is_playing(self, now_mono):
+        return now_mono - self.last_time_mono <= TIME_FREEZE_ON_STALE_SEC
+
+
+class SessionManager:
+    """多客户端会话：只有活动源的消息会进入界面队列
+
+    活动源为最近在播放（持续发送 time）的客户端；当前活动源停止发送 time
+    超过 TIME_FREEZE_ON_STALE_SEC 后才允许其他客户端接管，或由客户端发送
+    focus 消息显式抢占。非活动源的 song/歌词只记录在会话中，time 直接丢弃。
+    所有方法都只在 WebSocket 事件循环线程中调用。
+    """
+    def __init__(self, desktop_lyrics):
+        self.app = desktop_lyrics
+        self.sessions = {}
+        self.active = None
+        self._next_id = 1
+        self.dropped_time_updates = 0
+
+    def add(self, websocket):
+        session = ClientSession(websocket, self._next_id)
+        self._next_id += 1
+        self.sessions[websocket] = session
+        if self.active is None:
+            self.active = session
+        self.app.safe_update("status", "connected")
+        return session
+
+    def remove(self, websocket):
+        session = self.sessions.pop(websocket, None)
+        if session is None:
+            return
+        if not self.sessions:
+            self.active = None
+            self.app.safe_update("status", "disconnected")
+        elif session is self.active:
+            # 活动源断开：交给最近一次发送过 time 的客户端
+            successor = max(self.sessions.values(),
+                            key=lambda c: (c.last_time_mono, c.connected_at))
+            self._activate(successor)
+
+    def on_song(self, session, payload):
+        session.song = payload
+        session.lyric = None
+        if session is self.active:
+            self.app.safe_update("song", payload)
+
+    def on_lyric(self, session, msg_type, payload):
+        session.lyric = (msg_type, payload)
+        if session is self.active:
+            self.app.safe_update(msg_type, payload)
+
+    def on_upcoming(self, session, tracks):
+        if session is self.active:
+            self.app.safe_update("upcoming", tracks)
+
+    def on_time(self, session, current_time):
+        now_mono = time.perf_counter()
+        session.last_time = current_time
+        session.last_time_mono = now_mono
+        active = self.active
+        if active is not session:
+            if active is not None and active.is_playing(now_mono):
+                self.dropped_time_updates += 1
+                return
+            self._activate(session)
+        self.app.safe_update("time", current_time)
+
+    def focus(self, session):
+        if session is not self.active:
+            self._activate(session)
+
+    def _activate(self, session):
+        print(f"切换活动客户端 -> #{session.client_id}")
+        self.active = session
+        if session.song is not None:
+            self.app.safe_update("song", session.song)
+        if session.lyric is not None:
+            self.app.safe_update(*session.lyric)
+        if session.last_time_mono:
+            self.app.safe_update("time", session.last_time)
+
+
+class _StreamConnection:
+    """把本地流连接（Unix 套接字/命名管道）包装成与 websocket 相同的接口
+
+    消息以换行分隔的 UTF-8 JSON 传输，handle_connection 无需区分传输方式。
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise StopAsyncIteration
+            line = line.strip()
+            if line:
+                return line.decode("utf-8")
+
+    async def send(self, message):
+        self.writer.write(message.encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+    async def close(self):
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class SpectrumSubscriber:
+    """一个订阅频谱的连接：按协商帧率限流，最多一帧在发送、一帧待发"""
+    __slots__ = ("websocket", "fmt", "interval", "next_due", "sending", "pending", "sent", "dropped")
+
+    def __init__(self, websocket, fps, fmt):
+        self.websocket = websocket
+        self.fmt = fmt
+        self.interval = 1.0 / fps
+        self.next_due = 0.0
+        self.sending = False
+        self.pending = None
+        self.sent = 0
+        self.dropped = 0
+
+
+# 二进制帧头：协议版本、格式编号、律动条数、序号（小端），其后紧跟各律动条的值
+SPECTRUM_HEADER = struct.Struct("<BBHI")
+SPECTRUM_FORMATS = {"u8": (0, "uint8"), "f16": (1, "float16")}
+
+
+def encode_spectrum_frame(levels, fmt, seq):
+    """把 0~1 的律动条数值编码为一帧：u8 量化到 0~255，f16 保留半精度；返回 memoryview"""
+    code, dtype = SPECTRUM_FORMATS[fmt]
+    n = len(levels)
+    head = SPECTRUM_HEADER.size
+    buf = bytearray(head + n * np.dtype(dtype).itemsize)
+    SPECTRUM_HEADER.pack_into(buf, 0, SPECTRUM_PROTOCOL_VERSION, code, n, seq)
+    payload = np.frombuffer(buf, dtype=dtype, offset=head)
+    if code == 0:
+        payload[:] = np.clip(levels * 255.0 + 0.5, 0.0, 255.0)
+    else:
+        payload[:] = levels
+    return memoryview(buf)
+
+
+class SpectrumPublisher:
+    """把音频线程算出的律动条数值分发给订阅的 WebSocket 客户端
+
+    publish() 在音频线程调用：每种在用的格式只编码一次，整帧通过 call_soon_threadsafe
+    交给事件循环，所有订阅者共享同一块缓冲（帧发布后不再修改，发送时不复制）。
+    每个订阅者最多一帧在发送中；发送未完成时新帧只替换待发帧，旧帧直接丢弃，
+    慢客户端不会让服务端积压。其余方法只在事件循环线程调用。
+    """
+    def __init__(self):
+        self.loop = None
+        self.subscribers = {}
+        self.active = False
+        self.seq = 0
+        self.frames_published = 0
+        self._formats = frozenset()
+
+    def attach(self, loop):
+        self.loop = loop
+
+    def detach(self):
+        self.loop = None
+        self.subscribers.clear()
+        self._refresh()
+
+    def _refresh(self):
+        self._formats = frozenset(sub.fmt for sub in self.subscribers.values())
+        self.active = bool(self.subscribers)
+
+    def subscribe(self, websocket, fps, fmt):
+        fps = max(1, min(int(fps), SPECTRUM_MAX_FPS))
+        sub = SpectrumSubscriber(websocket, fps, fmt)
+        self.subscribers[websocket] = sub
+        self._refresh()
+        return sub
+
+    def unsubscribe(self, websocket):
+        if self.subscribers.pop(websocket, None) is not None:
+            self._refresh()
+
+    def publish(self, levels):
+        loop = self.loop
+        if loop is None or not self.active:
+            return
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        frames = {fmt: encode_spectrum_frame(levels, fmt, self.seq) for fmt in self._formats}
+        self.frames_published += 1
+        try:
+            loop.call_soon_threadsafe(self._dispatch, frames, time.perf_counter())
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _dispatch(self, frames, now):
+        for sub in list(self.subscribers.values()):
+            if now < sub.next_due:
+                continue
+            sub.next_due = max(sub.next_due + sub.interval, now)
+            frame = frames.get(sub.fmt)
+            if frame is None:
+                continue
+            if sub.sending:
+                if sub.pending is not None:
+                    sub.dropped += 1
+                sub.pending = frame
+                continue
+            sub.sending = True
+            self.loop.create_task(self._send(sub, frame))
+
+    async def _send(self, sub, frame):
+        try:
+            while frame is not None:
+                await sub.websocket.send(frame)
+                sub.sent += 1
+                frame, sub.pending = sub.pending, None
+        except Exception:
+            # 连接已断开，由 handle_connection 的清理逻辑收尾
+            self.unsubscribe(sub.websocket)
+        finally:
+            sub.sending = False
+
+    def snapshot(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "frames_published": self.frames_published,
+            "clients": [{"format": sub.fmt, "fps": round(1.0 / sub.interval, 1),
+                         "sent": sub.sent, "dropped": sub.dropped}
+                        for sub in list(self.subscribers.values())],
+        }
+
+
+def _ensure_private_dir(path):
+    """创建仅当前用户可访问的目录；已存在时检查属主和权限，不信任他人创建的同名目录"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError(f"{path} 不是当前用户独占的目录")
+
+
+class LyricsServer:
+    """WebSocket 服务器：在独立线程中持有自己的事件循环（可选 uvloop）
+
+    close_all()/stop()/stats() 可在任意线程调用；stop() 在有限时间内完成关闭，可重复调用，
+    停止后可再次 start()。
+    """
+    def __init__(self, desktop_lyrics, host="localhost", port=None,
+                 ipc_address=None, ipc_enabled=IPC_ENABLED):
+        self.app = desktop_lyrics
+        self.host = host
+        self.port = port or WEBSOCKET_PORT
+        self.ipc_enabled = ipc_enabled
+        if ipc_address is None:
+            ipc_address = IPC_PIPE_NAME if sys.platform == "win32" else IPC_SOCKET_PATH
+        self.ipc_address = ipc_address
+        self.sessions = SessionManager(desktop_lyrics)
+        self.spectrum = getattr(desktop_lyrics, "spectrum", None) or SpectrumPublisher()
+        self.loop = None
+        self.thread = None
+        self._stop_future = None
+        self._stopping = False
+        self.messages_total = 0
+        self._reset_rate()
+
+    def _reset_rate(self):
+        self.message_rate = 0.0
+        self._rate_count = 0
+        self._rate_start = time.perf_counter()
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._stopping = False
+        self._stop_future = None
+        self._reset_rate()
+        self.thread = threading.Thread(target=self._run, name="websocket-server", daemon=True)
+        self.thread.start()
+
+    def _new_loop(self):
+        if uvloop is not None:
+            return uvloop.new_event_loop()
+        return asyncio.new_event_loop()
+
+    def _run(self):
+        _import_websockets()
+        loop = self._new_loop()
+        self.loop = loop
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._serve())
+        except Exception as e:
+            print(f"WebSocket服务器错误: {e}")
+        finally:
+            loop.close()
+            self.loop = None
+            # 速率只在事件循环运行期间有意义，停止后不再报告上一次运行的值
+            self._reset_rate()
+            print("WebSocket服务器已停止")
+
+    async def _serve(self):
+        self._stop_future = self.loop.create_future()
+        self.spectrum.attach(self.loop)
+        async with websockets.serve(self._handle_connection, self.host, self.port,
+                                    compression=None, extensions=_build_ws_extensions(),
+                                    process_request=self._process_request,
+                                    max_size=WS_MAX_MESSAGE_SIZE,
+                                    close_timeout=WS_CLOSE_TIMEOUT):
+            loop_name = "uvloop" if uvloop is not None else "asyncio"
+            print(f"WebSocket服务器已启动，监听端口 {self.port}（{loop_name}）")
+            _trace_startup("WebSocket 已开始监听")
+            ipc_servers = await self._start_ipc_transport()
+            try:
+                if not self._stopping:
+                    await self._stop_future
+                await self._close_clients()
+            finally:
+                self.spectrum.detach()
+                await self._stop_ipc_transport(ipc_servers)
+
+    @staticmethod
+    def _process_request(connection, request):
+        # 频谱帧是量化后的随机数值，压缩几乎没有收益，却要为每个订阅者各做一次 deflate
+        if request.path.split("?", 1)[0] == SPECTRUM_WS_PATH:
+            connection.protocol.available_extensions = None
+        return None
+
+    async def _start_ipc_transport(self):
+        if not self.ipc_enabled:
+            return []
+        try:
+            if sys.platform == "win32":
+                servers = await self._start_named_pipe()
+            else:
+                servers = await self._start_unix_socket()
+            print(f"本地IPC通道已启动: {self.ipc_address}")
+            return servers
+        except Exception as e:
+            print(f"本地IPC通道启动失败: {e}")
+            return []
+
+    async def _start_unix_socket(self):
+        path = self.ipc_address
+        _ensure_private_dir(os.path.dirname(path))
+        await self._remove_stale_socket(path)
+        server = await asyncio.start_unix_server(self._handle_stream, path=path,
+                                                 limit=WS_MAX_MESSAGE_SIZE)
+        os.chmod(path, 0o600)
+        return [server]
+
+    async def _remove_stale_socket(self, path):
+        """只删除无人监听的残留套接字；仍有实例在监听或路径不是套接字时拒绝启动"""
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(st.st_mode):
+            raise OSError(f"{path} 已存在且不是套接字")
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), IPC_PROBE_TIMEOUT)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+            return
+        except asyncio.TimeoutError:
+            raise OSError(f"{path} 上的实例无响应")
+        writer.close()
+        raise OSError(f"{path} 已有实例在监听")
+
+    async def _start_named_pipe(self):
+        # 仅 ProactorEventLoop（Windows 默认事件循环）支持命名管道
+        loop = self.loop
+
+        def factory():
+            reader = asyncio.StreamReader(limit=WS_MAX_MESSAGE_SIZE)
+            return asyncio.StreamReaderProtocol(reader, self._handle_stream)
+
+        return await loop.start_serving_pipe(factory, self.ipc_address)
+
+    async def _stop_ipc_transport(self, servers):
+        for server in servers:
+            try:
+                server.close()
+            except Exception:
+                pass
+        if servers and sys.platform != "win32":
+            try:
+                os.unlink(self.ipc_address)
+            except OSError:
+                pass
+
+    async def _handle_stream(self, reader, writer):
+        await self._handle_connection(_StreamConnection(reader, writer))
+
+    async def _close_clients(self):
+        clients = list(self.sessions.sessions)
+        if not clients:
+            return
+        tasks = [asyncio.ensure_future(ws.close()) for ws in clients]
+        await asyncio.wait(tasks, timeout=WS_CLOSE_TIMEOUT)
+
+    def _count_message(self):
+        self.messages_total += 1
+        self._rate_count += 1
+        now = time.perf_counter()
+        elapsed = now - self._rate_start
+        if elapsed >= 1.0:
+            self.message_rate = self._rate_count / elapsed
+            self._rate_count = 0
+            self._rate_start = now
+
+    async def _handle_connection(self, websocket):
         print("客户端已连接")
-        desktop_lyrics.connected_clients.add(websocket)
-        desktop_lyrics.safe_update("status", "connected")
+        sessions = self.sessions
+        desktop_lyrics = self.app
+        session = sessions.add(websocket)
+        span_id = id(websocket)
+        if _TRACE.enabled:
+            _TRACE.async_begin("handle_connection", span_id)
         try:
             async for message in websocket:
+                self._count_message()
+                if _TRACE.enabled:
+                    _TRACE.async_begin("ws_message", span_id)
                 try:
                     data = json.loads(message)
                     if data.get('type') == 'ping':
                         await websocket.send(json.dumps({'type': 'pong'}))
                         continue
                     msg_type = data.get('type')
+                    if msg_type == 'stats':
+                        # 导出性能统计，可附带 enable 开关远程开启/关闭采集
+                        if 'enable' in data:
+                            perf_stats.registry.set_enabled(bool(data['enable']))
+                        await websocket.send(json.dumps({
+                            'type': 'stats',
+                            'perf': perf_stats.registry.snapshot(),
+                            'server': self.stats(),
+                            'quality': desktop_lyrics.governor.snapshot(),
+                            'frames': desktop_lyrics.frame_scheduler.snapshot(),
+                            'calibration': desktop_lyrics.calibrator.snapshot() if desktop_lyrics.calibrator else None,
+                            'audio_device': AUDIO_DEVICES.snapshot()
+                        }))
+                        continue
                     if msg_type == 'song':
-                        desktop_lyrics.safe_update("song", {
+                        sessions.on_song(session, {
                             'song': data.get('song', ''),
                             'artist': data.get('artist', '')
                         })
+                    elif msg_type == 'lyric_hash':
+                        # 网页端先发送歌词哈希，命中缓存则无需再传输完整歌词
+                        content_hash = str(data.get('hash', ''))
+                        entry = desktop_lyrics.lookup_parsed_lyric(content_hash)
+                        if entry is not None:
+                            sessions.on_lyric(session, "parsed_lyric", entry)
+                        await websocket.send(json.dumps({
+                            'type': 'lyric_cache',
+                            'hash': content_hash,
+                            'cached': entry is not None
+                        }))
                     elif msg_type == 'full_lyric':
-                        desktop_lyrics.safe_update("full_lyric", {
-                            'lyric': data.get('lyric', ''),
-                            'tlyric': data.get('tlyric', '')
+                        lyric = data.get('lyric', '')
+                        tlyric = data.get('tlyric', '')
+                        sessions.on_lyric(session, "full_lyric", {
+                            'lyric': lyric,
+                            'tlyric': tlyric,
+                            'hash': lyric_content_hash(lyric, tlyric)
                         })
+                    elif msg_type == 'upcoming':
+                        # 网页端预告接下来的曲目，桌面端提前解析并排版首行，切歌时直接生效
+                        tracks = []
+                        for track in (data.get('tracks') or [])[:UPCOMING_MAX_TRACKS]:
+                            lyric = track.get('lyric', '')
+                            tlyric = track.get('tlyric', '')
+                            tracks.append({
+                                'song': track.get('song', ''),
+                                'artist': track.get('artist', ''),
+                                'lyric': lyric,
+                                'tlyric': tlyric,
+                                # 只带哈希的曲目依赖缓存；带歌词时以服务端计算的哈希为准
+                                'hash': lyric_content_hash(lyric, tlyric) if lyric else str(track.get('hash', ''))
+                            })
+                        sessions.on_upcoming(session, tracks)
                     elif msg_type == 'time':
-                        desktop_lyrics.safe_update("time", data.get('currentTime', 0))
+                        sessions.on_time(session, data.get('currentTime', 0))
+                    elif msg_type == 'focus':
+                        sessions.focus(session)
+                    elif msg_type == 'spectrum_subscribe':
+                        await self._subscribe_spectrum(websocket, data)
+                    elif msg_type == 'spectrum_unsubscribe':
+                        self.spectrum.unsubscribe(websocket)
                 except json.JSONDecodeError:
                     print("收到无效的JSON消息")
                 except Exception as e:
                     print(f"处理消息时出错: {e}")
+                finally:
+                    if _TRACE.enabled:
+                        _TRACE.async_end("ws_message", span_id)
         except websockets.exceptions.ConnectionClosed:
             print("客户端已断开连接")
-            desktop_lyrics.safe_update("status", "disconnected")
         except Exception as e:
             print(f"连接错误: {e}")
-            desktop_lyrics.safe_update("status", "disconnected")
         finally:
-            if websocket in desktop_lyrics.connected_clients:
-                desktop_lyrics.connected_clients.remove(websocket)
+            self.spectrum.unsubscribe(websocket)
+            sessions.remove(websocket)
+            if _TRACE.enabled:
+                _TRACE.async_end("handle_connection", span_id)
+
+    async def _subscribe_spectrum(self, websocket, data):
+        """订阅律动条频谱：{"type": "spectrum_subscribe", "fps": 30, "format": "u8" | "f16"}
+
+        只接受连接到 SPECTRUM_WS_PATH、未启用压缩的连接。
+        """
+        fmt = data.get('format', 'u8')
+        if fmt not in SPECTRUM_FORMATS:
+            error = f'unknown format: {fmt}'
+        elif isinstance(websocket, _StreamConnection):
+            # 本地 IPC 通道按行传输文本，不支持二进制帧
+            error = 'unsupported transport'
+        elif websocket.protocol.extensions:
+            error = 'compressed connection'
+        else:
+            error = None
+        if error:
+            await websocket.send(json.dumps({
+                'type': 'spectrum_error',
+                'error': error,
+                'path': SPECTRUM_WS_PATH
+            }))
+            return
+        try:
+            fps = float(data.get('fps', SPECTRUM_DEFAULT_FPS))
+        except (TypeError, ValueError):
+            fps = SPECTRUM_DEFAULT_FPS
+        sub = self.spectrum.subscribe(websocket, fps, fmt)
+        await websocket.send(json.dumps({
+            'type': 'spectrum_info',
+            'version': SPECTRUM_PROTOCOL_VERSION,
+            'format': fmt,
+            'fps': round(1.0 / sub.interval, 1),
+            'header': '<BBHI',
+            'header_size': SPECTRUM_HEADER.size
+        }))
+
+    def _call_in_loop(self, callback, *args):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+            return True
+        except RuntimeError:
+            # 事件循环已关闭
+            return False
 
-    async def websocket_server():
-        async with websockets.serve(handle_connection, "localhost", WEBSOCKET_PORT):
-            print(f"WebSocket服务器已启动，监听端口 {WEBSOCKET_PORT}")
-            await asyncio.Future()
+    def _request_stop(self):
+        self._stopping = True
+        if self._stop_future is not None and not self._stop_future.done():
+            self._stop_future.set_result(None)
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(websocket_server())
-    except Exception as e:
-        print(f"WebSocket服务器错误: {e}")
-    finally:
-        loop.close()
+    def close_all(self):
+        """断开所有客户端（线程安全）"""
+        self._call_in_loop(lambda: asyncio.ensure_future(self._close_clients()))
+
+    def stop(self, timeout=WS_SHUTDOWN_TIMEOUT):
+        """停止服务器并等待线程退出，返回是否在超时内完成；已停止时直接返回 True"""
+        self._stopping = True
+        thread = self.thread
+        if thread is None:
+            return True
+        self._call_in_loop(self._request_stop)
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        self.thread = None
+        return True
+
+    def connection_count(self):
+        return len(self.sessions.sessions)
+
+    def stats(self):
+        active = self.sessions.active
+        return {
+            "connections": self.connection_count(),
+            "active_client": active.client_id if active else None,
+            "messages_total": self.messages_total,
+            "message_rate": round(self.message_rate, 1),
+            "dropped_time_updates": self.sessions.dropped_time_updates,
+            "spectrum": self.spectrum.snapshot(),
+            "event_loop": "uvloop" if uvloop is not None else "asyncio",
+        }
 
 if __name__ == "__main__":
+    # 打包后的 exe 中，子进程解析歌词需要 freeze_support
+    multiprocessing.freeze_support()
+    STARTUP_TRACE = "--startup-trace" in sys.argv
+    _trace_startup("模块导入完成")
     app = DesktopLyrics()
-    server_thread = threading.Thread(target=start_websocket_server, args=(app,), daemon=True)
-    server_thread.start()
+    app.server = LyricsServer(app)
+    app.server.start()
+    # 启动阶段创建的对象移出分代回收：切歌时解析/查库会分配大量小对象，
+    # 触发的完整回收不必再扫描整个 Tk/模块对象图（否则 p99 多出数毫秒）
+    gc.freeze()
     app.run()
+    app.server.stop()
     print("程序已退出")
@@ -0,0 +1,304 @@
+"""离线歌词渲染：把一段时间内的卡拉OK效果渲染为 PNG 序列或动图，不创建窗口
+
+布局与着色沿用歌词窗口的逻辑（逐字居中排版、颜色查找表、描边、翻译位置），
+只是画到 Pillow 图像上。帧按连续区间分给进程池并行渲染，每个进程按行缓存排版结果
+和“描边+翻译”底图，逐帧只需重画当前行的字符颜色。
+
+也可以当作渲染器的黄金图对比工具：--check DIR 会把渲染结果与 DIR 中同名 PNG 逐像素比较。
+
+用法:
+    python lyric_export.py song.yrc --start 10 --end 20 --out frames/
+    python lyric_export.py song.lrc --tlyric song.trans.lrc --start 0 --end 8 --fps 25 --out clip.gif
+    python lyric_export.py song.yrc --start 10 --end 12 --check golden/
+"""
+import argparse
+import bisect
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import desktop_lyrics as dl
+import lyric_parser
+
+EXPORT_FPS = 30
+EXPORT_SIZE = (1280, 160)
+EXPORT_TARGET_FPS_PER_CORE = 60   # 吞吐目标：每个核心每秒渲染的帧数
+LAYOUT_CACHE_SIZE = 8             # 每个进程缓存的行底图数量，帧按时间连续分配，命中率很高
+ANIMATED_EXTS = (".gif", ".png", ".webp")
+
+
+def read_lyric_file(path):
+    if not path:
+        return ""
+    with open(path, encoding="utf-8-sig") as f:
+        return f.read()
+
+
+def parse_lyric_files(lyric_path, tlyric_path=None):
+    return lyric_parser.parse_lyric_entry(read_lyric_file(lyric_path), read_lyric_file(tlyric_path))
+
+
+def _default_font_path():
+    windir = os.environ.get("WINDIR")
+    if windir:
+        for name in ("msyh.ttc", "msyhbd.ttc", "simhei.ttf"):
+            path = os.path.join(windir, "Fonts", name)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def _load_font(path, size):
+    from PIL import ImageFont
+    path = path or _default_font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _linespace(font):
+    ascent, descent = font.getmetrics()
+    return ascent + descent
+
+
+class _LineLayout:
+    __slots__ = ("positions", "words", "start", "end", "base")
+
+    def __init__(self, positions, words, start, end, base):
+        self.positions = positions
+        self.words = words
+        self.start = start
+        self.end = end
+        self.base = base
+
+
+class FrameRenderer:
+    """按播放时刻渲染一帧，排版规则与 DesktopLyrics._prepare_line_layout/_rebuild_items 一致"""
+
+    def __init__(self, entry, size=EXPORT_SIZE, font_path=None, background=None, transparent=False):
+        from PIL import Image
+        self._Image = Image
+        self.lyrics = entry["lyrics"]
+        self.translations = entry["translations"]
+        self.times = [line["time"] for line in self.lyrics]
+        self.width, self.height = size
+        self.lyric_font = _load_font(font_path, dl.LYRIC_FONT_SIZE)
+        self.translation_font = _load_font(font_path, dl.TRANSLATION_FONT_SIZE)
+        self.mode = "RGBA" if transparent else "RGB"
+        if transparent:
+            self.background = (0, 0, 0, 0)
+        else:
+            self.background = dl.hex_to_rgb(background or "#000000")
+        self.color_lut = dl.build_color_lut(dl.LYRIC_FG, dl.KARAOKE_HL_COLOR, dl.COLOR_LUT_STEPS)
+        self.shimmer_lut = dl.build_color_lut(dl.KARAOKE_HL_COLOR, "#FFFFFF", dl.SHIMMER_LUT_STEPS)
+        self.outline = dl.outline_offsets(dl.OUTLINE_SIZE, dl.OUTLINE_NEIGHBORS)
+        self._layouts = OrderedDict()
+        self._blank = Image.new(self.mode, size, self.background)
+
+    def _text(self, draw, x, y, text, font, fill):
+        for dx, dy in self.outline:
+            draw.text((x + dx, y + dy), text, font=font, fill=dl.OUTLINE_COLOR)
+        if fill is not None:
+            draw.text((x, y), text, font=font, fill=fill)
+
+    def _build_layout(self, idx):
+        from PIL import ImageDraw
+        line = self.lyrics[idx]
+        s = line["text"]
+        widths = [round(self.lyric_font.getlength(ch)) for ch in s]
+        x = (self.width - sum(widths)) // 2
+        line_space = _linespace(self.lyric_font)
+        y = (self.height - line_space) // 2
+        positions = []
+        for ch, w in zip(s, widths):
+            positions.append((ch, x, y))
+            x += w
+
+        # 底图：每个字符的描边和整行翻译，逐帧只在其上绘制字符本身
+        base = self._Image.new(self.mode, (self.width, self.height), self.background)
+        draw = ImageDraw.Draw(base)
+        for ch, cx, cy in positions:
+            self._text(draw, cx, cy, ch, self.lyric_font, None)
+        if dl.RENDER_TRANSLATION_ON_CANVAS and self.translations:
+            t_idx = dl.find_translation_index(self.translations, line["time"])
+            if t_idx != -1:
+                trans = self.translations[t_idx]["text"]
+                tx = (self.width - round(self.translation_font.getlength(trans))) // 2
+                ty = y + line_space + dl.TRANSLATION_TOP_GAP
+                self._text(draw, tx, ty, trans, self.translation_font, dl.TRANSLATION_FG)
+
+        start = line["time"]
+        if idx + 1 < len(self.lyrics):
+            end = self.lyrics[idx + 1]["time"]
+        else:
+            end = start + dl.LAST_LINE_FALLBACK
+        words = line.get("words")
+        if words and len(words) != len(s):
+            words = None
+        return _LineLayout(positions, words, start, max(start + 0.01, end), base)
+
+    def _layout(self, idx):
+        layout = self._layouts.get(idx)
+        if layout is None:
+            layout = self._layouts[idx] = self._build_layout(idx)
+            while len(self._layouts) > LAYOUT_CACHE_SIZE:
+                self._layouts.popitem(last=False)
+        else:
+            self._layouts.move_to_end(idx)
+        return layout
+
+    def render(self, now):
+        from PIL import ImageDraw
+        idx = bisect.bisect_right(self.times, now) - 1
+        if idx < 0:
+            return self._blank.copy()
+        layout = self._layout(idx)
+        img = layout.base.copy()
+        draw = ImageDraw.Draw(img)
+        n = len(layout.positions)
+        for i, (ch, x, y) in enumerate(layout.positions):
+            if layout.words:
+                word = layout.words[i]
+                p = dl.word_char_progress(now, word["start"], word["duration"])
+            else:
+                p = dl.fallback_char_progress(now, i, layout.start, layout.end, n)
+            color = dl.karaoke_char_color(p, now, i, self.color_lut, self.shimmer_lut)
+            draw.text((x, y), ch, font=self.lyric_font, fill=color)
+        return img
+
+
+def render_frame(entry, now, **options):
+    """渲染单帧，便于在测试中与黄金图比较"""
+    return FrameRenderer(entry, **options).render(now)
+
+
+# ------- 进程池 -------
+_RENDERER = None
+
+
+def _init_worker(entry, options, use_config):
+    global _RENDERER
+    if use_config:
+        dl.ConfigManager().load()
+    _RENDERER = FrameRenderer(entry, **options)
+
+
+def _render_chunk(frames, out_dir, check_dir):
+    """渲染一段连续帧；写入 out_dir 或与 check_dir 比较，否则返回原始像素供主进程合成动图"""
+    from PIL import Image, ImageChops
+    results = []
+    for index, now in frames:
+        img = _RENDERER.render(now)
+        name = f"frame_{index:05d}.png"
+        if check_dir:
+            path = os.path.join(check_dir, name)
+            if not os.path.exists(path):
+                results.append((index, "missing"))
+            else:
+                with Image.open(path) as golden:
+                    if golden.size != img.size or ImageChops.difference(
+                            golden.convert(img.mode), img).getbbox() is not None:
+                        results.append((index, "mismatch"))
+        elif out_dir:
+            img.save(os.path.join(out_dir, name), compress_level=1)
+        else:
+            results.append((index, img.tobytes()))
+    return len(frames), results
+
+
+def _chunks(frames, workers):
+    # 每个进程拿到几段连续帧，既能均衡负载又能命中行缓存
+    size = max(1, len(frames) // (workers * 4))
+    return [frames[i:i + size] for i in range(0, len(frames), size)]
+
+
+def export(entry, start, end, fps=EXPORT_FPS, out=None, check_dir=None, workers=None,
+           use_config=True, **options):
+    """渲染 [start, end) 内的帧，返回 (帧数, 耗时秒, 结果列表)"""
+    workers = workers or os.cpu_count() or 1
+    n = max(0, int(round((end - start) * fps)))
+    frames = [(i, start + i / fps) for i in range(n)]
+    # 与黄金图比较时不输出任何文件，只有不比较时才收集原始像素合成动图
+    animated = bool(out) and not check_dir and out.lower().endswith(ANIMATED_EXTS)
+    out_dir = None if (animated or check_dir) else out
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(entry, options, use_config)) as pool:
+        futures = [pool.submit(_render_chunk, chunk, out_dir, check_dir) for chunk in _chunks(frames, workers)]
+        for fut in futures:
+            results.extend(fut.result()[1])
+    elapsed = time.perf_counter() - t0
+
+    if animated and results:
+        from PIL import Image
+        mode = "RGBA" if options.get("transparent") else "RGB"
+        size = options.get("size", EXPORT_SIZE)
+        images = [Image.frombytes(mode, size, data) for _, data in sorted(results)]
+        images[0].save(out, save_all=True, append_images=images[1:],
+                       duration=int(round(1000 / fps)), loop=0)
+        results = []
+    return n, elapsed, results
+
+
+def _parse_size(text):
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线渲染卡拉OK歌词为 PNG 序列或动图")
+    parser.add_argument("lyric", help="YRC 或 LRC 歌词文件")
+    parser.add_argument("--tlyric", help="翻译 LRC 文件")
+    parser.add_argument("--start", type=float, required=True, help="起始时间（秒）")
+    parser.add_argument("--end", type=float, required=True, help="结束时间（秒）")
+    parser.add_argument("--fps", type=float, default=EXPORT_FPS)
+    parser.add_argument("--size", type=_parse_size, default=EXPORT_SIZE, help="画面尺寸，如 1280x160")
+    parser.add_argument("--font", help="字体文件（默认使用系统微软雅黑）")
+    parser.add_argument("--background", default="#000000")
+    parser.add_argument("--transparent", action="store_true", help="输出透明背景")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="输出目录（PNG 序列）或 .gif/.png/.webp 动图文件")
+    target.add_argument("--check", metavar="DIR", help="与 DIR 中的黄金图逐帧比较")
+    parser.add_argument("--workers", type=int, help="进程数，默认 CPU 核数")
+    parser.add_argument("--no-config", action="store_true", help="不读取用户配置文件，使用内置默认值")
+    args = parser.parse_args()
+
+    use_config = not args.no_config
+    if use_config:
+        dl.ConfigManager().load()
+    entry = parse_lyric_files(args.lyric, args.tlyric)
+    if not entry["lyrics"]:
+        print("歌词文件中没有可渲染的行")
+        return 1
+
+    workers = args.workers or os.cpu_count() or 1
+    n, elapsed, problems = export(entry, args.start, args.end, fps=args.fps, out=args.out,
+                                  check_dir=args.check, workers=workers, use_config=use_config,
+                                  size=args.size, font_path=args.font, background=args.background,
+                                  transparent=args.transparent)
+    rate = n / elapsed if elapsed > 0 else 0.0
+    per_core = rate / workers
+    print(f"渲染 {n} 帧，用时 {elapsed:.2f}s，{rate:.1f} 帧/秒，"
+          f"{per_core:.1f} 帧/秒/核（目标 {EXPORT_TARGET_FPS_PER_CORE}）")
+    if per_core < EXPORT_TARGET_FPS_PER_CORE:
+        print("低于吞吐目标")
+    if args.check:
+        for index, reason in problems:
+            print(f"frame_{index:05d}.png: {'缺少黄金图' if reason == 'missing' else '与黄金图不一致'}")
+        if problems:
+            return 1
+        print("全部帧与黄金图一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""本地歌词库：SQLite 存储预解析的紧凑时间轴，按规范化的歌名/歌手查找
+
+歌名和歌手经 NFKC、大小写折叠并去掉空白和标点后建立普通索引用于精确匹配，
+另建 FTS5（trigram）全文索引用于子串模糊匹配。歌词以紧凑 JSON + zlib 存储解析结果，
+查找时无需重新解析原文。
+
+用法:
+    python lyric_library.py import DIR [--db PATH]     批量导入 .lrc/.yrc（同名 .tlrc/.trans.lrc 作为翻译）
+    python lyric_library.py lookup 歌名 [歌手] [--db PATH]
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.request import pathname2url
+
+import lyric_parser
+
+TRANSLATION_SUFFIXES = (".tlrc", ".trans.lrc")
+FUZZY_CANDIDATES = 5
+IMPORT_BATCH_SIZE = 256
+LRC_TITLE_RE = re.compile(r"^\[ti:(.*)\]\s*$", re.M | re.I)
+LRC_ARTIST_RE = re.compile(r"^\[ar:(.*)\]\s*$", re.M | re.I)
+BRACKET_RE = re.compile(r"[(（\[【][^)）\]】]*[)）\]】]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    title_norm TEXT NOT NULL,
+    artist_norm TEXT NOT NULL,
+    source TEXT UNIQUE,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lyrics_norm ON lyrics (title_norm, artist_norm);
+"""
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS lyrics_fts USING fts5(title_norm, artist_norm, tokenize='trigram')"
+
+
+def normalize_key(text):
+    """NFKC + 大小写折叠，只保留字母数字（含中日韩文字）"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+# ------- 紧凑时间轴 -------
+def pack_entry(entry):
+    """把 parse_lyric_entry 的结果压缩存储：时间为整数毫秒，逐字信息按词合并"""
+    lines = []
+    for line in entry["lyrics"]:
+        packed = [int(round(line["time"] * 1000)), line["text"]]
+        words = line.get("words")
+        if words:
+            groups = []
+            for w in words:
+                start = int(round(w["start"] * 1000))
+                dur = int(round(w["duration"] * 1000))
+                if groups and groups[-1][0] == start and groups[-1][1] == dur:
+                    groups[-1][2] += 1
+                else:
+                    groups.append([start, dur, 1])
+            packed.append(groups)
+        lines.append(packed)
+    trans = [[int(round(t["time"] * 1000)), t["text"]] for t in entry["translations"]]
+    raw = json.dumps({"w": int(entry["word"]), "l": lines, "t": trans},
+                     ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"))
+
+
+def unpack_entry(blob):
+    data = json.loads(zlib.decompress(blob).decode("utf-8"))
+    lyrics = []
+    for packed in data["l"]:
+        line = {"time": packed[0] / 1000.0, "text": packed[1]}
+        if len(packed) > 2:
+            chars = iter(packed[1])
+            words = []
+            for start, dur, count in packed[2]:
+                for _ in range(count):
+                    words.append({"char": next(chars), "start": start / 1000.0, "duration": dur / 1000.0})
+            line["words"] = words
+        lyrics.append(line)
+    translations = [{"time": t / 1000.0, "text": text} for t, text in data["t"]]
+    return {"lyrics": lyrics, "translations": translations, "word": bool(data["w"])}
+
+
+# ------- 数据库 -------
+class LyricLibrary:
+    """歌词库连接；sqlite3 连接只能在创建它的线程中使用
+
+    readonly=True 时以只读方式打开已有的库，不建表、不提交，供切歌时查找使用。
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            uri = "file:" + pathname2url(os.path.abspath(path)) + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True)
+            self.has_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'lyrics_fts'").fetchone() is not None
+            return
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或不支持 trigram，只做精确匹配
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def add_many(self, rows):
+        """rows: [(title, artist, source, entry)]，同一 source 重复导入时覆盖"""
+        cur = self.conn.cursor()
+        cur.execute("BEGIN")
+        for title, artist, source, entry in rows:
+            t_norm, a_norm = normalize_key(title), normalize_key(artist)
+            old = cur.execute("SELECT id FROM lyrics WHERE source = ?", (source,)).fetchone()
+            if old is not None:
+                cur.execute("DELETE FROM lyrics WHERE id = ?", old)
+                if self.has_fts:
+                    cur.execute("DELETE FROM lyrics_fts WHERE rowid = ?", old)
+            cur.execute("INSERT INTO lyrics (title, artist, title_norm, artist_norm, source, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (title, artist, t_norm, a_norm, source, pack_entry(entry)))
+            if self.has_fts:
+                cur.execute("INSERT INTO lyrics_fts (rowid, title_norm, artist_norm) VALUES (?, ?, ?)",
+                            (cur.lastrowid, t_norm, a_norm))
+        self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM lyrics").fetchone()[0]
+
+    @staticmethod
+    def _pick(rows, a_norm):
+        """候选 (id, artist_norm)：歌手完全一致优先，其次互相包含，最后取第一条"""
+        if not rows:
+            return None
+        if a_norm:
+            for row_id, artist in rows:
+                if artist == a_norm:
+                    return row_id
+            for row_id, artist in rows:
+                if artist and (artist in a_norm or a_norm in artist):
+                    return row_id
+        return rows[0][0]
+
+    def lookup(self, title, artist=""):
+        """按歌名/歌手查找，返回 parse_lyric_entry 格式的结果或 None
+
+        找不到时去掉歌名中的括号内容（如“(Live)”“（伴奏）”）再试一次。
+        """
+        a_norm = normalize_key(artist)
+        row_id = self._find(normalize_key(title), a_norm)
+        if row_id is None:
+            stripped = normalize_key(BRACKET_RE.sub("", title or ""))
+            if stripped and stripped != normalize_key(title):
+                row_id = self._find(stripped, a_norm)
+        if row_id is None:
+            return None
+        blob = self.conn.execute("SELECT data FROM lyrics WHERE id = ?", (row_id,)).fetchone()[0]
+        return unpack_entry(blob)
+
+    def _find(self, t_norm, a_norm):
+        if not t_norm:
+            return None
+        rows = self.conn.execute(
+            "SELECT id, artist_norm FROM lyrics WHERE title_norm = ? LIMIT ?",
+            (t_norm, FUZZY_CANDIDATES)).fetchall()
+        if not rows and self.has_fts and len(t_norm) >= 3:
+            # trigram 索引支持子串匹配，如带“(Live)”等后缀的歌名
+            rows = self.conn.execute(
+                "SELECT rowid, artist_norm FROM lyrics_fts WHERE title_norm MATCH ? "
+                "ORDER BY abs(length(title_norm) - ?) LIMIT ?",
+                ('"' + t_norm + '"', len(t_norm), FUZZY_CANDIDATES)).fetchall()
+        return self._pick(rows, a_norm)
+
+
+# ------- 导入 -------
+def _find_translation(path):
+    stem = os.path.splitext(path)[0]
+    for suffix in TRANSLATION_SUFFIXES:
+        candidate = stem + suffix
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _title_artist(path, text):
+    """优先使用 [ti:]/[ar:] 标签，否则按“歌手 - 歌名”文件名解析"""
+    title_m = LRC_TITLE_RE.search(text)
+    artist_m = LRC_ARTIST_RE.search(text)
+    stem = os.path.basename(os.path.splitext(path)[0])
+    if " - " in stem:
+        artist, title = (part.strip() for part in stem.split(" - ", 1))
+    else:
+        artist, title = "", stem.strip()
+    if title_m and title_m.group(1).strip():
+        title = title_m.group(1).strip()
+    if artist_m and artist_m.group(1).strip():
+        artist = artist_m.group(1).strip()
+    return title, artist
+
+
+def _read(path):
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        return f.read()
+
+
+def parse_for_import(paths, root):
+    """在工作进程中解析一批文件，返回 [(title, artist, source, entry)]"""
+    rows = []
+    for path in paths:
+        if path.lower().endswith(TRANSLATION_SUFFIXES):
+            continue
+        try:
+            text = _read(path)
+            trans_path = _find_translation(path)
+            entry = lyric_parser.parse_lyric_entry(text, _read(trans_path) if trans_path else "")
+        except (OSError, ValueError) as e:
+            print(f"跳过 {path}: {e}")
+            continue
+        if entry["lyrics"]:
+            title, artist = _title_artist(path, text)
+            rows.append((title, artist, os.path.relpath(path, root), entry))
+    return rows
+
+
+def import_directory(library, root, workers=None):
+    """多进程解析、单连接批量写入，返回导入条数"""
+    workers = workers or os.cpu_count() or 1
+    library.conn.execute("PRAGMA journal_mode=WAL")
+    library.conn.execute("PRAGMA synchronous=OFF")
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+
+        def drain(done):
+            nonlocal total
+            for fut in done:
+                rows = fut.result()
+                library.add_many(rows)
+                total += len(rows)
+
+        paths = lyric_parser.iter_lyric_files(root)
+        for batch in lyric_parser.batches(paths, IMPORT_BATCH_SIZE):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                drain(done)
+            pending.add(pool.submit(parse_for_import, batch, root))
+        drain(pending)
+    library.conn.execute("PRAGMA synchronous=NORMAL")
+    return total
+
+
+def main():
+    import desktop_lyrics
+    parser = argparse.ArgumentParser(description="本地歌词库导入与查询")
+    parser.add_argument("--db", default=desktop_lyrics.LYRIC_LIBRARY_PATH, help="歌词库文件路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="批量导入目录中的 .lrc/.yrc")
+    p_import.add_argument("root")
+    p_import.add_argument("--workers", type=int)
+    p_lookup = sub.add_parser("lookup", help="按歌名/歌手查找")
+    p_lookup.add_argument("title")
+    p_lookup.add_argument("artist", nargs="?", default="")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    library = LyricLibrary(args.db)
+    try:
+        if args.command == "import":
+            t0 = time.perf_counter()
+            n = import_directory(library, args.root, args.workers)
+            print(f"导入 {n} 首，用时 {time.perf_counter() - t0:.1f}s，库中共 {library.count()} 首")
+        else:
+            t0 = time.perf_counter()
+            entry = library.lookup(args.title, args.artist)
+            ms = (time.perf_counter() - t0) * 1000.0
+            if entry is None:
+                print(f"未找到（{ms:.2f} ms）")
+                return 1
+            print(f"找到 {len(entry['lyrics'])} 行歌词，{len(entry['translations'])} 行翻译（{ms:.2f} ms）")
+    finally:
+        library.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""轻量性能统计：命名计时器、计数器、HDR 风格直方图和追踪环形缓冲
+
+关闭时 begin() 只做一次布尔判断并返回 0，end(0) 直接返回，热点路径几乎没有开销。
+追踪（trace）独立于统计开关：开启后计时器的 begin/end 和计数器的 add 同时写入环形缓冲，
+可随时导出为 Chrome trace-event JSON，在 Perfetto 或 chrome://tracing 中查看。
+用法:
+    _FRAME_TIMER = perf_stats.timer("frame")
+    t0 = _FRAME_TIMER.begin()
+    ...
+    _FRAME_TIMER.end(t0)
+"""
+import itertools
+import json
+import os
+import threading
+import time
+
+_now_ns = time.perf_counter_ns
+_get_ident = threading.get_ident
+
+# 直方图精度：每个 2 的幂区间分 32 个子桶（约 3% 相对误差），单位微秒，上限约 67 秒
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+_MAX_EXP = 26
+_NUM_BUCKETS = _SUB * (_MAX_EXP - _SUB_BITS + 2)
+_MAX_VALUE = (1 << (_MAX_EXP + 1)) - 1
+
+# 追踪环形缓冲容量（事件数，向上取整到 2 的幂）
+TRACE_CAPACITY = 1 << 16
+
+
+def _bucket_index(v):
+    if v < 2 * _SUB:
+        return v
+    shift = v.bit_length() - 1 - _SUB_BITS
+    return _SUB * (shift + 1) + (v >> shift) - _SUB
+
+
+def _bucket_low(idx):
+    if idx < 2 * _SUB:
+        return idx
+    shift = idx // _SUB - 1
+    return (_SUB + idx % _SUB) << shift
+
+
+class Histogram:
+    """对数-线性分桶直方图（HDR 风格），记录微秒整数值"""
+    __slots__ = ("counts", "total", "sum_us", "max_us")
+
+    def __init__(self):
+        self.counts = [0] * _NUM_BUCKETS
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, value_us):
+        v = int(value_us)
+        if v < 0:
+            v = 0
+        elif v > _MAX_VALUE:
+            v = _MAX_VALUE
+        self.counts[_bucket_index(v)] += 1
+        self.total += 1
+        self.sum_us += v
+        if v > self.max_us:
+            self.max_us = v
+
+    def percentile(self, q):
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        acc = 0
+        for idx, c in enumerate(self.counts):
+            if not c:
+                continue
+            acc += c
+            if acc >= target:
+                low = _bucket_low(idx)
+                high = _bucket_low(idx + 1)
+                return (low + high) / 2.0
+        return float(self.max_us)
+
+    def summary_ms(self):
+        if not self.total:
+            return {"count": 0}
+        return {
+            "count": self.total,
+            "mean": round(self.sum_us / self.total / 1000.0, 3),
+            "p50": round(self.percentile(0.50) / 1000.0, 3),
+            "p90": round(self.percentile(0.90) / 1000.0, 3),
+            "p99": round(self.percentile(0.99) / 1000.0, 3),
+            "max": round(self.max_us / 1000.0, 3),
+        }
+
+
+class TraceRing:
+    """飞行记录器：预分配的定长环形缓冲，记录 begin/end、计数器和异步事件
+
+    每个事件是一个元组 (序号, 纳秒时间戳, 类型, 名称, 线程 id, 参数)，整体写入列表的一个
+    槽位；序号来自 itertools.count，next() 在 GIL 下是原子的，多线程写入无需加锁。
+    写满后覆盖最旧的事件，导出时按序号排序并丢弃开头失去配对的 end。
+    """
+    def __init__(self, capacity=TRACE_CAPACITY):
+        capacity = 1 << max(0, int(capacity) - 1).bit_length()
+        self.enabled = False
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._events = [None] * capacity
+        self._seq = itertools.count()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def clear(self):
+        self._events = [None] * self.capacity
+
+    def begin(self, name):
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "B", name, _get_ident(), None)
+
+    def end(self, name):
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "E", name, _get_ident(), None)
+
+    def counter(self, name, value):
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "C", name, _get_ident(), value)
+
+    def instant(self, name, args=None):
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "i", name, _get_ident(), args)
+
+    def async_begin(self, name, span_id):
+        """跨 await 的区间（如一个 websocket 连接）；同一线程上可交错，按 span_id 配对"""
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "b", name, _get_ident(), span_id)
+
+    def async_end(self, name, span_id):
+        i = next(self._seq)
+        self._events[i & self._mask] = (i, _now_ns(), "e", name, _get_ident(), span_id)
+
+    def events(self):
+        """按时间顺序返回当前缓冲中的事件（复制列表只持有一次 GIL，不阻塞写入方）"""
+        events = [e for e in list(self._events) if e is not None]
+        events.sort()
+        if events:
+            # 取序号时被跳过的槽位可能还留着上一圈的旧事件
+            cutoff = events[-1][0] - self.capacity
+            events = [e for e in events if e[0] > cutoff]
+        return events
+
+    def to_chrome(self, events=None, process_name="HarmoniaDesktopLyrics"):
+        if events is None:
+            events = self.events()
+        pid = os.getpid()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        out = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": process_name}}]
+        depth = {}
+        open_spans = set()
+        tids = set()
+        for _, ts, ph, name, tid, arg in events:
+            ev = {"ph": ph, "name": name, "pid": pid, "tid": tid, "ts": ts / 1000.0}
+            if ph == "B":
+                depth[tid] = depth.get(tid, 0) + 1
+            elif ph == "E":
+                if not depth.get(tid):
+                    continue
+                depth[tid] -= 1
+            elif ph == "C":
+                ev["args"] = {"value": arg}
+            elif ph == "i":
+                ev["s"] = "t"
+                if arg:
+                    ev["args"] = arg
+            else:
+                key = (name, arg)
+                if ph == "b":
+                    open_spans.add(key)
+                elif key in open_spans:
+                    open_spans.discard(key)
+                else:
+                    continue
+                ev["cat"] = "async"
+                ev["id"] = str(arg)
+            tids.add(tid)
+            out.append(ev)
+        for tid in tids:
+            out.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                        "args": {"name": thread_names.get(tid, f"thread-{tid}")}})
+        return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+    def dump(self, path, events=None):
+        """写出 Chrome trace-event JSON，返回写入的事件数"""
+        data = self.to_chrome(events)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        return len(data["traceEvents"])
+
+
+class Timer:
+    __slots__ = ("name", "registry", "hist", "trace")
+
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+        self.hist = Histogram()
+        self.trace = registry.trace
+
+    def begin(self):
+        if self.trace.enabled:
+            self.trace.begin(self.name)
+        if self.registry.enabled:
+            return time.perf_counter()
+        return 0.0
+
+    def end(self, t0):
+        if self.trace.enabled:
+            self.trace.end(self.name)
+        if t0:
+            self.hist.record((time.perf_counter() - t0) * 1e6)
+
+    def record_ms(self, ms):
+        if self.registry.enabled:
+            self.hist.record(ms * 1000.0)
+
+
+class Counter:
+    """value 为统计窗口内的计数（reset() 清零）；total 为进程内累计值，写入追踪的 "C" 事件
+
+    Chrome trace 把 "C" 事件的值画成折线，写入累计值才能看出增长速度。
+    """
+    __slots__ = ("name", "registry", "value", "total", "trace")
+
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+        self.value = 0
+        self.total = 0
+        self.trace = registry.trace
+
+    def add(self, n=1):
+        self.total += n
+        if self.trace.enabled:
+            self.trace.counter(self.name, self.total)
+        if self.registry.enabled:
+            self.value += n
+
+
+class PerfRegistry:
+    def __init__(self):
+        self.enabled = False
+        self.trace = TraceRing()
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._since = time.perf_counter()
+
+    def timer(self, name):
+        with self._lock:
+            t = self.timers.get(name)
+            if t is None:
+                t = self.timers[name] = Timer(name, self)
+            return t
+
+    def counter(self, name):
+        with self._lock:
+            c = self.counters.get(name)
+            if c is None:
+                c = self.counters[name] = Counter(name, self)
+            return c
+
+    def set_enabled(self, enabled):
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = bool(enabled)
+
+    def reset(self):
+        with self._lock:
+            for t in self.timers.values():
+                t.hist = Histogram()
+            for c in self.counters.values():
+                c.value = 0
+            self._since = time.perf_counter()
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(1e-9, time.perf_counter() - self._since)
+            return {
+                "enabled": self.enabled,
+                "elapsed_s": round(elapsed, 3),
+                "timers_ms": {name: t.hist.summary_ms() for name, t in self.timers.items()},
+                "counters": {name: c.value for name, c in self.counters.items()},
+                "rates_per_s": {name: round(c.value / elapsed, 2) for name, c in self.counters.items()},
+            }
+
+
+registry = PerfRegistry()
+timer = registry.timer
+counter = registry.counter
+trace = registry.trace
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+import desktop_lyrics as dl
+
+RATE = 48000
+
+
+class FakeStream:
+    def __init__(self, backend, pa, name):
+        self.backend = backend
+        self.pa = pa
+        self.name = name
+        self.dead = False
+        self.closed = False
+
+    def read(self, frames, exception_on_overflow=True):
+        time.sleep(0.001)
+        if self.pa.terminated:
+            # 真实的 PortAudio 在已 terminate 的实例上读取会崩溃，这里记下来让测试失败
+            self.backend.use_after_terminate = True
+        if self.dead or self.closed or self.name not in self.backend.plugged:
+            raise OSError(-9999, "Unanticipated host error")
+        return bytes(frames * 2)
+
+    def is_active(self):
+        return not self.closed
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBackend:
+    """接口与 pyaudiowpatch 相同的替身：两个输出（回环）设备和一个麦克风"""
+    __version__ = "fake"
+    paInt16 = 8
+    paWASAPI = 13
+
+    def __init__(self):
+        self.plugged = {"扬声器 0", "扬声器 1", "麦克风 0"}
+        self.default_output = "扬声器 0"
+        self.instances = []
+        self.use_after_terminate = False
+        backend = self
+
+        class PyAudio:
+            def __init__(self):
+                self.names = sorted(backend.plugged)
+                self.default_output = backend.default_output
+                self.terminated = False
+                backend.instances.append(self)
+
+            def get_device_count(self):
+                return len(self.names)
+
+            def get_device_info_by_index(self, i):
+                name = self.names[i]
+                out = name.startswith("扬声器")
+                return {"index": i, "name": name, "defaultSampleRate": float(RATE),
+                        "maxInputChannels": 0 if out else 1, "maxOutputChannels": 2 if out else 0}
+
+            def get_host_api_info_by_type(self, api):
+                return {"defaultOutputDevice": self.names.index(self.default_output)}
+
+            def get_default_input_device_info(self):
+                return self.get_device_info_by_index(self.names.index("麦克风 0"))
+
+            def open(self, format, channels, rate, input, frames_per_buffer, input_device_index,
+                     as_loopback=False):
+                name = self.names[input_device_index]
+                if name not in backend.plugged:
+                    raise OSError(-9996, "Invalid device")
+                return FakeStream(backend, self, name)
+
+            def terminate(self):
+                self.terminated = True
+
+        self.PyAudio = PyAudio
+
+    def signature(self):
+        return (len(self.plugged), self.default_output)
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+def test_reopen_uses_cached_params_without_enumerating(backend):
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    stream, rate, _ = devices.open(dl.AUDIO_CHUNK)
+    assert stream.name == "扬声器 0" and rate == RATE
+    devices.close(stream)
+    stream, _, _ = devices.open(dl.AUDIO_CHUNK)
+    devices.close(stream)
+    assert devices.enumerations == 1
+    assert devices.cached_opens == 1
+    assert len(backend.instances) == 1 and not backend.instances[0].terminated
+
+
+def test_refresh_retires_instance_until_last_stream_closes(backend):
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    old, _, _ = devices.open(dl.AUDIO_CHUNK)
+    first_pa = backend.instances[0]
+    new, _, _ = devices.open(dl.AUDIO_CHUNK, refresh=True)
+    assert len(backend.instances) == 2
+    # 旧流还没关闭（旧采集线程可能仍阻塞在 read()），旧实例不能被 terminate
+    assert not first_pa.terminated
+    old.read(dl.AUDIO_CHUNK)
+    assert not backend.use_after_terminate
+    devices.close(old)
+    assert first_pa.terminated
+    devices.close(new)
+    assert not backend.instances[1].terminated
+
+
+def test_refresh_without_open_streams_terminates_immediately(backend):
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    stream, _, _ = devices.open(dl.AUDIO_CHUNK)
+    devices.close(stream)
+    stream, _, _ = devices.open(dl.AUDIO_CHUNK, refresh=True)
+    assert backend.instances[0].terminated
+    assert devices.enumerations == 2
+    devices.close(stream)
+
+
+def test_default_output_switch_reopens_on_new_device(backend, monkeypatch):
+    monkeypatch.setattr(dl, "AUDIO_DEVICE_CHECK_SEC", 0.02)
+    devices = dl.AudioDeviceManager(backend, backend.signature)
+    stop = threading.Event()
+    worker = dl._AudioWorker(32, lambda levels: None, stop, devices=devices)
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    try:
+        assert _wait(lambda: worker.stream is not None)
+        first = worker.stream
+        backend.default_output = "扬声器 1"
+        assert _wait(lambda: worker.stream is not None and worker.stream.name == "扬声器 1")
+        assert first.closed
+        second = worker.stream
+        second.dead = True
+        assert _wait(lambda: worker.stream is not None and worker.stream is not second)
+    finally:
+        stop.set()
+        thread.join(5.0)
+    assert not backend.use_after_terminate
+    assert devices.last_params["name"] == "扬声器 1"
+
+
+def test_default_device_signature_is_none_without_winmm():
+    if hasattr(dl.ctypes, "windll"):
+        pytest.skip("仅在非 Windows 上检查")
+    assert dl._default_device_signature() is None
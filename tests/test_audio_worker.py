@@ -0,0 +1,41 @@
+import threading
+import time
+
+import desktop_lyrics as dl
+
+
+class SpyCalibrator:
+    enabled = True
+
+    def __init__(self):
+        self.pushes = 0
+
+    def push(self, mag, freqs, frame_sec):
+        self.pushes += 1
+
+
+def _run(worker, seconds):
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    worker.stop_event.set()
+    thread.join(5.0)
+
+
+def test_simulation_feeds_dsp_but_not_calibrator(monkeypatch):
+    monkeypatch.setattr(dl, "FORCE_AUDIO_SIMULATION", True)
+    monkeypatch.setattr(dl, "SIM_AUDIO_REALTIME", False)
+    levels = []
+    calibrator = SpyCalibrator()
+    worker = dl._AudioWorker(32, levels.append, threading.Event(), calibrator)
+    _run(worker, 0.3)
+    assert worker.simulation_mode
+    assert levels and levels[-1].shape == (32,)
+    assert calibrator.pushes == 0
+
+
+def test_synthetic_source_is_deterministic_across_block_sizes():
+    a = dl.SyntheticAudioSource(realtime=False, seed=3)
+    b = dl.SyntheticAudioSource(realtime=False, seed=3)
+    x = dl.np.concatenate([a.read(1000) for _ in range(10)])
+    assert dl.np.array_equal(x, b.read(10000))
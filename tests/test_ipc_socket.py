@@ -0,0 +1,81 @@
+import asyncio
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+
+import pytest
+
+import desktop_lyrics as dl
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix 域套接字")
+
+
+class _App:
+    def safe_update(self, msg_type, data=None):
+        pass
+
+
+@pytest.fixture
+def sock_path():
+    # AF_UNIX 路径长度有限，pytest 的 tmp_path 可能过长
+    root = tempfile.mkdtemp()
+    yield os.path.join(root, "ipc", "harmonia-lyrics.sock")
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _server(path):
+    return dl.LyricsServer(_App(), ipc_address=path)
+
+
+async def _start_and_close(server):
+    servers = await server._start_unix_socket()
+    mode = stat.S_IMODE(os.stat(server.ipc_address).st_mode)
+    for srv in servers:
+        srv.close()
+        await srv.wait_closed()
+    return mode
+
+
+def test_socket_lives_in_private_dir_with_owner_only_mode(sock_path):
+    assert asyncio.run(_start_and_close(_server(sock_path))) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(sock_path)).st_mode) == 0o700
+
+
+def test_stale_socket_is_replaced(sock_path):
+    os.mkdir(os.path.dirname(sock_path), 0o700)
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(sock_path)
+    stale.close()
+    assert asyncio.run(_start_and_close(_server(sock_path))) == 0o600
+
+
+def test_live_instance_is_not_unlinked(sock_path):
+    os.mkdir(os.path.dirname(sock_path), 0o700)
+    live = socket.socket(socket.AF_UNIX)
+    live.bind(sock_path)
+    live.listen()
+    try:
+        with pytest.raises(OSError, match="已有实例"):
+            asyncio.run(_start_and_close(_server(sock_path)))
+        assert os.path.exists(sock_path)
+    finally:
+        live.close()
+
+
+def test_regular_file_is_not_removed(sock_path):
+    os.mkdir(os.path.dirname(sock_path), 0o700)
+    with open(sock_path, "w") as f:
+        f.write("x")
+    with pytest.raises(OSError):
+        asyncio.run(_start_and_close(_server(sock_path)))
+    assert os.path.isfile(sock_path)
+
+
+def test_shared_directory_is_refused(sock_path):
+    os.mkdir(os.path.dirname(sock_path))
+    os.chmod(os.path.dirname(sock_path), 0o777)
+    with pytest.raises(OSError, match="独占"):
+        asyncio.run(_start_and_close(_server(sock_path)))
@@ -0,0 +1,15 @@
+import pytest
+
+import desktop_lyrics as dl
+
+
+@pytest.mark.parametrize("fade, min_fade", [(0.25, 0.1), (0.0, 0.0)])
+def test_word_progress_never_divides_by_zero(monkeypatch, fade, min_fade):
+    monkeypatch.setattr(dl, "KARAOKE_FADE_TIME", fade)
+    monkeypatch.setattr(dl, "MIN_FADE_TIME", min_fade)
+    for duration in (0.0, 0.3):
+        assert dl.word_char_progress(0.9, 1.0, duration) == 0.0
+        assert dl.word_char_progress(2.0, 1.0, duration) == 1.0
+        assert 0.0 <= dl.word_char_progress(1.05, 1.0, duration) <= 1.0
+    assert dl.fallback_char_progress(0.5, 0, 1.0, 2.0, 4) == 0.0
+    assert dl.fallback_char_progress(5.0, 3, 1.0, 2.0, 4) == 1.0
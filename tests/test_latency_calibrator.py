@@ -0,0 +1,79 @@
+import pytest
+
+import desktop_lyrics as dl
+
+np = pytest.importorskip("numpy")
+dl._import_numpy()
+
+RATE = 48000
+DURATION_SEC = 25.0
+TOLERANCE_SEC = 0.02
+
+
+def synthetic_pair(duration, delay, rng, drums=False, snr_db=20.0):
+    """返回 (字起始时间数组, 单声道 float32 音频)；音频中的音符比字起始晚 delay 秒"""
+    onsets = []
+    t = 1.0
+    while t < duration - 1.0:
+        onsets.append(t)
+        t += rng.uniform(0.15, 0.6)
+    onsets = np.array(onsets)
+
+    n = int(duration * RATE)
+    audio = np.zeros(n, dtype=np.float32)
+    note_len = int(0.25 * RATE)
+    tt = np.arange(note_len) / RATE
+    env = np.exp(-tt / 0.08) * (1.0 - np.exp(-tt / 0.004))
+    for onset in onsets:
+        f0 = rng.uniform(180.0, 420.0)
+        note = sum(np.sin(2 * np.pi * f0 * h * tt) / h for h in range(1, 6)) * env
+        start = int((onset + delay) * RATE)
+        if 0 <= start < n:
+            end = min(n, start + note_len)
+            audio[start:end] += note[:end - start].astype(np.float32)
+    if drums:
+        click_len = int(0.03 * RATE)
+        click = rng.standard_normal(click_len) * np.exp(-np.arange(click_len) / (0.005 * RATE))
+        for beat in np.arange(0.5, duration, 0.5):
+            start = int(beat * RATE)
+            end = min(n, start + click_len)
+            audio[start:end] += (0.8 * click[:end - start]).astype(np.float32)
+    noise_rms = np.sqrt(np.mean(audio ** 2)) * 10 ** (-snr_db / 20.0)
+    audio += (rng.standard_normal(n) * noise_rms).astype(np.float32)
+    return onsets, audio
+
+
+def _calibrate(onsets, audio, rng, chunk=dl.AUDIO_CHUNK, jitter=0.005):
+    # 与 _AudioWorker 相同的加窗 FFT；时钟是 read() 返回时带抖动的 currentTime
+    clock_t = [0.0]
+    cal = dl.LatencyCalibrator(lambda: clock_t[0] + rng.uniform(-jitter, jitter))
+    cal.set_onsets(onsets)
+    window = np.hanning(chunk).astype(np.float32)
+    freqs = np.fft.rfftfreq(chunk, d=1.0 / RATE)
+    for k in range(len(audio) // chunk):
+        mag = np.abs(np.fft.rfft(audio[k * chunk:(k + 1) * chunk] * window)) + 1e-10
+        clock_t[0] = (k + 1) * chunk / RATE
+        cal.push(mag, freqs, chunk / RATE)
+    return cal
+
+
+@pytest.mark.parametrize("delay", [-0.15, 0.12])
+@pytest.mark.parametrize("drums", [False, True])
+def test_estimates_known_delay(delay, drums):
+    rng = np.random.default_rng(7)
+    onsets, audio = synthetic_pair(DURATION_SEC, delay, rng, drums=drums)
+    cal = _calibrate(onsets, audio, rng)
+    assert cal.estimates > 0 and cal.rejected == 0
+    assert abs(cal.offset - delay) <= TOLERANCE_SEC
+    assert cal.confidence >= dl.CALIB_MIN_CONFIDENCE
+
+
+def test_uncorrelated_lyrics_are_rejected():
+    rng = np.random.default_rng(11)
+    _, audio = synthetic_pair(DURATION_SEC, 0.1, rng)
+    other_onsets, _ = synthetic_pair(DURATION_SEC, 0.0, rng)
+    cal = _calibrate(other_onsets, audio, rng)
+    assert cal.rejected > 0
+    assert cal.estimates == 0 and cal.offset == 0.0
+    assert cal.confidence < dl.CALIB_MIN_CONFIDENCE
+
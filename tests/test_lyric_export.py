@@ -0,0 +1,120 @@
+import hashlib
+import os
+
+import pytest
+
+import desktop_lyrics as dl
+import lyric_parser
+
+pytest.importorskip("PIL")
+import lyric_export as le
+import PIL
+from PIL import Image, features
+
+SIZE = (320, 120)
+YRC = "[1000,2000](1000,500,0)Hi(1500,1000,0)yo\n[3000,1000](3000,1000,0)ok"
+LRC = "[00:01.00]Hello\n[00:03.00]World"
+TLRC = "[00:01.00]T1"
+
+# 像素哈希与 Pillow 自带的默认字体及其 FreeType 版本绑定，换了版本就跳过哈希比较
+GOLDEN_VERSIONS = ("12.3.0", "2.14.3")
+GOLDEN_HASHES = {
+    ("yrc", 1.2): "4e43b73263eacb60fb749706cec7a2a9d9da08041b7aadd879baa70c75edf58e",
+    ("yrc", 2.0): "381cf8442df540cc54b88962049a5847d0c6c215f25e9200fb5ea7a846093582",
+    ("yrc", 3.5): "443c2b4ac49f81e572ff6ecd5fda836bef70fb07c2bd70cc70b9a5898e8b986f",
+    ("lrc", 1.2): "369809237d91013ae2875415b48716697a73b29c6df59a87c694d8934260ed93",
+    ("lrc", 2.0): "bf24a1f8104df495d50b96a18901ba35ed4e14f6cb81128d199a80f5aa004a07",
+    ("lrc", 3.5): "97c77c7a7b54b3b04aba9c67d3b98b5aa461c90eb24c59a1a11001f42210e5e5",
+}
+
+
+def _entry(kind):
+    if kind == "yrc":
+        return lyric_parser.parse_lyric_entry(YRC, "")
+    return lyric_parser.parse_lyric_entry(LRC, TLRC)
+
+
+def _colors(img):
+    return {color: n for n, color in img.getcolors(SIZE[0] * SIZE[1])}
+
+
+def test_frame_before_first_line_is_blank():
+    renderer = le.FrameRenderer(_entry("yrc"), size=SIZE, background="#102030")
+    img = renderer.render(0.5)
+    assert img.size == SIZE
+    assert img.getcolors() == [(SIZE[0] * SIZE[1], (0x10, 0x20, 0x30))]
+    # 返回的是副本，调用方修改它不会影响之后的空白帧
+    img.putpixel((0, 0), (255, 0, 0))
+    assert renderer.render(0.5).getpixel((0, 0)) == (0x10, 0x20, 0x30)
+
+
+def test_word_timing_drives_highlight():
+    renderer = le.FrameRenderer(_entry("yrc"), size=SIZE)
+    fg, hl = dl.hex_to_rgb(dl.LYRIC_FG), dl.hex_to_rgb(dl.KARAOKE_HL_COLOR)
+    start = _colors(renderer.render(1.0))
+    assert start.get(fg) and hl not in start
+    # 1.5s 起 "yo" 才开始，1.2s 时只有 "Hi" 在变色
+    partial = _colors(renderer.render(1.2))
+    assert 0 < partial.get(fg, 0) < start[fg]
+    done = _colors(renderer.render(2.0))
+    assert fg not in done and done.get(hl)
+    assert renderer.render(2.9).tobytes() == renderer.render(2.0).tobytes()
+
+
+def test_lrc_fallback_sweeps_line_and_draws_translation():
+    renderer = le.FrameRenderer(_entry("lrc"), size=SIZE)
+    fg, hl = dl.hex_to_rgb(dl.LYRIC_FG), dl.hex_to_rgb(dl.KARAOKE_HL_COLOR)
+    trans = dl.hex_to_rgb(dl.TRANSLATION_FG)
+    counts = [_colors(renderer.render(t)) for t in (1.0, 1.2, 2.0, 2.9)]
+    # 没有逐字时间时按行内时间均匀推进：未变色的字越来越少，变色的越来越多
+    fg_counts = [c.get(fg, 0) for c in counts]
+    assert fg_counts == sorted(fg_counts, reverse=True) and fg_counts[0] > fg_counts[-1] == 0
+    assert hl not in counts[0] and counts[-1].get(hl)
+    assert all(c.get(trans) for c in counts)
+    # 第二行没有翻译
+    assert trans not in _colors(renderer.render(3.5))
+
+
+@pytest.mark.parametrize("kind, now", sorted(GOLDEN_HASHES))
+def test_render_frame_matches_golden_hash(kind, now):
+    if le._default_font_path() or (PIL.__version__, features.version("freetype2")) != GOLDEN_VERSIONS:
+        pytest.skip("默认字体或 FreeType 版本与黄金哈希不同")
+    img = le.render_frame(_entry(kind), now, size=SIZE)
+    assert hashlib.sha256(img.tobytes()).hexdigest() == GOLDEN_HASHES[kind, now]
+
+
+def test_export_check_round_trip(tmp_path):
+    entry = _entry("yrc")
+    golden = tmp_path / "golden"
+    n, _, results = le.export(entry, 1.0, 1.5, fps=10, out=str(golden), workers=1,
+                              use_config=False, size=SIZE)
+    assert n == 5 and results == []
+    assert sorted(os.listdir(golden)) == [f"frame_{i:05d}.png" for i in range(5)]
+    _, _, problems = le.export(entry, 1.0, 1.5, fps=10, check_dir=str(golden), workers=1,
+                               use_config=False, size=SIZE)
+    assert problems == []
+
+    Image.new("RGB", SIZE).save(golden / "frame_00002.png")
+    os.remove(golden / "frame_00004.png")
+    _, _, problems = le.export(entry, 1.0, 1.5, fps=10, check_dir=str(golden), workers=1,
+                               use_config=False, size=SIZE)
+    assert sorted(problems) == [(2, "mismatch"), (4, "missing")]
+
+
+def test_check_with_animated_out_only_compares(tmp_path):
+    clip = tmp_path / "clip.gif"
+    _, _, problems = le.export(_entry("yrc"), 1.0, 1.3, fps=10, out=str(clip),
+                               check_dir=str(tmp_path), workers=1, use_config=False, size=SIZE)
+    assert sorted(problems) == [(0, "missing"), (1, "missing"), (2, "missing")]
+    assert not clip.exists()
+
+
+def test_cli_rejects_out_together_with_check(tmp_path, monkeypatch, capsys):
+    lyric = tmp_path / "song.yrc"
+    lyric.write_text(YRC, encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["lyric_export.py", str(lyric), "--start", "1", "--end", "2",
+                                     "--out", str(tmp_path / "clip.gif"), "--check", str(tmp_path)])
+    with pytest.raises(SystemExit) as exc:
+        le.main()
+    assert exc.value.code == 2
+    assert "--check" in capsys.readouterr().err
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+
+import pytest
+
+import lyric_library
+import lyric_parser
+
+
+def _entry(text):
+    return lyric_parser.parse_lyric_entry(text, "")
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "library.sqlite3")
+    library = lyric_library.LyricLibrary(path)
+    library.conn.execute("PRAGMA journal_mode=WAL")
+    library.add_many([
+        ("晴天", "周杰伦", "a.lrc", _entry("[00:01.00]故事的小黄花\n")),
+        ("稻香", "周杰伦", "b.yrc", _entry("[1000,600](1000,300,0)稻(1300,300,0)香\n")),
+    ])
+    library.close()
+    return path
+
+
+def test_readonly_lookup_exact_and_stripped(db):
+    library = lyric_library.LyricLibrary(db, readonly=True)
+    try:
+        assert library.lookup("晴天", "周杰伦")["lyrics"][0]["text"] == "故事的小黄花"
+        entry = library.lookup("稻香（Live）", "")
+        assert entry["word"] and [w["char"] for w in entry["lyrics"][0]["words"]] == ["稻", "香"]
+        assert library.has_fts == lyric_library.LyricLibrary(db).has_fts
+        with pytest.raises(sqlite3.OperationalError):
+            library.add_many([("x", "", "c.lrc", _entry("[00:01.00]x\n"))])
+    finally:
+        library.close()
+
+
+def test_readonly_sees_later_imports(db):
+    reader = lyric_library.LyricLibrary(db, readonly=True)
+    writer = lyric_library.LyricLibrary(db)
+    writer.add_many([("七里香", "周杰伦", "c.lrc", _entry("[00:02.00]窗外的麻雀\n"))])
+    writer.close()
+    assert reader.lookup("七里香")["lyrics"][0]["time"] == 2.0
+    reader.close()
+
+
+def test_readonly_does_not_create_missing_library(tmp_path):
+    path = str(tmp_path / "missing.sqlite3")
+    with pytest.raises(sqlite3.OperationalError):
+        lyric_library.LyricLibrary(path, readonly=True)
+    assert not os.path.exists(path)
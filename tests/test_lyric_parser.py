@@ -0,0 +1,42 @@
+import os
+
+import lyric_parser
+
+
+def _write(root, rel, text):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def test_iter_lyric_files_and_batches(tmp_path):
+    root = str(tmp_path)
+    for i in range(5):
+        _write(root, f"a/{i}.lrc", "[00:01.00]x\n")
+    _write(root, "b/song.YRC", "[1000,500](1000,500,0)x\n")
+    _write(root, "b/cover.jpg", "")
+    files = sorted(lyric_parser.iter_lyric_files(root))
+    assert len(files) == 6 and not any(f.endswith(".jpg") for f in files)
+    assert [len(b) for b in lyric_parser.batches(files, 4)] == [4, 2]
+    assert list(lyric_parser.batches([], 4)) == []
+
+
+def test_process_batch_keeps_going_after_a_bad_file(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    good = _write(root, "good.lrc", "[00:01.00]a\n[00:02.00]b\n")
+    bad = _write(root, "bad.lrc", "[00:01.00]boom\n")
+    missing = os.path.join(root, "missing.lrc")
+    validate = lyric_parser.validate
+
+    def flaky_validate(text, word=None):
+        if "boom" in text:
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+        return validate(text, word)
+
+    monkeypatch.setattr(lyric_parser, "validate", flaky_validate)
+    results = {rel: issues for rel, _, issues in lyric_parser.process_batch([bad, missing, good], root, None)}
+    assert results["bad.lrc"][0][1] == "parse_error"
+    assert results["missing.lrc"][0][1] == "io_error"
+    assert results["good.lrc"] == []
@@ -0,0 +1,31 @@
+import queue
+
+import desktop_lyrics as dl
+
+
+def _queue(*msgs):
+    q = queue.Queue()
+    for msg in msgs:
+        q.put(msg)
+    return q
+
+
+def test_prefetch_done_messages_are_all_kept_in_order():
+    q = _queue(("prefetch_done", ("A", 1)), ("prefetch_done", ("B", 2)))
+    assert dl.drain_message_queue(q, 20) == [("prefetch_done", ("A", 1)), ("prefetch_done", ("B", 2))]
+
+
+def test_only_latest_time_is_kept_at_its_last_position():
+    q = _queue(("time", 1.0), ("song", {"song": "A"}), ("time", 2.0), ("full_lyric", {}), ("time", 3.0))
+    assert dl.drain_message_queue(q, 20) == [("song", {"song": "A"}), ("full_lyric", {}), ("time", 3.0)]
+
+
+def test_song_and_lyric_keep_arrival_order():
+    q = _queue(("song", "A"), ("full_lyric", "a"), ("song", "B"), ("full_lyric", "b"))
+    assert [m[1] for m in dl.drain_message_queue(q, 20)] == ["A", "a", "B", "b"]
+
+
+def test_limit_leaves_rest_in_queue():
+    q = _queue(*[("parse_done", i) for i in range(5)])
+    assert len(dl.drain_message_queue(q, 3)) == 3
+    assert q.qsize() == 2
@@ -0,0 +1,15 @@
+import desktop_lyrics as dl
+
+
+def test_outline_neighbors_snap_down_to_supported_levels():
+    for n, expected in ((0, 0), (1, 0), (3, 0), (4, 4), (5, 4), (7, 4), (8, 8)):
+        assert len(dl.outline_offsets(1, n)) == expected
+
+
+def test_config_clamps_outline_neighbors(tmp_path):
+    config = dl.ConfigManager(str(tmp_path / "config.toml"))
+    values, errors = config.validate({"render": {"outline_neighbors": 6}})
+    assert not errors
+    assert values["OUTLINE_NEIGHBORS"] == 4
+    _, errors = config.validate({"render": {"outline_neighbors": 9}})
+    assert errors
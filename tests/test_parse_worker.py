@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+import types
+
+import desktop_lyrics as dl
+
+LRC = "[00:01.00]第一行\n[00:03.00]第二行\n"
+
+
+class FakeApp:
+    def __init__(self, generation):
+        self.song_generation = generation
+        self.messages = queue.Queue()
+
+    def safe_update(self, msg_type, data=None):
+        self.messages.put((msg_type, data))
+
+    def _store_parsed_lyric(self, content_hash, entry):
+        pass
+
+
+def _next(app, timeout=5.0):
+    return app.messages.get(timeout=timeout)
+
+
+def test_parse_runs_on_worker_thread(monkeypatch):
+    seen = []
+    real = dl.lyric_parser.parse_lyric_entry
+
+    def parse(lyric, tlyric):
+        seen.append(threading.current_thread().name)
+        return real(lyric, tlyric)
+
+    monkeypatch.setattr(dl.lyric_parser, "parse_lyric_entry", parse)
+    app = FakeApp(1)
+    worker = dl.LyricParseWorker(app)
+    worker.start()
+    worker.submit(1, LRC, "")
+    msg_type, (generation, entry) = _next(app)
+    assert msg_type == "parse_done" and generation == 1
+    assert [line["text"] for line in entry["lyrics"]] == ["第一行", "第二行"]
+    assert seen == ["lyric-parser"]
+
+
+def test_stale_generation_is_skipped():
+    app = FakeApp(2)
+    worker = dl.LyricParseWorker(app)
+    worker.start()
+    worker.submit(1, LRC, "")          # 切歌前提交的旧任务
+    while not worker._jobs.empty():
+        time.sleep(0.001)
+    time.sleep(0.05)
+    worker.submit(2, LRC, "")
+    msg_type, (generation, _) = _next(app)
+    assert (msg_type, generation) == ("parse_done", 2)
+    assert app.messages.empty()
+
+
+def test_safe_update_stamps_lyrics_with_preceding_song_generation():
+    app = types.SimpleNamespace(message_queue=queue.Queue(), _queued_generation=0,
+                                _enqueue_lock=threading.Lock())
+    for msg in (("song", "A"), ("full_lyric", "a"), ("time", 1.0), ("song", "B"), ("full_lyric", "b")):
+        dl.DesktopLyrics.safe_update(app, *msg)
+    batch = dl.drain_message_queue(app.message_queue, 20)
+    assert batch == [("song", (1, "A")), ("full_lyric", (1, "a")), ("time", 1.0),
+                     ("song", (2, "B")), ("full_lyric", (2, "b"))]
+
+
+def _big_yrc(size):
+    lines, total, i = [], 0, 0
+    while total < size:
+        start = i * 3000
+        line = f"[{start},3000]" + "".join(f"({start + w * 300},300,0)词{w}" for w in range(10))
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def test_large_parse_does_not_stall_a_60hz_loop():
+    # 与界面线程的 after 循环相同：每 1/60 s 一帧，迟到超过半个周期即视为掉帧
+    text = _big_yrc(5 * 2**20)
+    app = FakeApp(1)
+    worker = dl.LyricParseWorker(app)
+    worker.start()
+    worker.submit(1, "[0,1](0,1,0)x", "")      # 先跑一次小任务，线程、解析子进程和导入都已就绪
+    _next(app)
+    period = 1.0 / 60
+    late = []
+    worker.submit(1, text, "")
+    next_due = time.perf_counter() + period
+    while app.messages.empty():
+        now = time.perf_counter()
+        if now < next_due:
+            time.sleep(min(0.001, next_due - now))
+            continue
+        late.append(now - next_due)
+        next_due += period
+    msg_type, (_, entry) = _next(app)
+    assert msg_type == "parse_done"
+    assert entry == dl.lyric_parser.parse_lyric_entry(text, "")
+    assert len(late) > 30
+    missed = [round(x * 1000, 1) for x in late if x > period / 2]
+    assert missed == []
@@ -0,0 +1,28 @@
+import json
+
+import perf_stats
+
+
+def test_counter_trace_records_running_total(tmp_path):
+    registry = perf_stats.PerfRegistry()
+    registry.trace.set_enabled(True)
+    counter = registry.counter("queue_msgs")
+    for n in (3, 1, 5):
+        counter.add(n)
+    path = str(tmp_path / "trace.json")
+    registry.trace.dump(path)
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    assert [ev["args"]["value"] for ev in events if ev["ph"] == "C"] == [3, 4, 9]
+
+
+def test_counter_value_resets_but_total_does_not():
+    registry = perf_stats.PerfRegistry()
+    registry.set_enabled(True)
+    counter = registry.counter("reconnects")
+    counter.add(2)
+    registry.reset()
+    counter.add()
+    assert counter.value == 1
+    assert counter.total == 3
+    assert registry.snapshot()["counters"]["reconnects"] == 1
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import sys
+import threading
+
+import desktop_lyrics as dl
+
+
+def test_snapshot_while_levels_change_from_another_thread():
+    # 频繁切换线程，让复制 history 时更容易碰上另一线程的追加
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    governor = dl.QualityGovernor()
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                snap = governor.snapshot()
+            except RuntimeError as e:
+                errors.append(e)
+                return
+            if snap["name"] != dl.QUALITY_LEVELS[snap["level"]]["name"]:
+                errors.append(snap)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        top = len(dl.QUALITY_LEVELS) - 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(20000):
+                governor._set_level(top if i % 2 == 0 else 0, "test")
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert not errors
+    assert len(governor.snapshot()["history"]) == governor.history.maxlen
+
+
+def test_quality_settings_validate_and_reload(tmp_path):
+    path = tmp_path / "config.json"
+    config = dl.ConfigManager(str(path))
+    values, errors = config.validate({"quality": {"governor_enabled": False, "down_miss_ratio": 0.5,
+                                                  "up_hold_sec": 2}})
+    assert errors == []
+    assert values["QUALITY_GOVERNOR_ENABLED"] is False
+    assert values["QUALITY_DOWN_MISS_RATIO"] == 0.5 and values["QUALITY_UP_HOLD_SEC"] == 2.0
+    _, errors = config.validate({"quality": {"governor_enabled": 1, "up_busy": True}})
+    assert errors == ["quality.governor_enabled 类型应为 bool", "quality.up_busy 类型应为 float"]
+    # 升级阈值不低于降级阈值时没有滞回
+    _, errors = config.validate({"quality": {"up_miss_ratio": 0.3}})
+    assert errors == ["quality.up_miss_ratio 必须小于 quality.down_miss_ratio"]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        path.write_text('{"quality": {"governor_enabled": false, "up_hold_sec": 9}}', encoding="utf-8")
+        try:
+            assert config.load() == {"quality", "timing"}
+            assert dl.QUALITY_GOVERNOR_ENABLED is False and dl.QUALITY_UP_HOLD_SEC == 9.0
+            assert dl.QualityGovernor().enabled is False
+        finally:
+            path.unlink()
+            config.load()
+    assert dl.QUALITY_GOVERNOR_ENABLED is True and dl.QUALITY_UP_HOLD_SEC == 5.0
@@ -0,0 +1,106 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import desktop_lyrics as dl
+
+requests = pytest.importorskip("requests")
+dl._import_requests()
+
+
+class ReleaseServer:
+    """本地 HTTP 桩：模拟 GitHub releases/latest，按 If-None-Match 返回 304"""
+
+    def __init__(self, tag="updata2.0.0", etag='W/"abc"'):
+        self.release = {"tag_name": tag, "body": "修复若干问题",
+                        "assets": [{"name": "HarmoniaDesktopLyrics.exe", "size": 3, "digest": "sha256:00"}]}
+        self.etag = etag
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                body = json.dumps(server.release).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/releases/latest"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = ReleaseServer()
+    yield srv
+    srv.close()
+
+
+def _manager(server, tmp_path, min_interval=3600):
+    return dl.UpdateManager(None, api_url=server.url, state_path=str(tmp_path / "update_state.json"),
+                            min_interval=min_interval)
+
+
+def test_first_check_fetches_and_caches_release(server, tmp_path):
+    manager = _manager(server, tmp_path)
+    release = manager.fetch_latest_release()
+    assert release["tag_name"] == "updata2.0.0"
+    assert release["assets"]["HarmoniaDesktopLyrics.exe"] == {"digest": "sha256:00", "size": 3}
+    assert "If-None-Match" not in server.requests[0]
+    with open(tmp_path / "update_state.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["etag"] == server.etag and state["release"] == release
+
+
+def test_check_within_interval_makes_no_request(server, tmp_path):
+    manager = _manager(server, tmp_path)
+    first = manager.fetch_latest_release()
+    assert manager.fetch_latest_release() == first
+    assert len(server.requests) == 1
+
+
+def test_expired_cache_revalidates_with_etag(server, tmp_path):
+    manager = _manager(server, tmp_path, min_interval=0)
+    first = manager.fetch_latest_release()
+    server.release = {"tag_name": "changed-without-new-etag"}
+    again = manager.fetch_latest_release()
+    assert server.requests[1]["If-None-Match"] == server.etag
+    # 304：沿用缓存的发布信息
+    assert again == first
+
+
+def test_new_etag_replaces_cached_release(server, tmp_path):
+    manager = _manager(server, tmp_path, min_interval=0)
+    manager.fetch_latest_release()
+    server.etag = 'W/"def"'
+    server.release = {"tag_name": "updata3.0.0", "body": None}
+    release = manager.fetch_latest_release(force=True)
+    assert release["tag_name"] == "updata3.0.0"
+    assert release["body"] == "暂无更新日志"
+    assert manager._load_state()["etag"] == 'W/"def"'
+
+
+def test_corrupt_state_file_is_ignored(server, tmp_path):
+    (tmp_path / "update_state.json").write_text("{not json", encoding="utf-8")
+    manager = _manager(server, tmp_path)
+    assert manager.fetch_latest_release()["tag_name"] == "updata2.0.0"
+    assert "If-None-Match" not in server.requests[0]
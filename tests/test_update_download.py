@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import desktop_lyrics as dl
+
+requests = pytest.importorskip("requests")
+dl._import_requests()
+
+
+class FileServer:
+    """本地 HTTP 桩：支持 Range/If-Range，可按请求注入提前断开"""
+
+    def __init__(self, payload, etag='"v1"'):
+        self.payload = payload
+        self.etag = etag
+        self.drops = []          # 第 k 个请求只发送 drops[k] 字节后断开
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                body, status, extra = server.payload, 200, {}
+                rng = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if rng and (if_range is None or if_range == server.etag):
+                    start = int(rng.split("=", 1)[1].rstrip("-"))
+                    if start >= len(server.payload):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(server.payload)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    body, status = server.payload[start:], 206
+                    extra["Content-Range"] = f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}"
+                self.send_response(status)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in extra.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                drop = server.drops.pop(0) if server.drops else None
+                if drop is not None:
+                    self.wfile.write(body[:drop])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/HarmoniaDesktopLyrics.exe"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = FileServer(os.urandom(600 * 1024))
+    yield srv
+    srv.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(dl, "DOWNLOAD_RETRY_BACKOFF", 0.0)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_resumes_after_injected_disconnects(server, tmp_path):
+    server.drops = [100 * 1024, 250 * 1024]
+    dest = str(tmp_path / "update.exe")
+    sha = hashlib.sha256(server.payload).hexdigest()
+    dl.UpdateDownloader(server.url, dest, expected_sha256=sha, chunk_size=16 * 1024).run()
+    assert _read(dest) == server.payload
+    assert len(server.requests) == 3
+    assert "Range" not in server.requests[0]
+    for headers in server.requests[1:]:
+        assert headers["If-Range"] == server.etag
+    assert not os.path.exists(dest + ".part")
+    assert not os.path.exists(dest + ".part.validator")
+
+
+def test_changed_upstream_file_is_not_appended_to_stale_part(server, tmp_path):
+    dest = str(tmp_path / "update.exe")
+    with open(dest + ".part", "wb") as f:
+        f.write(os.urandom(4096))                # 旧版本文件的前半段
+    with open(dest + ".part.validator", "w") as f:
+        f.write('"v0"')
+    dl.UpdateDownloader(server.url, dest, expected_sha256=hashlib.sha256(server.payload).hexdigest()).run()
+    assert _read(dest) == server.payload
+    assert server.requests[0]["If-Range"] == '"v0"'
+
+
+def test_complete_part_with_unknown_total_restarts_after_416(server, tmp_path):
+    dest = str(tmp_path / "update.exe")
+    with open(dest + ".part", "wb") as f:
+        f.write(server.payload)                  # 下载完成但没来得及改名
+    with open(dest + ".part.validator", "w") as f:
+        f.write(server.etag)
+    dl.UpdateDownloader(server.url, dest).run()
+    assert _read(dest) == server.payload
+    assert [("Range" in h) for h in server.requests] == [True, False]
+
+
+def test_part_without_validator_downloads_from_start(server, tmp_path):
+    dest = str(tmp_path / "update.exe")
+    with open(dest + ".part", "wb") as f:
+        f.write(b"x" * 1000)
+    dl.UpdateDownloader(server.url, dest).run()
+    assert _read(dest) == server.payload
+    assert "Range" not in server.requests[0]
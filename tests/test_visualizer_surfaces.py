@@ -0,0 +1,119 @@
+import functools
+import time
+import types
+
+import pytest
+
+import desktop_lyrics as dl
+
+
+class FakeRoot:
+    def after_idle(self, fn, *args):
+        pass
+
+
+class FakeSurface:
+    """与 VisualizerOverlay 相同的可见性/注册逻辑，不创建 Tk 窗口"""
+
+    def __init__(self, root, source, governor=None, spec=None, visible=True):
+        self.source = source
+        self.spec = spec or {}
+        self.alive = True
+        self._visible = visible
+        source.add(self)
+
+    def render(self, levels):
+        pass
+
+    def show(self):
+        self._visible = True
+        self.source.update_running()
+
+    def hide(self):
+        self._visible = False
+        self.source.update_running()
+
+    def destroy(self):
+        self.alive = False
+        self._visible = False
+        self.source.remove(self)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(dl, "FORCE_AUDIO_SIMULATION", True)
+    monkeypatch.setattr(dl, "VisualizerOverlay", FakeSurface)
+    monkeypatch.setattr(dl, "VIS_SURFACES", [{"edge": "bottom"}, {"edge": "top", "bars": 64}])
+    ns = types.SimpleNamespace(root=FakeRoot(), calibrator=None, audio_source=None, spectrum=None,
+                               governor=None, visualizers=[], visualizer_enabled=True,
+                               _raw_playback_time=lambda: None, _word_onsets=lambda: [],
+                               _update_tray_menu=lambda: None)
+    for name in ("_create_visualizer", "_destroy_visualizers", "_recreate_visualizer"):
+        setattr(ns, name, functools.partial(getattr(dl.DesktopLyrics, name), ns))
+    yield ns
+    ns._destroy_visualizers()
+
+
+def test_surfaces_share_one_worker(app):
+    app._create_visualizer()
+    assert len(app.visualizers) == 2
+    assert app.audio_source.worker is not None
+    assert app.audio_source.surfaces == app.visualizers
+
+
+def test_recreate_keeps_audio_worker_running(app):
+    app._create_visualizer()
+    source = app.audio_source
+    worker, stop_evt = source.worker, source._stop_evt
+    old = list(app.visualizers)
+    app._recreate_visualizer()
+    assert source.worker is worker and not stop_evt.is_set()
+    assert all(not s.alive for s in old)
+    assert source.surfaces == app.visualizers and len(app.visualizers) == 2
+
+
+def test_recreate_hidden_surfaces_stays_stopped(app):
+    app._create_visualizer()
+    for surface in app.visualizers:
+        surface.hide()
+    assert app.audio_source.worker is None
+    app._recreate_visualizer()
+    assert app.audio_source.worker is None
+    assert not any(s._visible for s in app.visualizers)
+
+
+def test_restart_waits_for_previous_worker(app, monkeypatch):
+    app._create_visualizer()
+    source = app.audio_source
+    old_thread = source.thread
+    monkeypatch.setattr(dl, "VIS_MAX_BARS", dl.VIS_MAX_BARS // 2)
+    app._recreate_visualizer()
+    assert source.worker is not None and source.thread is not old_thread
+    assert source.worker.wait_for is None or source.worker.wait_for is old_thread
+    deadline = time.time() + 5.0
+    while old_thread.is_alive() and time.time() < deadline:
+        time.sleep(0.01)
+    assert not old_thread.is_alive()
+
+
+def test_multiple_toplevels(monkeypatch):
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("没有可用的显示")
+    monkeypatch.setattr(dl, "FORCE_AUDIO_SIMULATION", True)
+    try:
+        source = dl.SpectrumSource(root)
+        surfaces = [dl.VisualizerOverlay(root, source, spec=spec)
+                    for spec in ({"edge": "bottom"}, {"edge": "top", "bars": 64}, {"edge": "left", "bars": 32})]
+        assert source.worker is not None
+        levels = dl.np.linspace(0.0, 1.0, source.num_bars, dtype=dl.np.float32)
+        source._fan_out(levels)
+        assert [len(s.last_levels) for s in surfaces] == [s.num_bars for s in surfaces]
+        assert surfaces[2].num_bars <= 32
+        for surface in surfaces:
+            surface.destroy()
+        assert source.worker is None
+    finally:
+        root.destroy()
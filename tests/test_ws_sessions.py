@@ -0,0 +1,200 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import desktop_lyrics as dl
+
+websockets = pytest.importorskip("websockets")
+
+CLIENTS = 20
+RATE_HZ = 60
+DURATION_SEC = 0.5
+
+
+class RecordingApp:
+    """代替 DesktopLyrics，记录进入界面队列的消息（在事件循环线程中调用）"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = []
+
+    def safe_update(self, msg_type, data=None):
+        with self.lock:
+            self.messages.append((msg_type, data))
+
+    def lookup_parsed_lyric(self, content_hash):
+        return None
+
+    def of_type(self, msg_type, upto=None):
+        with self.lock:
+            return [data for t, data in self.messages[:upto] if t == msg_type]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    app = RecordingApp()
+    server = dl.LyricsServer(app, port=_free_port(), ipc_enabled=False)
+    server.start()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", server.port), 0.2).close()
+            break
+        except OSError:
+            time.sleep(0.02)
+    yield server
+    assert server.stop()
+
+
+async def _client(port, k, ready, go, done):
+    async with websockets.connect(f"ws://localhost:{port}") as ws:
+        await ws.send(json.dumps({"type": "song", "song": f"song-{k}", "artist": f"artist-{k}"}))
+        await ws.send(json.dumps({"type": "time", "currentTime": k * 1000}))
+        await ws.send(json.dumps({"type": "ping"}))
+        await ws.recv()
+        ready.append(k)
+        await go.wait()
+        # 每个客户端的时间值落在各自的区间，便于分辨是谁发的
+        for i in range(int(DURATION_SEC * RATE_HZ)):
+            await ws.send(json.dumps({"type": "time", "currentTime": k * 1000 + i / RATE_HZ}))
+            await asyncio.sleep(1.0 / RATE_HZ)
+        await ws.send(json.dumps({"type": "ping"}))
+        assert json.loads(await ws.recv()) == {"type": "pong"}
+        await done.wait()
+
+
+async def _stress(server):
+    ready, go, done = [], asyncio.Event(), asyncio.Event()
+    first = asyncio.ensure_future(_client(server.port, 0, ready, go, done))
+    while not ready:
+        await asyncio.sleep(0.005)
+    rest = [asyncio.ensure_future(_client(server.port, k, ready, go, done)) for k in range(1, CLIENTS)]
+    while len(ready) < CLIENTS:
+        await asyncio.sleep(0.005)
+    go.set()
+    await asyncio.sleep(DURATION_SEC + 0.3)
+    stats = server.stats()
+    stats["queued"] = len(server.app.messages)
+    done.set()
+    await asyncio.gather(first, *rest)
+    return stats
+
+
+def test_many_clients_only_active_source_reaches_queue(server):
+    stats = asyncio.run(_stress(server))
+    app = server.app
+    assert stats["connections"] == CLIENTS
+    assert stats["active_client"] == 1
+    # 第一个连接的客户端最先开始并一直在播放，其他客户端的 song/time 都不会进入界面队列
+    upto = stats["queued"]
+    assert app.of_type("song", upto) == [{"song": "song-0", "artist": "artist-0"}]
+    times = app.of_type("time", upto)
+    assert times and all(t < 1000 for t in times)
+    assert times == sorted(times)
+    assert stats["dropped_time_updates"] >= (CLIENTS - 1) * int(DURATION_SEC * RATE_HZ) // 2
+    assert stats["messages_total"] >= CLIENTS * (int(DURATION_SEC * RATE_HZ) + 4)
+    deadline = time.monotonic() + 5.0
+    while server.connection_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.connection_count() == 0
+    assert app.of_type("status")[-1] == "disconnected"
+
+
+async def _handover(server):
+    async with websockets.connect(f"ws://localhost:{server.port}") as a, \
+            websockets.connect(f"ws://localhost:{server.port}") as b:
+        await a.send(json.dumps({"type": "song", "song": "A", "artist": ""}))
+        await a.send(json.dumps({"type": "time", "currentTime": 1.0}))
+        await b.send(json.dumps({"type": "song", "song": "B", "artist": ""}))
+        await b.send(json.dumps({"type": "time", "currentTime": 50.0}))
+        await b.send(json.dumps({"type": "focus"}))
+        await b.send(json.dumps({"type": "ping"}))
+        await b.recv()
+        await a.close()
+        await asyncio.sleep(0.1)
+        return server.stats()
+
+
+def test_focus_switches_active_client_and_replays_state(server):
+    stats = asyncio.run(_handover(server))
+    assert stats["active_client"] == 2
+    assert [s["song"] for s in server.app.of_type("song")] == ["A", "B"]
+    assert server.app.of_type("time")[-1] == 50.0
+
+
+async def _spectrum(server, path):
+    async with websockets.connect(f"ws://localhost:{server.port}{path}") as ws:
+        compressed = bool(ws.protocol.extensions)
+        await ws.send(json.dumps({"type": "spectrum_subscribe", "fps": 60, "format": "u8"}))
+        reply = json.loads(await ws.recv())
+        if reply["type"] != "spectrum_info":
+            return compressed, reply, None
+        levels = dl.np.linspace(0.0, 1.0, 32, dtype=dl.np.float32)
+        for _ in range(50):
+            server.spectrum.publish(levels)
+            try:
+                frame = await asyncio.wait_for(ws.recv(), 0.05)
+                break
+            except asyncio.TimeoutError:
+                pass
+        return compressed, reply, frame
+
+
+def test_spectrum_path_negotiates_without_deflate(server):
+    dl._import_numpy()
+    compressed, reply, frame = asyncio.run(_spectrum(server, dl.SPECTRUM_WS_PATH))
+    assert not compressed
+    assert reply["type"] == "spectrum_info"
+    assert isinstance(frame, bytes) and len(frame) == reply["header_size"] + 32
+
+
+def test_spectrum_on_compressed_connection_points_to_spectrum_path(server):
+    compressed, reply, _ = asyncio.run(_spectrum(server, "/"))
+    assert compressed
+    assert reply == {"type": "spectrum_error", "error": "compressed connection", "path": dl.SPECTRUM_WS_PATH}
+
+
+async def _burst(port, n):
+    async with websockets.connect(f"ws://localhost:{port}") as ws:
+        for i in range(n):
+            await ws.send(json.dumps({"type": "time", "currentTime": i / 10}))
+        await ws.send(json.dumps({"type": "ping"}))
+        await ws.recv()
+        # 超过 1 秒才会结算一次速率
+        await asyncio.sleep(1.05)
+        await ws.send(json.dumps({"type": "ping"}))
+        await ws.recv()
+
+
+def _wait_listening(port):
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), 0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def test_stop_is_idempotent_and_restart_starts_fresh(server):
+    asyncio.run(_burst(server.port, 50))
+    assert server.stats()["message_rate"] > 0
+    assert server.stop()
+    assert server.stop()
+    assert server.thread is None and server.loop is None
+    assert server.stats()["message_rate"] == 0.0
+    server.start()
+    assert _wait_listening(server.port)
+    assert server.stats()["message_rate"] == 0.0
+    asyncio.run(_burst(server.port, 5))
+    assert 0 < server.stats()["message_rate"] < 20